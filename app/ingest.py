@@ -0,0 +1,332 @@
+"""
+Scores repositories from local dumps (tree listings and commit logs), without
+calling GitHub. Meant for research-scale runs over millions of repositories.
+
+Usage:
+    python -m app.ingest --trees trees.jsonl.gz --commits commits.csv -o results.jsonl --processes 8
+    python -m app.ingest --trees trees.csv --commits commits.csv --readmes readmes.jsonl \\
+        --languages languages.csv -o results.csv --chunk-size 512
+
+Dumps are JSONL or CSV with a header row (by extension; .gz files are
+decompressed on the fly), one row per:
+    trees      repo, path, type (blob or tree, default blob), size, sha
+    commits    repo, sha, date (ISO 8601), message
+    readmes    repo, content
+    languages  repo, language, bytes
+
+Every dump must be sorted by repo (e.g. exported with ORDER BY repo). They are
+merge-joined in one streaming pass, so only the repositories of the chunks in
+flight are held in memory. Every repository in the tree dump is scored; rows of
+other dumps without a tree listing are counted as unmatched. Features are the
+ones analyze_repository builds, except that test/CI files cannot be sampled
+(their evidence is 'unchecked' or 'missing') and template matching is skipped.
+
+Results are written in repo order, so the output doubles as the checkpoint:
+rerunning the same command skips repositories up to the last one written.
+"""
+import argparse
+import csv
+import gzip
+import json
+import logging
+import multiprocessing
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, timezone
+from itertools import groupby
+from operator import itemgetter
+from typing import Any, Deque, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from app.score import ResultWriter, _recover_output
+from app.services.sampler_service import BlobSampler
+from app.services.scoring_service import ScoringService
+from app.services.structure_service import StructureIndex
+
+logger = logging.getLogger("app.ingest")
+
+# Dumps joined onto the tree listing, in the order they are read
+JOINED_DUMPS = ("commits", "readmes", "languages")
+
+Chunk = Dict[str, List[Any]]
+
+# Per-process state, set up by _init_worker
+_scoring: Optional[ScoringService] = None
+
+
+def open_dump(path: str) -> TextIO:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", newline="", encoding="utf-8")
+    return open(path, newline="", encoding="utf-8")
+
+
+def read_dump(path: str, stats: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Streams the rows of a JSONL or CSV dump as dicts, counting them in stats["rows"].
+    """
+    is_csv = (path[:-3] if path.endswith(".gz") else path).lower().endswith(".csv")
+    with open_dump(path) as f:
+        rows = csv.DictReader(f) if is_csv else (json.loads(line) for line in f if line.strip())
+        for row in rows:
+            stats["rows"] += 1
+            yield row
+
+
+def group_by_repo(rows: Iterator[Dict[str, Any]], name: str) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    Yields (repo, rows) per repository. Raises ValueError if the dump is not sorted by repo.
+    """
+    previous = None
+    for repo, group in groupby(rows, key=itemgetter("repo")):
+        if previous is not None and repo <= previous:
+            raise ValueError(f"The {name} dump is not sorted by repo: {repo!r} comes after {previous!r}")
+        previous = repo
+        yield repo, list(group)
+
+
+def merge_join(trees: Iterator[Tuple[str, List[Dict[str, Any]]]],
+               joined: Dict[str, Iterator[Tuple[str, List[Dict[str, Any]]]]],
+               stats: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Left-joins the other dumps' groups onto each tree listing group. All inputs
+    are sorted by repo, so each advances at most to the current repository.
+    """
+    heads = {name: next(groups, None) for name, groups in joined.items()}
+    for repo, tree in trees:
+        record: Dict[str, Any] = {"repo": repo, "tree": tree}
+        for name, groups in joined.items():
+            head = heads[name]
+            while head is not None and head[0] < repo:
+                stats["unmatched"] += 1
+                head = next(groups, None)
+            if head is not None and head[0] == repo:
+                record[name] = head[1]
+                head = next(groups, None)
+            heads[name] = head
+        yield record
+    for name, groups in joined.items():
+        if heads[name] is not None:
+            stats["unmatched"] += 1 + sum(1 for _ in groups)
+
+
+def chunked(records: Iterator[Dict[str, Any]], size: int, after: Optional[str]) -> Iterator[Chunk]:
+    """
+    Packs joined records into column-oriented chunks of `size` repositories,
+    skipping repositories up to `after` (the last one already scored).
+    """
+    columns = ("repo", "tree") + JOINED_DUMPS
+    chunk: Chunk = {column: [] for column in columns}
+    for record in records:
+        if after is not None and record["repo"] <= after:
+            continue
+        for column in columns:
+            chunk[column].append(record.get(column) or [])
+        if len(chunk["repo"]) >= size:
+            yield chunk
+            chunk = {column: [] for column in columns}
+    if chunk["repo"]:
+        yield chunk
+
+
+def _tree_items(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    items = []
+    for row in rows:
+        size = row.get("size")
+        items.append({
+            "path": row.get("path") or "",
+            "type": row.get("type") or "blob",
+            "sha": row.get("sha") or None,
+            "size": int(size) if size not in (None, "") else None,
+        })
+    # Listings are usually path-sorted already; the index builds fastest from sorted paths
+    items.sort(key=itemgetter("path"))
+    return items
+
+
+def _commits(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    commits = [
+        {"sha": row.get("sha"), "commit": {"message": row.get("message") or "", "author": {"date": row.get("date")}}}
+        for row in rows
+    ]
+    # Newest first, as the commits API lists them; dates are normalized by parse_date
+    commits.sort(key=lambda commit: commit["commit"]["author"]["date"] or "", reverse=True)
+    return commits
+
+
+def parse_date(value: Optional[str]) -> Optional[str]:
+    """
+    Normalizes an ISO 8601 date to the UTC 'YYYY-MM-DDTHH:MM:SSZ' form GitHub uses.
+    """
+    if not value:
+        return None
+    try:
+        date = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if date.tzinfo is not None:
+        date = date.astimezone(timezone.utc)
+    return date.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def build_features(chunk: Chunk) -> Chunk:
+    """
+    Builds the analyze_repository features of a chunk of joined dump rows, column
+    by column: repo, structure, activity, documentation and tech_stack.
+    """
+    features: Chunk = {"repo": chunk["repo"], "structure": [], "activity": [], "documentation": [], "tech_stack": []}
+    for tree, commit_rows, readmes, languages in zip(chunk["tree"], chunk["commits"], chunk["readmes"], chunk["languages"]):
+        index = StructureIndex.from_tree_items(_tree_items(tree))
+        structure = index.summary()
+        structure["template"] = None
+        # No blob contents in the dumps: evidence only says whether there are candidates
+        BlobSampler.apply(structure, _scoring.sampler.carry_over(None, index))
+        features["structure"].append(structure)
+
+        commits = _commits([dict(row, date=parse_date(row.get("date"))) for row in commit_rows])
+        activity = _scoring.analyze_commit_log(commits)
+        activity["head_sha"] = commits[0]["sha"] if commits else None
+        features["activity"].append(activity)
+
+        readme = (readmes[0].get("content") or "") if readmes and structure["has_readme"] else ""
+        features["documentation"].append({"readme_content": readme})
+
+        # Largest first, as the languages API lists them
+        distribution = {row["language"]: int(row.get("bytes") or 0) for row in languages if row.get("language")}
+        distribution = dict(sorted(distribution.items(), key=itemgetter(1), reverse=True))
+        features["tech_stack"].append({
+            "languages": list(distribution),
+            "language_distribution": distribution,
+            "detected_extensions": index.extensions(),
+        })
+    return features
+
+
+def _init_worker():
+    global _scoring
+    logging.basicConfig(level=logging.WARNING)
+    # Scoring only: nothing is fetched
+    _scoring = ScoringService(None)
+
+
+def score_chunk(chunk: Chunk) -> List[Dict[str, Any]]:
+    """
+    Builds the features of a chunk and scores them. Returns the output records in chunk order.
+    """
+    scored_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    features = build_features(chunk)
+    records = []
+    for i, repo in enumerate(features["repo"]):
+        repo_data = {stage: features[stage][i] for stage in ScoringService.ANALYSIS_STAGES if stage in features}
+        score = _scoring.calculate_score(repo_data)
+        records.append(dict({"repo": repo, "status": "ok", "scored_at": scored_at}, **score))
+    return records
+
+
+def last_scored(path: str, fmt: str) -> Optional[str]:
+    """
+    The last repository in an existing output file, which is written in repo order.
+    """
+    try:
+        _recover_output(path)
+        f = open(path, newline="")
+    except FileNotFoundError:
+        return None
+    last = None
+    with f:
+        rows = csv.DictReader(f) if fmt == "csv" else (json.loads(line) for line in f if line.strip())
+        for row in rows:
+            last = row["repo"]
+    return last
+
+
+def run(trees: str, output: str, fmt: str, commits: Optional[str] = None, readmes: Optional[str] = None,
+        languages: Optional[str] = None, processes: int = 1, chunk_size: int = 256) -> Dict[str, Any]:
+    """
+    Scores every repository in the tree dump after the last one in `output`.
+    Returns counts and throughput.
+    """
+    stats: Dict[str, Any] = {"rows": 0, "scored": 0, "unmatched": 0}
+    paths = {"commits": commits, "readmes": readmes, "languages": languages}
+    joined = {
+        name: group_by_repo(read_dump(path, stats), name)
+        for name, path in paths.items() if path
+    }
+    records = merge_join(group_by_repo(read_dump(trees, stats), "trees"), joined, stats)
+    after = last_scored(output, fmt)
+    if after is not None:
+        logger.info(f"Resuming after {after}")
+    chunks = chunked(records, chunk_size, after)
+    writer = ResultWriter(output, fmt)
+
+    started = time.monotonic()
+    last_report = started
+
+    def write(results: List[Dict[str, Any]]):
+        nonlocal last_report
+        for record in results:
+            writer.write(record)
+        stats["scored"] += len(results)
+        now = time.monotonic()
+        if now - last_report >= 30:
+            elapsed = now - started
+            logger.info(f"{stats['rows']} rows read ({stats['rows'] / elapsed:.0f}/s), "
+                        f"{stats['scored']} repositories scored ({stats['scored'] / elapsed:.1f}/s)")
+            last_report = now
+
+    try:
+        if processes > 1:
+            # Chunks are written in submission order; a bounded window keeps memory flat
+            with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_init_worker) as executor:
+                pending: Deque[Future] = deque()
+                for chunk in chunks:
+                    pending.append(executor.submit(score_chunk, chunk))
+                    if len(pending) >= processes * 2:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+        else:
+            _init_worker()
+            for chunk in chunks:
+                write(score_chunk(chunk))
+    except KeyboardInterrupt:
+        logger.warning("Interrupted; finished results are saved and the next run resumes from them")
+        raise
+    finally:
+        writer.close()
+
+    elapsed = max(time.monotonic() - started, 1e-9)
+    stats["seconds"] = round(elapsed, 3)
+    stats["rows_per_second"] = round(stats["rows"] / elapsed, 1)
+    stats["repos_per_second"] = round(stats["scored"] / elapsed, 1)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score repositories from local tree listing and commit log dumps.")
+    parser.add_argument("--trees", required=True, help="tree listing dump (JSONL or CSV, optionally .gz), sorted by repo")
+    parser.add_argument("--commits", help="commit log dump, sorted by repo")
+    parser.add_argument("--readmes", help="README contents dump, sorted by repo")
+    parser.add_argument("--languages", help="language byte counts dump, sorted by repo")
+    parser.add_argument("-o", "--output", required=True, help="results file (.jsonl or .csv); also the resume checkpoint")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="output format (default: from the file extension)")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes (default 1)")
+    parser.add_argument("--chunk-size", type=int, default=256, help="repositories per chunk (default 256)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    fmt = args.format or ("csv" if args.output.lower().endswith(".csv") else "jsonl")
+    try:
+        stats = run(args.trees, args.output, fmt, commits=args.commits, readmes=args.readmes,
+                    languages=args.languages, processes=max(1, args.processes), chunk_size=max(1, args.chunk_size))
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(2)
+    except KeyboardInterrupt:
+        sys.exit(130)
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
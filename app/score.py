@@ -0,0 +1,346 @@
+"""
+Scores many repositories offline, without going through the HTTP API.
+
+Usage:
+    # Repository URLs (or owner/name) one per line, from a file or stdin
+    python -m app.score repos.txt -o results.jsonl
+    cat repos.txt | python -m app.score - -o results.csv --threads 16
+
+    # Several processes, sharing a GitHub response cache on disk
+    python -m app.score repos.txt -o results.jsonl --processes 4 --threads 8 \\
+        --cache data/github_cache.sqlite --cache-max-age 86400
+
+Results are appended to the output as each repository finishes, and the output
+doubles as the checkpoint: rerunning the same command skips repositories that
+already have a result, so an interrupted run resumes where it stopped.
+Repositories that could not be scored because GitHub was unavailable are not
+written, so the next run retries them.
+"""
+import argparse
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Set, TextIO, Tuple
+from urllib.parse import urlparse
+
+from app.services.cache_service import ResponseCache
+from app.services.github_service import GitHubService, GitHubUnavailableError
+from app.services.metadata_service import MetadataLoader
+from app.services.scoring_service import ScoringService
+
+logger = logging.getLogger("app.score")
+
+# Flat columns for CSV output; JSONL records carry the full score breakdown
+CSV_COLUMNS = [
+    "repo", "status", "error", "total_score", "level",
+    "code_organization", "documentation", "commit_hygiene", "engineering_standards", "tech_stack",
+    "weaknesses", "scored_at",
+]
+CATEGORY_COLUMNS = {
+    "Code Organization": "code_organization",
+    "Documentation": "documentation",
+    "Commit Hygiene": "commit_hygiene",
+    "Engineering Standards": "engineering_standards",
+    "Tech Stack": "tech_stack",
+}
+# Outcomes that are final; anything else is retried by the next run
+FINAL_STATUSES = {"ok", "not_found", "invalid"}
+
+# Per-process state, set up by _init_worker
+_scoring: Optional[ScoringService] = None
+_batch_pool: Optional[ThreadPoolExecutor] = None
+
+
+def parse_repo(line: str) -> Optional[Tuple[str, str]]:
+    """
+    Accepts 'https://github.com/owner/name', 'github.com/owner/name(.git)' or 'owner/name'.
+    """
+    text = line.strip()
+    if "://" not in text and text.startswith("github.com/"):
+        text = "https://" + text
+    path = urlparse(text).path if "://" in text else text
+    parts = [part for part in path.strip("/").split("/") if part]
+    if len(parts) < 2:
+        return None
+    owner, repo = parts[0], parts[1]
+    if repo.endswith(".git"):
+        repo = repo[:-4]
+    return (owner, repo) if owner and repo else None
+
+
+def read_repos(stream: TextIO) -> Iterator[str]:
+    """
+    Yields non-empty, non-comment input lines.
+    """
+    for line in stream:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line
+
+
+def _init_worker(cache_path: Optional[str], cache_max_age: float, threads: int):
+    global _scoring, _batch_pool
+    logging.basicConfig(level=logging.WARNING)
+    github = GitHubService(response_cache=ResponseCache(cache_path, max_age=cache_max_age))
+    # Concurrent analyses look up their metadata together, up to 100 repositories per query
+    _scoring = ScoringService(github, metadata_loader=MetadataLoader(github))
+    _batch_pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="score") if threads > 1 else None
+
+
+def score_one(line: str) -> Dict[str, Any]:
+    """
+    Analyzes and scores one input line. Returns the output record.
+    """
+    scored_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    parsed = parse_repo(line)
+    if parsed is None:
+        return {"repo": line, "status": "invalid", "error": "not a GitHub repository URL", "scored_at": scored_at}
+    owner, repo = parsed
+    key = f"{owner}/{repo}"
+    try:
+        repo_data = _scoring.analyze_repository(owner, repo)
+    except GitHubUnavailableError as e:
+        return {"repo": key, "status": "unavailable", "error": str(e), "retry_after": e.retry_after, "scored_at": scored_at}
+    except Exception as e:
+        logger.warning(f"Scoring {key} failed: {e}")
+        return {"repo": key, "status": "error", "error": str(e), "scored_at": scored_at}
+    if "error" in repo_data:
+        return {"repo": key, "status": "not_found", "error": repo_data["error"], "scored_at": scored_at}
+    score = _scoring.calculate_score(repo_data)
+    return dict({"repo": key, "status": "ok", "scored_at": scored_at}, **score)
+
+
+def prefetch_metadata(lines: List[str]):
+    """
+    Starts the metadata lookups of the given lines, so they share bulk queries.
+    """
+    _scoring.metadata_loader.prefetch(repo for repo in map(parse_repo, lines) if repo is not None)
+
+
+def score_batch(lines: List[str]) -> List[Dict[str, Any]]:
+    if _batch_pool is None or len(lines) == 1:
+        return [score_one(line) for line in lines]
+    prefetch_metadata(lines)
+    return list(_batch_pool.map(score_one, lines))
+
+
+def _recover_output(path: str) -> None:
+    """
+    Drops a partially written last line left behind by an interrupted run.
+    """
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        if end == 0:
+            return
+        f.seek(end - 1)
+        if f.read(1) == b"\n":
+            return
+        # Scan backwards for the end of the last complete line
+        position = end
+        while position > 0:
+            start = max(0, position - 65536)
+            f.seek(start)
+            cut = f.read(position - start).rfind(b"\n")
+            if cut >= 0:
+                f.truncate(start + cut + 1)
+                return
+            position = start
+        f.truncate(0)
+
+
+def completed_repos(path: str, fmt: str) -> Set[str]:
+    """
+    Reads the repositories with a final result from an existing output file.
+    """
+    done: Set[str] = set()
+    if not os.path.exists(path):
+        return done
+    _recover_output(path)
+    with open(path, newline="") as f:
+        if fmt == "csv":
+            rows: Iterable[Dict[str, Any]] = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for row in rows:
+            if row.get("status") in FINAL_STATUSES:
+                done.add(row["repo"].lower())
+    return done
+
+
+class ResultWriter:
+    """
+    Appends result records to a JSONL or CSV file, flushing after every record.
+    """
+
+    def __init__(self, path: str, fmt: str):
+        self.fmt = fmt
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "a", newline="")
+        self._csv = None
+        if fmt == "csv":
+            self._csv = csv.DictWriter(self._file, fieldnames=CSV_COLUMNS, extrasaction="ignore")
+            if new_file:
+                self._csv.writeheader()
+
+    def write(self, record: Dict[str, Any]):
+        if self._csv is not None:
+            row = {key: record.get(key) for key in ("repo", "status", "error", "total_score", "level", "scored_at")}
+            for category, column in CATEGORY_COLUMNS.items():
+                row[column] = (record.get("breakdown") or {}).get(category, {}).get("score")
+            row["weaknesses"] = "; ".join(sorted(record.get("weaknesses") or []))
+            self._csv.writerow(row)
+        else:
+            self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def _batches(lines: Iterable[str], done: Set[str], size: int, stats: Dict[str, int]) -> Iterator[List[str]]:
+    seen: Set[str] = set()
+    batch: List[str] = []
+    for line in lines:
+        parsed = parse_repo(line)
+        key = f"{parsed[0]}/{parsed[1]}".lower() if parsed else line.lower()
+        if key in done or key in seen:
+            stats["skipped"] += 1
+            continue
+        seen.add(key)
+        batch.append(line)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _prefetched(batches: Iterator[List[str]], lookahead: int) -> Iterator[List[str]]:
+    """
+    Passes batches through, prefetching metadata for the next `lookahead` lines at once.
+    """
+    buffered: Deque[List[str]] = deque()
+    while True:
+        if not buffered:
+            ahead: List[str] = []
+            for batch in batches:
+                buffered.append(batch)
+                ahead.extend(batch)
+                if len(ahead) >= lookahead:
+                    break
+            if not buffered:
+                return
+            prefetch_metadata(ahead)
+        yield buffered.popleft()
+
+
+def run(lines: Iterable[str], output: str, fmt: str, processes: int = 1, threads: int = 8,
+        cache_path: Optional[str] = None, cache_max_age: float = 0.0) -> Dict[str, int]:
+    """
+    Scores every repository in `lines` that has no final result in `output` yet.
+    Returns counts per outcome.
+    """
+    stats = {"ok": 0, "not_found": 0, "invalid": 0, "unavailable": 0, "error": 0, "skipped": 0}
+    done = completed_repos(output, fmt)
+    writer = ResultWriter(output, fmt)
+
+    executor: Executor
+    if processes > 1:
+        # Each process runs its own thread pool over batches; spawn avoids forking a threaded parent
+        executor = ProcessPoolExecutor(
+            max_workers=processes, mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker, initargs=(cache_path, cache_max_age, threads)
+        )
+        batch_size, slots = threads, processes * 2
+    else:
+        _init_worker(cache_path, cache_max_age, 1)
+        executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="score")
+        batch_size, slots = 1, threads * 2
+
+    pending: Set[Any] = set()
+    batches = _batches(lines, done, batch_size, stats)
+    if processes == 1:
+        batches = _prefetched(batches, _scoring.metadata_loader.max_batch)
+    resume_at = 0.0
+    started = time.monotonic()
+    last_report = started
+    try:
+        exhausted = False
+        while pending or not exhausted:
+            # Keep a bounded number of batches in flight so huge inputs stream through
+            while not exhausted and len(pending) < slots and time.time() >= resume_at:
+                batch = next(batches, None)
+                if batch is None:
+                    exhausted = True
+                    break
+                pending.add(executor.submit(score_batch, batch))
+            if not pending:
+                if not exhausted:
+                    time.sleep(max(0.0, min(resume_at - time.time(), 5.0)))
+                continue
+
+            finished, pending = wait(pending, timeout=5.0, return_when=FIRST_COMPLETED)
+            for future in finished:
+                for record in future.result():
+                    stats[record["status"]] += 1
+                    if record["status"] in FINAL_STATUSES:
+                        writer.write(record)
+                    elif record.get("retry_after"):
+                        # Rate limited or circuit open: stop submitting until GitHub should be back
+                        resume_at = max(resume_at, time.time() + float(record["retry_after"]))
+
+            now = time.monotonic()
+            if now - last_report >= 30:
+                scored = sum(stats[s] for s in FINAL_STATUSES)
+                logger.info(f"{scored} scored ({scored / (now - started):.1f}/s), "
+                            f"{stats['unavailable'] + stats['error']} to retry, {stats['skipped']} skipped")
+                last_report = now
+    except KeyboardInterrupt:
+        logger.warning("Interrupted; finished results are saved and the next run resumes from them")
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        writer.close()
+    executor.shutdown(wait=True)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score GitHub repositories in bulk.")
+    parser.add_argument("input", help="file with one repository URL (or owner/name) per line, or - for stdin")
+    parser.add_argument("-o", "--output", required=True, help="results file (.jsonl or .csv); also the resume checkpoint")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="output format (default: from the file extension)")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes (default 1)")
+    parser.add_argument("--threads", type=int, default=8, help="concurrent analyses per process (default 8)")
+    parser.add_argument("--cache", default=os.getenv("GITHUB_RESPONSE_CACHE"),
+                        help="SQLite file for caching GitHub responses across processes and runs")
+    parser.add_argument("--cache-max-age", type=float, default=0.0,
+                        help="seconds a cached response is used without revalidation (default 0: always revalidate)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    fmt = args.format or ("csv" if args.output.lower().endswith(".csv") else "jsonl")
+    stream = sys.stdin if args.input == "-" else open(args.input)
+    try:
+        stats = run(read_repos(stream), args.output, fmt, processes=max(1, args.processes),
+                    threads=max(1, args.threads), cache_path=args.cache, cache_max_age=args.cache_max_age)
+    except KeyboardInterrupt:
+        sys.exit(130)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+    print(json.dumps(stats))
+    # Non-zero when some repositories still need another run
+    sys.exit(1 if stats["unavailable"] or stats["error"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .metrics_service import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ("value", "stored_at", "expires_at")
+
+    def __init__(self, value: Dict[str, Any], stored_at: float, expires_at: float):
+        self.value = value
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+
+
+class AnalysisCache:
+    """
+    TTL + LRU cache of analyze_repository results keyed by owner/repo.
+
+    Also tracks an exponentially decaying request frequency per repository so a
+    refresher can keep the most popular entries warm, and can snapshot itself to
+    disk so a freshly started worker serves popular repositories immediately.
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[int] = None,
+        max_entries: int = 2000,
+        frequency_half_life: float = 3600.0,
+        max_tracked: int = 10000
+    ):
+        self.ttl = ttl or int(os.getenv("ANALYSIS_CACHE_TTL", "900"))
+        self.max_entries = max_entries
+        self.frequency_half_life = frequency_half_life
+        self.max_tracked = max_tracked
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._frequency: Dict[str, Tuple[float, float]] = {}  # key -> (decayed count, last update)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(owner: str, repo: str) -> str:
+        return f"{owner}/{repo}".lower()
+
+    def get(self, owner: str, repo: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns a fresh cached analysis, counting the lookup as a user request.
+        """
+        key = self.key(owner, repo)
+        now = time.time()
+        with self._lock:
+            self._touch_frequency(key, now)
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                # Keep expired entries until LRU eviction so the refresher can still renew them
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        metrics.record_cache("analysis", entry is not None)
+        return entry.value if entry is not None else None
+
+    def peek(self, owner: str, repo: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns a fresh cached analysis without affecting frequency, recency or metrics.
+        """
+        with self._lock:
+            entry = self._entries.get(self.key(owner, repo))
+        if entry is None or entry.expires_at <= time.time():
+            return None
+        return entry.value
+
+    def put(self, owner: str, repo: str, value: Dict[str, Any], ttl: Optional[int] = None):
+        now = time.time()
+        key = self.key(owner, repo)
+        with self._lock:
+            self._entries[key] = _Entry(value, now, now + (ttl or self.ttl))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, owner: str, repo: str):
+        with self._lock:
+            self._entries.pop(self.key(owner, repo), None)
+
+    def _touch_frequency(self, key: str, now: float, amount: float = 1.0):
+        count, last = self._frequency.get(key, (0.0, now))
+        self._frequency[key] = (self._decay(count, now - last) + amount, now)
+        if len(self._frequency) > self.max_tracked:
+            # Drop the coldest half in one go so pruning stays amortized O(1)
+            ranked = sorted(self._frequency.items(), key=lambda kv: self._decay(kv[1][0], now - kv[1][1]))
+            for cold_key, _ in ranked[:len(ranked) // 2]:
+                del self._frequency[cold_key]
+
+    def _decay(self, count: float, elapsed: float) -> float:
+        return count * 0.5 ** (elapsed / self.frequency_half_life)
+
+    def hottest(self, n: int) -> List[str]:
+        """
+        Returns the n most frequently requested repository keys.
+        """
+        now = time.time()
+        with self._lock:
+            scored = [(self._decay(count, now - last), key) for key, (count, last) in self._frequency.items()]
+        scored.sort(reverse=True)
+        return [key for _, key in scored[:n]]
+
+    def due_for_refresh(self, n: int, refresh_window: float) -> List[str]:
+        """
+        Returns the keys among the hottest n whose cached entries expire within
+        the refresh window, hottest first.
+        """
+        deadline = time.time() + refresh_window
+        due = []
+        for key in self.hottest(n):
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= deadline:
+                due.append(key)
+        return due
+
+    def save_snapshot(self, path: str):
+        """
+        Atomically writes fresh entries and request frequencies to disk as JSON.
+        """
+        now = time.time()
+        with self._lock:
+            entries = [
+                {"key": key, "value": e.value, "stored_at": e.stored_at, "expires_at": e.expires_at}
+                for key, e in self._entries.items() if e.expires_at > now
+            ]
+            frequency = {key: self._decay(count, now - last) for key, (count, last) in self._frequency.items()}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": 1, "saved_at": now, "entries": entries, "frequency": frequency}, f)
+        os.replace(tmp_path, path)
+        logger.info(f"Saved analysis cache snapshot with {len(entries)} entries to {path}")
+
+    def load_snapshot(self, path: str) -> int:
+        """
+        Loads unexpired entries and frequencies from a snapshot. Returns the number of entries loaded.
+        """
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable analysis cache snapshot {path}: {e}")
+            return 0
+
+        now = time.time()
+        loaded = 0
+        with self._lock:
+            for item in snapshot.get("entries", []):
+                if item["expires_at"] > now and item["key"] not in self._entries:
+                    self._entries[item["key"]] = _Entry(item["value"], item["stored_at"], item["expires_at"])
+                    loaded += 1
+            for key, count in snapshot.get("frequency", {}).items():
+                self._frequency.setdefault(key, (count, now))
+        logger.info(f"Loaded {loaded} analysis cache entries from {path}")
+        return loaded
+
+
+class CacheRefresher:
+    """
+    Background thread that re-analyzes the hottest repositories shortly before
+    their cache entries expire, and periodically snapshots the cache to disk.
+    """
+
+    def __init__(
+        self,
+        cache: AnalysisCache,
+        analyze: Callable[[str, str], Dict[str, Any]],
+        top_n: Optional[int] = None,
+        refresh_window: float = 120.0,
+        interval: float = 30.0,
+        snapshot_path: Optional[str] = None,
+        snapshot_interval: float = 300.0
+    ):
+        self.cache = cache
+        self.analyze = analyze
+        self.top_n = top_n or int(os.getenv("CACHE_REFRESH_TOP_N", "20"))
+        self.refresh_window = refresh_window
+        self.interval = interval
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="cache-refresher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def refresh_once(self) -> int:
+        """
+        Refreshes every hot entry that is about to expire. Returns how many were refreshed.
+        """
+        refreshed = 0
+        for key in self.cache.due_for_refresh(self.top_n, self.refresh_window):
+            if self._stop.is_set():
+                break
+            owner, repo = key.split("/", 1)
+            try:
+                repo_data = self.analyze(owner, repo)
+            except Exception as e:
+                logger.warning(f"Refresh-ahead failed for {key}: {e}")
+                continue
+            if "error" not in repo_data:
+                self.cache.put(owner, repo, repo_data)
+                refreshed += 1
+        return refreshed
+
+    def _run(self):
+        last_snapshot = time.time()
+        while not self._stop.wait(self.interval):
+            refreshed = self.refresh_once()
+            if refreshed:
+                logger.info(f"Refresh-ahead re-analyzed {refreshed} popular repositories")
+            if self.snapshot_path and time.time() - last_snapshot >= self.snapshot_interval:
+                try:
+                    self.cache.save_snapshot(self.snapshot_path)
+                except OSError as e:
+                    logger.warning(f"Could not write analysis cache snapshot: {e}")
+                last_snapshot = time.time()
+
+
+# Endpoints addressed by object SHA never change, so cached copies need no revalidation
+_IMMUTABLE_ENDPOINT = re.compile(r"^repos/[^/]+/[^/]+/git/(?:blobs/[0-9a-f]{40}$|trees/[0-9a-f]{40}(?:\?|$))")
+
+
+class ResponseCache:
+    """
+    Cache of GitHub API JSON responses keyed by endpoint and query parameters.
+
+    Entries live in a small in-memory LRU in front of an optional SQLite file,
+    which several processes can share (WAL mode). Entries younger than `max_age`
+    seconds and SHA-addressed objects are served without a request; older ones
+    are revalidated with If-None-Match, and a 304 does not count against the
+    rate limit.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_age: float = 0.0, max_memory_entries: int = 256):
+        self.path = path
+        self.max_age = max_age
+        self.max_memory_entries = max_memory_entries
+        self._memory: "OrderedDict[str, Tuple[Optional[str], Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+
+    @staticmethod
+    def key(endpoint: str, params: Optional[Dict[str, Any]] = None) -> str:
+        if not params:
+            return endpoint
+        return endpoint + "#" + "&".join(f"{k}={params[k]}" for k in sorted(params))
+
+    @staticmethod
+    def is_immutable(endpoint: str) -> bool:
+        return _IMMUTABLE_ENDPOINT.match(endpoint) is not None
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        # Connections must not cross a fork; reopen in each process (caller holds the lock)
+        if self.path is None:
+            return None
+        if self._conn is None or self._conn_pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, etag TEXT, body BLOB NOT NULL, stored_at REAL NOT NULL)"
+            )
+            conn.commit()
+            self._conn, self._conn_pid = conn, os.getpid()
+        return self._conn
+
+    def _remember(self, key: str, entry: Tuple[Optional[str], Any, float]):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Tuple[Optional[str], Any, float]]:
+        """
+        Returns (etag, body, stored_at) for a cached response, or None.
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+            conn = self._connection()
+            if conn is None:
+                return None
+            row = conn.execute("SELECT etag, body, stored_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            try:
+                entry = (row[0], json.loads(zlib.decompress(row[1])), row[2])
+            except (zlib.error, ValueError):
+                return None
+            self._remember(key, entry)
+            return entry
+
+    def is_fresh(self, endpoint: str, stored_at: float) -> bool:
+        return self.is_immutable(endpoint) or (self.max_age > 0 and time.time() - stored_at < self.max_age)
+
+    def put(self, key: str, etag: Optional[str], body: Any):
+        entry = (etag, body, time.time())
+        with self._lock:
+            self._remember(key, entry)
+            conn = self._connection()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, etag, body, stored_at) VALUES (?, ?, ?, ?)",
+                    (key, etag, zlib.compress(json.dumps(body).encode(), 1), entry[2])
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not store cached GitHub response: {e}")
+
+    def touch(self, key: str):
+        """
+        Marks a revalidated (304) entry as fresh again.
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            now = time.time()
+            if entry is not None:
+                self._memory[key] = (entry[0], entry[1], now)
+            conn = self._connection()
+            if conn is None:
+                return
+            try:
+                conn.execute("UPDATE responses SET stored_at = ? WHERE key = ?", (now, key))
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not refresh cached GitHub response: {e}")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._conn_pid == os.getpid():
+                self._conn.close()
+            self._conn = None
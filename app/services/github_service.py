@@ -1,10 +1,19 @@
 import os
 import requests
 import logging
+import threading
 import time
-from typing import Dict, List, Optional, Union, Any
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Dict, Iterator, List, Optional, Tuple, Union, Any
 from dotenv import load_dotenv
 
+from .cache_service import ResponseCache
+from .metrics_service import metrics
+from .profiling_service import profiled
+from ..utils.helpers import CircuitBreaker, Deadline, backoff_delay, last_page, parse_retry_after
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -12,19 +21,62 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+# Responses that indicate a transient GitHub-side failure worth retrying
+RETRYABLE_STATUSES = {500, 502, 503, 504}
+
+# Repository fields requested in bulk over GraphQL; see GitHubService._rest_metadata for the REST names
+_REPO_METADATA_FRAGMENT = """
+fragment RepoMetadata on Repository {
+  name nameWithOwner url description isFork isArchived isPrivate isEmpty diskUsage
+  pushedAt stargazerCount forkCount
+  owner { login }
+  defaultBranchRef { name }
+  primaryLanguage { name }
+  parent { name nameWithOwner owner { login } defaultBranchRef { name } }
+  templateRepository { nameWithOwner }
+}
+"""
+# Set while a Prefetcher fetches: responses then also land in the `prefetched` cache
+_prefetching: ContextVar[bool] = ContextVar("prefetching", default=False)
+_CIRCUIT_STATE_VALUES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+
+class GitHubUnavailableError(Exception):
+    """
+    GitHub could not be reached in time: retries exhausted, circuit open or
+    rate limit exhausted. `retry_after` hints when trying again makes sense.
+    """
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(GitHubUnavailableError):
+    """
+    The current deadline expired before GitHub answered.
+    """
+
+
 class GitHubService:
     """
     Service to interact with GitHub REST API safely and securely.
     """
     
-    BASE_URL = "https://api.github.com"
+    # Overridable so load tests can point the service at a local GitHub stand-in
+    BASE_URL = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
     
-    def __init__(self, token: Optional[str] = None):
+    def __init__(self, token: Optional[str] = None, response_cache: Optional[ResponseCache] = None,
+                 prefetched: Optional[ResponseCache] = None):
         """
         Initialize the GitHubService with a token.
         If no token is provided, tries to load GITHUB_TOKEN from environment.
+        Pass a ResponseCache to reuse (and conditionally revalidate) earlier responses,
+        and `prefetched` to also serve the fresh responses a Prefetcher fetched.
         """
         self.token = token or os.getenv("GITHUB_TOKEN")
+        self.response_cache = response_cache
+        self.prefetched = prefetched
         if not self.token:
             logger.warning("GITHUB_TOKEN not found in environment variables. Rate limits will be restricted.")
             
@@ -37,54 +89,347 @@ class GitHubService:
         if self.token:
             self.session.headers.update({"Authorization": f"Bearer {self.token}"})
 
-    def _handle_rate_limit(self, response: requests.Response):
+        # Resilience settings: per-call timeouts, retries for transient failures,
+        # optional hedging of latency-critical calls and a circuit breaker
+        self.connect_timeout = float(os.getenv("GITHUB_CONNECT_TIMEOUT", "3.05"))
+        self.read_timeout = float(os.getenv("GITHUB_READ_TIMEOUT", "15"))
+        self.max_retries = int(os.getenv("GITHUB_MAX_RETRIES", "2"))
+        self.hedge_after = float(os.getenv("GITHUB_HEDGE_AFTER", "0"))  # seconds; 0 disables hedging
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv("GITHUB_BREAKER_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("GITHUB_BREAKER_RESET", "30")),
+            on_state_change=lambda state: metrics.github_circuit_state.set(value=_CIRCUIT_STATE_VALUES[state])
+        )
+        self._hedge_pool: Optional[ThreadPoolExecutor] = None
+        self._hedge_pool_lock = threading.Lock()
+
+    @staticmethod
+    @contextmanager
+    def prefetching() -> Iterator[None]:
+        """
+        Within this scope fresh responses are also stored in `prefetched`, where
+        later analyses on any thread pick them up.
+        """
+        token = _prefetching.set(True)
+        try:
+            yield
+        finally:
+            _prefetching.reset(token)
+
+    def _handle_rate_limit(self, response: requests.Response, deadline: Optional[Deadline] = None):
         """
         Check for rate limit headers and sleep if necessary.
-        This is a basic implementation. For production, consider using a task queue or more sophisticated backoff.
+        Raises GitHubUnavailableError instead if the wait would outlast the deadline.
         """
-        if response.status_code == 403 and "rate limit" in response.text.lower():
-            # Check for reset time
-            reset_time = int(response.headers.get("X-RateLimit-Reset", 0))
-            current_time = int(time.time())
-            sleep_time = reset_time - current_time + 1
+        if response.status_code in (403, 429) and ("rate limit" in response.text.lower() or "Retry-After" in response.headers):
+            # Secondary rate limits say how long to wait; primary ones when the quota resets
+            sleep_time = parse_retry_after(response.headers.get("Retry-After"))
+            if sleep_time is None:
+                reset_time = int(response.headers.get("X-RateLimit-Reset", 0))
+                current_time = int(time.time())
+                sleep_time = reset_time - current_time + 1
             if sleep_time > 0:
+                if deadline is not None and sleep_time >= deadline.remaining():
+                    raise GitHubUnavailableError("GitHub API rate limit exceeded", retry_after=sleep_time)
                 logger.warning(f"Rate limit exceeded. Sleeping for {sleep_time} seconds.")
                 time.sleep(sleep_time)
                 return True
         return False
 
-    def _make_request(self, endpoint: str, params: Optional[Dict] = None) -> Optional[Union[Dict, List]]:
+    @staticmethod
+    def _endpoint_label(endpoint: str) -> str:
+        """
+        Collapses an endpoint path into a low-cardinality metric label,
+        e.g. 'repos/octocat/hello/git/trees/main?recursive=1' -> 'repos/{owner}/{repo}/git/trees'.
+        """
+        parts = endpoint.split("?", 1)[0].strip("/").split("/")
+        if parts[0] != "repos" or len(parts) < 3:
+            return parts[0]
+        label = "repos/{owner}/{repo}"
+        if len(parts) > 3:
+            # Keep the resource name (and the git object type) but drop refs, SHAs and paths
+            label += "/" + "/".join(parts[3:5] if parts[3] == "git" else parts[3:4])
+        return label
+
+    def _record_rate_limit(self, response: requests.Response):
+        """
+        Exports the quota headers GitHub attaches to every response.
+        """
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        if remaining is None:
+            return
+        resource = response.headers.get("X-RateLimit-Resource", "core")
+        try:
+            metrics.github_rate_limit_remaining.set(resource, value=int(remaining))
+            metrics.github_rate_limit_reset.set(resource, value=int(response.headers.get("X-RateLimit-Reset", 0)))
+        except ValueError:
+            pass
+
+    def _timed_get(self, endpoint: str, url: str, params: Optional[Dict] = None, timeout=None,
+                   headers: Optional[Dict[str, str]] = None, body: Optional[Dict] = None) -> requests.Response:
+        """
+        Issues a GET (a POST of `body` as JSON, if given) and records latency,
+        status, body size and quota for the endpoint.
+        """
+        label = self._endpoint_label(endpoint)
+        metrics.github_in_flight.inc()
+        start = time.perf_counter()
+        status = "error"
+        try:
+            if body is not None:
+                response = self.session.post(url, params=params, json=body, timeout=timeout, headers=headers)
+            else:
+                response = self.session.get(url, params=params, timeout=timeout, headers=headers)
+            status = str(response.status_code)
+            return response
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.github_in_flight.dec()
+            metrics.github_request_duration.observe(label, value=elapsed)
+            metrics.add_request_timing("github", elapsed)
+            metrics.github_requests.inc(label, status)
+            if status != "error":
+                metrics.github_response_size.observe(label, value=len(response.content))
+                self._record_rate_limit(response)
+
+    def _hedged_get(self, endpoint: str, url: str, params: Optional[Dict], timeout,
+                    headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """
+        Issues the GET and, if no answer arrives within `hedge_after` seconds, a
+        duplicate. Returns the first usable response; the slower one is discarded.
+        """
+        with self._hedge_pool_lock:
+            if self._hedge_pool is None:
+                workers = int(os.getenv("GITHUB_HEDGE_WORKERS", "16"))
+                self._hedge_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="github-hedge")
+        # Each attempt runs in a copy of the caller's context so request timings are still attributed
+        attempts = [self._hedge_pool.submit(copy_context().run, profiled, self._timed_get, endpoint, url, params, timeout, headers)]
+        done, _ = wait(attempts, timeout=self.hedge_after)
+        if not done:
+            metrics.github_hedged_requests.inc(self._endpoint_label(endpoint))
+            attempts.append(self._hedge_pool.submit(copy_context().run, profiled, self._timed_get, endpoint, url, params, timeout, headers))
+
+        pending = set(attempts)
+        fallback: Optional[requests.Response] = None
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                response = future.result()
+                if response.status_code not in RETRYABLE_STATUSES:
+                    return response
+                fallback = response
+        if fallback is not None:
+            return fallback
+        raise error
+
+    def _timeout(self, deadline: Optional[Deadline]):
+        """
+        (connect, read) timeouts for one call, shortened to fit the current deadline.
+        """
+        if deadline is None:
+            return (self.connect_timeout, self.read_timeout)
+        remaining = deadline.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"Deadline of {deadline.seconds:g}s exceeded")
+        return (min(self.connect_timeout, remaining), min(self.read_timeout, remaining))
+
+    def _make_request(self, endpoint: str, params: Optional[Dict] = None, hedge: bool = False,
+                      body: Optional[Dict] = None, with_link: bool = False) -> Optional[Union[Dict, List]]:
         """
         Internal method to make GET requests with error handling and rate limit management.
+        With a `body` the request is a (never cached) JSON POST instead. With `with_link`
+        the result is {"body": ..., "link": Link header}, cached as a whole.
+        Transient failures (timeouts, connection errors, 5xx) are retried with jittered
+        backoff within the current deadline; GitHubUnavailableError is raised once
+        retries are exhausted or while the circuit breaker is open.
+        """
+        if self.prefetched is not None and body is None:
+            prefetch_key = self.prefetched.key(endpoint, params) + ("#link" if with_link else "")
+            entry = self.prefetched.get(prefetch_key)
+            fresh = entry is not None and self.prefetched.is_fresh(endpoint, entry[2])
+            if _prefetching.get():
+                if fresh:
+                    return entry[1]
+                result = self._fetch(endpoint, params, hedge, None, with_link)
+                if result is not None:
+                    self.prefetched.put(prefetch_key, None, result)
+                return result
+            metrics.record_cache("prefetch", fresh)
+            if fresh:
+                return entry[1]
+        return self._fetch(endpoint, params, hedge, body, with_link)
+
+    def _fetch(self, endpoint: str, params: Optional[Dict], hedge: bool, body: Optional[Dict],
+               with_link: bool) -> Optional[Union[Dict, List]]:
+        """
+        _make_request() past the prefetched responses: the (conditional) request itself.
         """
         url = f"{self.BASE_URL}/{endpoint}"
-        try:
-            response = self.session.get(url, params=params)
-            
-            # Handle rate limiting (simple retry logic for demonstration)
-            if response.status_code == 403:
-                if self._handle_rate_limit(response):
-                    # Retry once after sleeping
-                    response = self.session.get(url, params=params)
-
-            response.raise_for_status()
-            return response.json()
-            
-        except requests.exceptions.HTTPError as ignored:
-            if response.status_code == 404:
-                logger.error(f"Resource not found: {url}")
-                return None
-            logger.error(f"HTTP Error fetching {url}: {ignored}")
-            raise
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Request failed: {e}")
-            raise
+        label = self._endpoint_label(endpoint)
+
+        cache_key, cached, headers = None, None, None
+        if self.response_cache is not None and body is None:
+            cache_key = self.response_cache.key(endpoint, params) + ("#link" if with_link else "")
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                if self.response_cache.is_fresh(endpoint, cached[2]):
+                    metrics.record_cache("github_response", True)
+                    return cached[1]
+                if cached[0]:
+                    headers = {"If-None-Match": cached[0]}
+
+        deadline = Deadline.current()
+        attempt = 0
+        rate_limit_retried = False
+        while True:
+            # Before allow(): a spent deadline must not take the half-open trial slot
+            timeout = self._timeout(deadline)
+            if not self.breaker.allow():
+                metrics.github_requests.inc(label, "short_circuit")
+                raise GitHubUnavailableError("GitHub API is unavailable (circuit open)", retry_after=self.breaker.retry_after())
+
+            try:
+                if hedge and self.hedge_after > 0:
+                    response = self._hedged_get(endpoint, url, params, timeout, headers)
+                else:
+                    response = self._timed_get(endpoint, url, params, timeout, headers, body)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self.breaker.record_failure()
+                failure = e.__class__.__name__
+            except requests.exceptions.RequestException as e:
+                self.breaker.record_failure()
+                logger.error(f"Request failed: {e}")
+                raise
+            except BaseException:
+                # No outcome to record (e.g. interrupted); free the trial slot
+                self.breaker.release()
+                raise
+            else:
+                if response.status_code in RETRYABLE_STATUSES:
+                    self.breaker.record_failure()
+                    failure = str(response.status_code)
+                else:
+                    self.breaker.record_success()
+                    # Handle rate limiting (retry once after sleeping)
+                    if not rate_limit_retried and self._handle_rate_limit(response, deadline):
+                        rate_limit_retried = True
+                        continue
+                    if response.status_code == 304 and cached is not None:
+                        metrics.record_cache("github_response", True)
+                        self.response_cache.touch(cache_key)
+                        return cached[1]
+                    try:
+                        response.raise_for_status()
+                    except requests.exceptions.HTTPError as ignored:
+                        if response.status_code == 404:
+                            logger.error(f"Resource not found: {url}")
+                            return None
+                        logger.error(f"HTTP Error fetching {url}: {ignored}")
+                        raise
+                    result = response.json()
+                    if with_link:
+                        result = {"body": result, "link": response.headers.get("Link")}
+                    if cache_key is not None:
+                        metrics.record_cache("github_response", False)
+                        self.response_cache.put(cache_key, response.headers.get("ETag"), result)
+                    return result
+
+            attempt += 1
+            if attempt > self.max_retries:
+                logger.error(f"GitHub request failed after {attempt} attempts ({failure}): {url}")
+                raise GitHubUnavailableError(f"GitHub API request failed ({failure})", retry_after=self.breaker.retry_after() or None)
+            delay = backoff_delay(attempt)
+            if deadline is not None and delay >= deadline.remaining():
+                raise DeadlineExceeded(f"Deadline of {deadline.seconds:g}s exceeded while retrying {label}")
+            metrics.github_retries.inc(label, failure)
+            logger.warning(f"Retrying {url} in {delay:.2f}s after {failure} (attempt {attempt}/{self.max_retries})")
+            time.sleep(delay)
 
     def get_repo_metadata(self, owner: str, repo: str) -> Optional[Dict[str, Any]]:
         """
         Fetch repository metadata (stars, forks, description, etc.)
         """
-        return self._make_request(f"repos/{owner}/{repo}")
+        return self._make_request(f"repos/{owner}/{repo}", hedge=True)
+
+    # Aliased repository nodes per GraphQL query
+    MAX_METADATA_BATCH = 100
+
+    @staticmethod
+    def _rest_metadata(node: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Maps a GraphQL repository node onto the fields get_repo_metadata callers read.
+        """
+        metadata: Dict[str, Any] = {
+            "name": node["name"],
+            "full_name": node["nameWithOwner"],
+            "owner": {"login": node["owner"]["login"]},
+            "html_url": node.get("url"),
+            "description": node.get("description"),
+            "fork": node.get("isFork", False),
+            "archived": node.get("isArchived", False),
+            "private": node.get("isPrivate", False),
+            "size": 0 if node.get("isEmpty") else node.get("diskUsage") or 0,
+            "pushed_at": node.get("pushedAt"),
+            "stargazers_count": node.get("stargazerCount", 0),
+            "forks_count": node.get("forkCount", 0),
+            "language": (node.get("primaryLanguage") or {}).get("name"),
+        }
+        if node.get("defaultBranchRef"):
+            metadata["default_branch"] = node["defaultBranchRef"]["name"]
+        parent = node.get("parent")
+        if parent:
+            metadata["parent"] = {"name": parent["name"], "full_name": parent["nameWithOwner"],
+                                  "owner": {"login": parent["owner"]["login"]}}
+            if parent.get("defaultBranchRef"):
+                metadata["parent"]["default_branch"] = parent["defaultBranchRef"]["name"]
+        if node.get("templateRepository"):
+            metadata["template_repository"] = {"full_name": node["templateRepository"]["nameWithOwner"]}
+        return metadata
+
+    def get_repos_metadata(self, repos: List[Tuple[str, str]]) -> Optional[Dict[Tuple[str, str], Optional[Dict[str, Any]]]]:
+        """
+        Fetch the metadata of up to MAX_METADATA_BATCH repositories with one GraphQL query.
+        Maps each (owner, repo) to get_repo_metadata-style fields, or None if it does
+        not exist. Repositories the query could not answer otherwise are left out, and
+        None is returned if it could not run at all (GraphQL requires a token).
+        """
+        if not self.token or not repos:
+            return None
+        repos = repos[:self.MAX_METADATA_BATCH]
+        variables: Dict[str, str] = {}
+        for i, (owner, repo) in enumerate(repos):
+            variables[f"o{i}"], variables[f"n{i}"] = owner, repo
+        query = (
+            "query(" + ", ".join(f"$o{i}: String!, $n{i}: String!" for i in range(len(repos))) + ") {\n"
+            + "\n".join(f"  r{i}: repository(owner: $o{i}, name: $n{i}) {{ ...RepoMetadata }}" for i in range(len(repos)))
+            + "\n}\n" + _REPO_METADATA_FRAGMENT
+        )
+        result = self._make_request("graphql", body={"query": query, "variables": variables})
+        data = result.get("data") if isinstance(result, dict) else None
+        if not data:
+            return None
+        # Errors name the alias they belong to; only NOT_FOUND means the repository is absent
+        failed = {str(error["path"][0]): error.get("type") for error in result.get("errors") or [] if error.get("path")}
+        metadata: Dict[Tuple[str, str], Optional[Dict[str, Any]]] = {}
+        for i, key in enumerate(repos):
+            node = data.get(f"r{i}")
+            if node is not None:
+                metadata[key] = self._rest_metadata(node)
+            elif failed.get(f"r{i}", "NOT_FOUND") == "NOT_FOUND":
+                metadata[key] = None
+        return metadata
+
+    def list_account_repos(self, account: str, page: int = 1, per_page: int = 100) -> Optional[List[Dict[str, Any]]]:
+        """
+        Fetch one page of an account's public repositories, most recently pushed first.
+        Works for both users and organizations. Returns None if the account does not exist.
+        """
+        params = {"type": "owner", "sort": "pushed", "page": page, "per_page": per_page}
+        return self._make_request(f"users/{account}/repos", params=params)
 
     def get_repo_contents(self, owner: str, repo: str, path: str = "") -> Optional[Union[Dict, List]]:
         """
@@ -93,16 +438,71 @@ class GitHubService:
         """
         return self._make_request(f"repos/{owner}/{repo}/contents/{path}")
 
-    def get_commit_history(self, owner: str, repo: str, page: int = 1, per_page: int = 30) -> List[Dict[str, Any]]:
+    def get_commit_history(self, owner: str, repo: str, page: int = 1, per_page: int = 30,
+                           since: Optional[str] = None) -> List[Dict[str, Any]]:
         """
-        Fetch commit history with pagination.
+        Fetch commit history with pagination, optionally only commits after `since` (ISO 8601).
         """
         params = {"page": page, "per_page": per_page}
+        if since:
+            params["since"] = since
         result = self._make_request(f"repos/{owner}/{repo}/commits", params=params)
         if isinstance(result, list):
             return result
         return []
 
+    def head_unchanged(self, owner: str, repo: str, sha: str) -> bool:
+        """
+        Whether the default branch's HEAD is still `sha`. Asks for the bare SHA with
+        If-None-Match, which GitHub answers with a 304 that does not count against the
+        rate limit. Not retried: any failure answers False, leaving the caller to
+        fetch what it needs the usual way.
+        """
+        endpoint = f"repos/{owner}/{repo}/commits/HEAD"
+        try:
+            timeout = self._timeout(Deadline.current())
+        except DeadlineExceeded:
+            return False
+        if not self.breaker.allow():
+            return False
+        headers = {"Accept": "application/vnd.github.sha", "If-None-Match": f'"{sha}"'}
+        try:
+            response = self._timed_get(endpoint, f"{self.BASE_URL}/{endpoint}", timeout=timeout, headers=headers)
+        except requests.exceptions.RequestException as e:
+            self.breaker.record_failure()
+            logger.warning(f"Could not check the HEAD of {owner}/{repo}: {e}")
+            return False
+        except BaseException:
+            self.breaker.release()
+            raise
+        if response.status_code in RETRYABLE_STATUSES:
+            self.breaker.record_failure()
+            return False
+        self.breaker.record_success()
+        if response.status_code == 304:
+            return True
+        return response.status_code == 200 and response.text.strip() == sha
+
+    def get_commit_history_page(self, owner: str, repo: str, page: int = 1,
+                                per_page: int = 100) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Fetch one page of commit history together with the number of the last page
+        (from the Link header; None when there is no later page).
+        """
+        params = {"page": page, "per_page": per_page}
+        result = self._make_request(f"repos/{owner}/{repo}/commits", params=params, with_link=True)
+        if not result or not isinstance(result.get("body"), list):
+            return [], None
+        return result["body"], last_page(result.get("link"))
+
+    def compare_commits(self, owner: str, repo: str, base: str, head: str) -> Optional[Dict[str, Any]]:
+        """
+        Compare two commits (three-dot: changes on head since the merge base).
+        Refs in other repositories of the fork network use the 'owner:branch' form.
+        Lists at most 250 commits and 300 changed files.
+        """
+        return self._make_request(f"repos/{owner}/{repo}/compare/{base}...{head}")
+
     def get_languages(self, owner: str, repo: str) -> Optional[Dict[str, int]]:
         """
         Fetch languages used in the repository and their byte counts.
@@ -114,7 +514,22 @@ class GitHubService:
         Fetch the full git tree recursively.
         """
         recursive_flag = "1" if recursive else "0"
-        return self._make_request(f"repos/{owner}/{repo}/git/trees/{branch}?recursive={recursive_flag}")
+        return self._make_request(f"repos/{owner}/{repo}/git/trees/{branch}?recursive={recursive_flag}", hedge=True)
+
+    def get_blob(self, owner: str, repo: str, sha: str) -> Optional[bytes]:
+        """
+        Fetch the raw content of a blob by SHA (immutable, so safe to cache by SHA).
+        """
+        data = self._make_request(f"repos/{owner}/{repo}/git/blobs/{sha}")
+        if data and "content" in data:
+            import base64
+            try:
+                if data.get("encoding") == "base64":
+                    return base64.b64decode(data["content"])
+                return data["content"].encode("utf-8")
+            except Exception:
+                return None
+        return None
 
     def get_readme_content(self, owner: str, repo: str) -> Optional[str]:
         """
@@ -0,0 +1,235 @@
+from enum import IntFlag
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+
+class Weakness(IntFlag):
+    """
+    Stable weakness codes. An analysis' weaknesses form a bitset of these;
+    declaration order is also the order in which they are reported.
+    """
+
+    NO_README = 1 << 0
+    NO_TESTS = 1 << 1
+    NO_STANDARD_FOLDERS = 1 << 2
+    README_MISSING_SECTIONS = 1 << 3
+    NON_SEMANTIC_COMMITS = 1 << 4
+    NO_GITIGNORE = 1 << 5
+    ROOT_CONCENTRATION = 1 << 6
+    GENERIC_COMMIT_MESSAGES = 1 << 7
+    SINGLE_DAY_ACTIVITY = 1 << 8
+
+
+# Per code: the message shown to users, the score points fixing it is worth, a rough
+# effort estimate (hours), the simulation label and the roadmap advice (if any).
+# Weaknesses the score simulation has never priced are worth 0 points.
+WEAKNESS_TABLE: Dict[Weakness, Dict[str, Any]] = {
+    Weakness.NO_README: {
+        "message": "README.md file is absent",
+        "points": 20, "effort": 2,
+        "action": "Create comprehensive README documentation",
+        "roadmap": "Documentation First: Create a README.md immediately. Include installation steps, usage examples, and a clear project description. No code exists if it's not documented.",
+    },
+    Weakness.NO_TESTS: {
+        "message": "Testing framework not detected",
+        "points": 15, "effort": 6,
+        "action": "Implement automated test suite",
+        "roadmap": "Zero Tolerance for Untested Code: Set up pytest (or equivalent). Write unit tests for your core logic. Aim for at least 60% coverage before adding new features.",
+    },
+    Weakness.NO_STANDARD_FOLDERS: {
+        "message": "Standard architecture folders (src, app, utils) not detected",
+        "points": 10, "effort": 3,
+        "action": "Structure code into modular directories (src/)",
+        "roadmap": "Refactor Architecture: Move your source code into a `src` or `app` directory. Separate implementation from configuration. Don't dump files in the root.",
+    },
+    Weakness.README_MISSING_SECTIONS: {
+        "message": "Documentation omits 'Usage' or 'Installation' steps",
+        "points": 10, "effort": 1,
+        "action": "Document installation and usage steps",
+        "roadmap": None,
+    },
+    Weakness.NON_SEMANTIC_COMMITS: {
+        "message": "Commit messages do not follow semantic conventions (e.g., feat:, fix:)",
+        "points": 10, "effort": 1,
+        "action": "Adopt semantic commit message convention",
+        "roadmap": None,
+    },
+    Weakness.NO_GITIGNORE: {
+        "message": ".gitignore file is missing",
+        "points": 5, "effort": 1,
+        "action": "Add .gitignore to exclude build artifacts",
+        "roadmap": None,
+    },
+    Weakness.ROOT_CONCENTRATION: {
+        "message": "High file concentration in root directory",
+        "points": 0, "effort": 2,
+        "action": "Move source files out of the repository root",
+        "roadmap": None,
+    },
+    Weakness.GENERIC_COMMIT_MESSAGES: {
+        "message": "Generic commit messages detected (e.g., 'Update file')",
+        "points": 0, "effort": 1,
+        "action": "Replace generic commit messages with descriptive ones",
+        "roadmap": None,
+    },
+    Weakness.SINGLE_DAY_ACTIVITY: {
+        "message": "Activity concentrated in single day",
+        "points": 0, "effort": 4,
+        "action": "Spread development over several days",
+        "roadmap": "Show Consistency: Coding is a habit, not a sprint. Commit code on at least 3 separate days this week. Prove you can maintain a project over time.",
+    },
+}
+
+# Every phrasing a weakness has been reported with (including older ones), and the code names
+MESSAGE_CODES: Dict[str, Weakness] = {info["message"]: code for code, info in WEAKNESS_TABLE.items()}
+MESSAGE_CODES.update({code.name: code for code in WEAKNESS_TABLE})
+MESSAGE_CODES.update({
+    "CRITICAL: Missing README.md": Weakness.NO_README,
+    "No automated tests detected": Weakness.NO_TESTS,
+    "Missing standard folders (e.g., src, app, utils)": Weakness.NO_STANDARD_FOLDERS,
+    "Commit messages lack semantic prefixes (feat:, fix:)": Weakness.NON_SEMANTIC_COMMITS,
+    "Missing .gitignore (security/cleanliness risk)": Weakness.NO_GITIGNORE,
+})
+
+# Plain ints on the hot paths; IntFlag arithmetic is comparatively slow
+_BITS: List[Tuple[int, Weakness]] = [(code.value, code) for code in WEAKNESS_TABLE]
+_ALL = sum(value for value, _ in _BITS)
+
+# Points and effort of every subset of weaknesses, indexed by bitset (2^9 entries)
+_SUBSET_POINTS = [0] * (_ALL + 1)
+_SUBSET_EFFORT = [0] * (_ALL + 1)
+for _mask in range(1, _ALL + 1):
+    _low = _mask & -_mask
+    _SUBSET_POINTS[_mask] = _SUBSET_POINTS[_mask ^ _low] + WEAKNESS_TABLE[Weakness(_low)]["points"]
+    _SUBSET_EFFORT[_mask] = _SUBSET_EFFORT[_mask ^ _low] + WEAKNESS_TABLE[Weakness(_low)]["effort"]
+
+
+def encode_weaknesses(weaknesses: Iterable[Union[Weakness, str]]) -> int:
+    """
+    Bitset of the given codes, code names or messages; unknown strings are ignored.
+    """
+    mask = 0
+    for weakness in weaknesses:
+        code = weakness if isinstance(weakness, Weakness) else MESSAGE_CODES.get(weakness)
+        if code is not None:
+            mask |= code.value
+    return mask
+
+
+def decode_weaknesses(mask: int) -> List[Weakness]:
+    return [code for value, code in _BITS if mask & value]
+
+
+def weakness_messages(mask: int) -> List[str]:
+    return [WEAKNESS_TABLE[code]["message"] for code in decode_weaknesses(mask)]
+
+
+@lru_cache(maxsize=4096)
+def _frontier(mask: int, headroom: int) -> Tuple[Tuple[int, int, int], ...]:
+    """
+    Pareto frontier of the fixes for a weakness set: (effort, points, subset) with
+    strictly increasing effort and points. Points are capped at the headroom to 100.
+    Exact: every subset is considered (at most 2^9).
+    """
+    best: Dict[int, Tuple[int, int]] = {}  # effort -> (points, subset)
+    subset = mask
+    while True:
+        effort = _SUBSET_EFFORT[subset]
+        points = min(_SUBSET_POINTS[subset], headroom)
+        current = best.get(effort)
+        if current is None or points > current[0] or (points == current[0] and subset < current[1]):
+            best[effort] = (points, subset)
+        if subset == 0:
+            break
+        subset = (subset - 1) & mask
+
+    frontier: List[Tuple[int, int, int]] = []
+    for effort in sorted(best):
+        points, subset = best[effort]
+        if not frontier or points > frontier[-1][1]:
+            frontier.append((effort, points, subset))
+    return tuple(frontier)
+
+
+class ImprovementPlanner:
+    """
+    What-if planning over weakness bitsets: which fixes raise the score the most
+    within an effort budget. Solved exactly (0/1 knapsack) for one repository,
+    and as a group knapsack when a cohort shares one budget.
+    """
+
+    DEFAULT_BUDGET = 8
+
+    @staticmethod
+    def _actions(subset: int) -> List[Dict[str, Any]]:
+        actions = [
+            {"code": code.name, "action": WEAKNESS_TABLE[code]["action"],
+             "points": WEAKNESS_TABLE[code]["points"], "effort": WEAKNESS_TABLE[code]["effort"]}
+            for code in decode_weaknesses(subset)
+        ]
+        actions.sort(key=lambda a: (-a["points"] / a["effort"], -a["points"]))
+        return actions
+
+    def plan(self, mask: int, current_score: int, budget: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Best set of fixes for one repository within `budget` effort.
+        """
+        budget = self.DEFAULT_BUDGET if budget is None else max(0, budget)
+        headroom = max(0, 100 - current_score)
+        effort, points, subset = 0, 0, 0
+        for candidate in _frontier(mask & _ALL, headroom):
+            if candidate[0] > budget:
+                break
+            effort, points, subset = candidate
+        return {
+            "budget": budget,
+            "effort": effort,
+            "points_gain": points,
+            "projected_score": current_score + points,
+            "actions": self._actions(subset),
+        }
+
+    def plan_cohort(self, entries: List[Tuple[str, int, int]], budget: int) -> Dict[str, Any]:
+        """
+        Splits one effort budget across a cohort of (name, weakness bitset, score)
+        entries to maximize the total points gained. Exact group knapsack: each
+        repository contributes one point of its frontier.
+        """
+        budget = max(0, budget)
+        # best[b]: most points within total effort b over the repositories so far
+        best = [0] * (budget + 1)
+        choices: List[List[int]] = []  # per repository: frontier index chosen for each budget
+        frontiers = []
+        for _, mask, score in entries:
+            frontier = _frontier(mask & _ALL, max(0, 100 - score))
+            frontiers.append(frontier)
+            new_best = list(best)
+            choice = [0] * (budget + 1)
+            for b in range(budget + 1):
+                for index in range(1, len(frontier)):
+                    effort, points, _ = frontier[index]
+                    if effort > b:
+                        break
+                    value = best[b - effort] + points
+                    if value > new_best[b]:
+                        new_best[b], choice[b] = value, index
+            best = new_best
+            choices.append(choice)
+
+        # Smallest budget reaching the optimum, then walk the choices back
+        total = best[budget]
+        b = next(b for b in range(budget + 1) if best[b] == total)
+        repos = []
+        for (name, mask, score), frontier, choice in reversed(list(zip(entries, frontiers, choices))):
+            effort, points, subset = frontier[choice[b]]
+            b -= effort
+            if subset:
+                repos.append({"repo": name, "effort": effort, "points_gain": points,
+                              "projected_score": score + points, "actions": self._actions(subset)})
+        repos.reverse()
+        return {
+            "budget": budget,
+            "effort": sum(r["effort"] for r in repos),
+            "points_gain": total,
+            "repos": repos,
+        }
@@ -0,0 +1,119 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .github_service import DeadlineExceeded, GitHubService, GitHubUnavailableError
+from .metrics_service import metrics
+from ..utils.helpers import Deadline
+
+logger = logging.getLogger(__name__)
+
+Key = Tuple[str, str]
+
+# Result for repositories the bulk query could not answer; load() asks the REST API instead
+_UNANSWERED = object()
+
+
+class MetadataLoader:
+    """
+    Batches repository metadata lookups of concurrent analyses into bulk GraphQL
+    queries (dataloader style). Lookups issued within `window` seconds of each
+    other share one query of up to `max_batch` repositories; a full batch is sent
+    at once. Batch workloads can prefetch() the repositories they will analyze.
+    Repositories a query could not answer are fetched one by one over REST.
+    """
+
+    def __init__(self, github_service: GitHubService, max_batch: Optional[int] = None, window: Optional[float] = None):
+        self.github = github_service
+        self.max_batch = min(max_batch or int(os.getenv("METADATA_BATCH_SIZE", "100")), GitHubService.MAX_METADATA_BATCH)
+        self.window = window if window is not None else float(os.getenv("METADATA_BATCH_WINDOW_MS", "10")) / 1000
+        # Queued, in-flight and answered-but-unclaimed lookups; claimed ones are dropped by load()
+        self._futures: "OrderedDict[Key, Future]" = OrderedDict()
+        self._queue: Dict[Key, Key] = {}  # next batch: normalized key -> (owner, repo) as requested
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(owner: str, repo: str) -> Key:
+        return owner.lower(), repo.lower()
+
+    def prefetch(self, repos: Iterable[Tuple[str, str]]) -> List[Future]:
+        """
+        Schedules lookups without waiting for them. Returns one future per repository.
+        """
+        futures: List[Future] = []
+        full: List[Dict[Key, Key]] = []
+        with self._lock:
+            for owner, repo in repos:
+                key = self._key(owner, repo)
+                future = self._futures.get(key)
+                if future is None:
+                    future = self._futures[key] = Future()
+                    self._queue[key] = (owner, repo)
+                    if len(self._queue) >= self.max_batch:
+                        full.append(self._queue)
+                        self._queue = {}
+                futures.append(future)
+            self._evict()
+            if self._queue and self._timer is None:
+                self._timer = threading.Timer(self.window, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+        for batch in full:
+            threading.Thread(target=self._dispatch, args=(batch,), name="metadata-batch", daemon=True).start()
+        return futures
+
+    def load(self, owner: str, repo: str) -> Optional[Dict[str, Any]]:
+        """
+        Metadata of one repository as get_repo_metadata returns it (None if it does not exist).
+        Waits for the batch it joined, within the current deadline.
+        """
+        key = self._key(owner, repo)
+        future = self.prefetch([(owner, repo)])[0]
+        deadline = Deadline.current()
+        try:
+            result = future.result(timeout=max(0.0, deadline.remaining()) if deadline is not None else None)
+        except FutureTimeout:
+            raise DeadlineExceeded(f"Deadline of {deadline.seconds:g}s exceeded waiting for repository metadata")
+        finally:
+            with self._lock:
+                if future.done() and self._futures.get(key) is future:
+                    del self._futures[key]
+        if result is _UNANSWERED:
+            return self.github.get_repo_metadata(owner, repo)
+        return result
+
+    def _evict(self):
+        """
+        Drops the oldest answers nobody claimed once there are more than a few batches of them.
+        """
+        excess = len(self._futures) - 4 * self.max_batch
+        for key in [key for key, future in self._futures.items() if future.done()][:max(0, excess)]:
+            del self._futures[key]
+
+    def _flush(self):
+        with self._lock:
+            self._timer = None
+            batch, self._queue = self._queue, {}
+        if batch:
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: Dict[Key, Key]):
+        metrics.github_metadata_batch_size.observe(value=len(batch))
+        with self._lock:
+            # Still pending, so none of them can have been evicted
+            futures = {key: self._futures[key] for key in batch}
+        try:
+            results = self.github.get_repos_metadata(list(batch.values())) or {}
+        except GitHubUnavailableError as e:
+            for future in futures.values():
+                future.set_exception(e)
+            return
+        except Exception as e:
+            logger.warning(f"Bulk metadata query for {len(batch)} repositories failed, falling back to REST: {e}")
+            results = {}
+        for key, requested in batch.items():
+            futures[key].set_result(results.get(requested, _UNANSWERED))
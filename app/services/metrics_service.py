@@ -0,0 +1,330 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+# Latency buckets (seconds) tuned for GitHub round trips and pipeline stages.
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Size buckets (bytes) covering small JSON payloads up to large recursive trees.
+DEFAULT_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _format_labels(label_names: Tuple[str, ...], label_values: Tuple[str, ...], extra: str = "") -> str:
+    """
+    Renders a Prometheus label set, e.g. {endpoint="repos/{owner}/{repo}",le="0.5"}.
+    """
+    parts = []
+    for name, value in zip(label_names, label_values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{name}="{escaped}"')
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """
+    Base class for a labelled metric family.
+    Children are created lazily per label combination; a single lock guards updates
+    so recording stays a dict lookup plus a few arithmetic operations.
+    """
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Tuple[str, ...]) -> Tuple[str, ...]:
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {labels}")
+        return tuple(str(v) for v in labels)
+
+    def _header(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = self._header()
+        for key, value in items:
+            lines.append(f"{self.name}_total{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    metric_type = "gauge"
+
+    def set(self, *labels: str, value: float):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+    def get(self, *labels: str) -> Optional[float]:
+        with self._lock:
+            return self._values.get(self._key(labels))
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = self._header()
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """
+    Fixed-bucket histogram. Each child stores non-cumulative bucket counts; the
+    cumulative form Prometheus expects is only computed at scrape time.
+    """
+
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, *labels: str, value: float):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            child = self._values.get(key)
+            if child is None:
+                # [bucket counts..., +Inf count, sum]
+                child = [0] * (len(self.buckets) + 1) + [0.0]
+                self._values[key] = child
+            child[index] += 1
+            child[-1] += value
+
+    @contextmanager
+    def time(self, *labels: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(*labels, value=time.perf_counter() - start)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(child)) for key, child in self._values.items())
+        lines = self._header()
+        for key, child in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child[:-1]):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(child[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class RequestTimings:
+    """
+    Accumulates named durations for a single request and renders them as a
+    Server-Timing header. Repeated names (e.g. one 'github' entry per API call) are summed.
+    """
+
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, name: str, seconds: float):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def header(self) -> str:
+        entries = []
+        for name, seconds in self.durations.items():
+            entry = f"{name};dur={seconds * 1000:.1f}"
+            if self.counts[name] > 1:
+                entry += f';desc="{self.counts[name]} calls"'
+            entries.append(entry)
+        return ", ".join(entries)
+
+
+# Timings of the request being served in the current context (None outside a request)
+_current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("current_timings", default=None)
+
+
+class MetricsService:
+    """
+    In-process metrics registry rendered in the Prometheus text exposition format.
+    Metrics are per worker process; Prometheus aggregates across scraped instances.
+    """
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+        # GitHub API client
+        self.github_request_duration = self._register(Histogram(
+            "repomirror_github_request_duration_seconds",
+            "Latency of GitHub REST API calls by endpoint.",
+            ("endpoint",)))
+        self.github_requests = self._register(Counter(
+            "repomirror_github_requests",
+            "GitHub REST API calls by endpoint and HTTP status.",
+            ("endpoint", "status")))
+        self.github_response_size = self._register(Histogram(
+            "repomirror_github_response_size_bytes",
+            "Size of GitHub REST API response bodies by endpoint.",
+            ("endpoint",), buckets=DEFAULT_SIZE_BUCKETS))
+        self.github_in_flight = self._register(Gauge(
+            "repomirror_github_requests_in_flight",
+            "GitHub REST API calls currently awaiting a response."))
+        self.github_rate_limit_remaining = self._register(Gauge(
+            "repomirror_github_rate_limit_remaining",
+            "Remaining GitHub API quota reported by the last response.",
+            ("resource",)))
+        self.github_rate_limit_reset = self._register(Gauge(
+            "repomirror_github_rate_limit_reset_timestamp_seconds",
+            "Unix time at which the GitHub API quota resets.",
+            ("resource",)))
+        self.github_retries = self._register(Counter(
+            "repomirror_github_retries",
+            "GitHub REST API calls retried after a transient failure.",
+            ("endpoint", "reason")))
+        self.github_hedged_requests = self._register(Counter(
+            "repomirror_github_hedged_requests",
+            "Duplicate GitHub API calls issued because the first was slow.",
+            ("endpoint",)))
+        self.github_metadata_batch_size = self._register(Histogram(
+            "repomirror_github_metadata_batch_size",
+            "Repositories per bulk GraphQL metadata query.",
+            buckets=(1, 2, 5, 10, 25, 50, 100)))
+        self.webhook_deliveries = self._register(Counter(
+            "repomirror_webhook_deliveries",
+            "GitHub webhook deliveries processed, by event and resulting action.",
+            ("event", "action")))
+        self.github_circuit_state = self._register(Gauge(
+            "repomirror_github_circuit_state",
+            "GitHub API circuit breaker state (0 closed, 1 half-open, 2 open)."))
+
+        # Analysis pipeline
+        self.stage_duration = self._register(Histogram(
+            "repomirror_stage_duration_seconds",
+            "Duration of analysis pipeline stages (fetch, tree, score, summary, roadmap, report).",
+            ("stage",)))
+        self.cache_requests = self._register(Counter(
+            "repomirror_cache_requests",
+            "Cache lookups by cache name and result (hit/miss).",
+            ("cache", "result")))
+        self.prefetches = self._register(Counter(
+            "repomirror_prefetches",
+            "Speculative prefetches by outcome (started/skipped/cached/cancelled).",
+            ("result",)))
+
+        # HTTP server
+        self.http_in_flight = self._register(Gauge(
+            "repomirror_http_requests_in_flight",
+            "HTTP requests currently being served by this worker."))
+        self.http_request_duration = self._register(Histogram(
+            "repomirror_http_request_duration_seconds",
+            "HTTP request latency by route and status.",
+            ("route", "status")))
+        self.http_response_size = self._register(Histogram(
+            "repomirror_http_response_size_bytes",
+            "HTTP response body size by route.",
+            ("route",), buckets=DEFAULT_SIZE_BUCKETS))
+        self.http_rejected = self._register(Counter(
+            "repomirror_http_rejected_requests",
+            "Requests turned away by route and reason (rate_limited/overloaded).",
+            ("route", "reason")))
+
+        self.github_in_flight.set(value=0)
+        self.http_in_flight.set(value=0)
+
+    def _register(self, metric: _Metric):
+        self._metrics.append(metric)
+        return metric
+
+    def record_cache(self, cache: str, hit: bool):
+        """
+        Records a cache lookup outcome for the named cache.
+        """
+        self.cache_requests.inc(cache, "hit" if hit else "miss")
+
+    @contextmanager
+    def time_stage(self, stage: str):
+        """
+        Times a block as one analysis pipeline stage.
+        The duration is also attributed to the current request's Server-Timing, if any.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stage_duration.observe(stage, value=elapsed)
+            self.add_request_timing(stage, elapsed)
+
+    @contextmanager
+    def collect_request_timings(self):
+        """
+        Collects stage and GitHub durations recorded in this context into a RequestTimings.
+        """
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        try:
+            yield timings
+        finally:
+            _current_timings.reset(token)
+
+    def add_request_timing(self, name: str, seconds: float):
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.add(name, seconds)
+
+    def render(self) -> str:
+        """
+        Renders all registered metrics in the Prometheus text format.
+        """
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Shared registry used by all services in this process
+metrics = MetricsService()
@@ -0,0 +1,199 @@
+import logging
+import math
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache_service import AnalysisCache
+from .github_service import GitHubService
+from .improvement_service import encode_weaknesses
+from .metrics_service import metrics
+from .scoring_service import ScoringService
+
+logger = logging.getLogger(__name__)
+
+
+class PortfolioService:
+    """
+    Candidate-level view across all public repositories of a user or organization.
+    """
+
+    # Requests one fresh analysis costs once metadata is known (tree, commits, readme, languages),
+    # not counting the blob sampler's own bounded budget
+    CALLS_PER_ANALYSIS = 4
+    # Quota kept in reserve for interactive /analyze traffic
+    QUOTA_RESERVE = 100
+    MAX_LISTING_PAGES = 10
+
+    def __init__(
+        self,
+        github_service: GitHubService,
+        scoring_service: ScoringService,
+        analysis_cache: Optional[AnalysisCache] = None,
+        max_workers: int = 8
+    ):
+        self.github = github_service
+        self.scoring = scoring_service
+        self.cache = analysis_cache
+        self.max_workers = max_workers
+
+    def list_repositories(self, account: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Lists every public repository of the account, following pagination.
+        Returns None if the account does not exist.
+        """
+        repos: List[Dict[str, Any]] = []
+        per_page = 100
+        for page in range(1, self.MAX_LISTING_PAGES + 1):
+            batch = self.github.list_account_repos(account, page=page, per_page=per_page)
+            if batch is None:
+                return None if page == 1 else repos
+            repos.extend(batch)
+            if len(batch) < per_page:
+                break
+        return repos
+
+    @staticmethod
+    def _skip_reason(listing: Dict[str, Any]) -> Optional[str]:
+        """
+        Decides from listing metadata alone whether a repository is worth analyzing.
+        """
+        if listing.get("fork"):
+            return "fork"
+        if listing.get("archived") or listing.get("disabled"):
+            return "archived"
+        if not listing.get("size"):
+            return "empty"
+        return None
+
+    def _request_budget(self, budget: Optional[int]) -> int:
+        """
+        Caps the caller's request budget by the GitHub quota we last observed.
+        """
+        remaining = metrics.github_rate_limit_remaining.get("core")
+        if remaining is not None:
+            available = max(0, int(remaining) - self.QUOTA_RESERVE)
+            budget = available if budget is None else min(budget, available)
+        return budget if budget is not None else 10 ** 9
+
+    def _analyze(self, owner: str, listing: Dict[str, Any]) -> Dict[str, Any]:
+        name = listing["name"]
+        repo_data = self.cache.get(owner, name) if self.cache else None
+        if repo_data is None:
+            # Listing entries carry the same fields as get_repo_metadata, so reuse them
+            repo_data = self.scoring.analyze_repository(owner, name, metadata=listing)
+            if self.cache and "error" not in repo_data:
+                self.cache.put(owner, name, repo_data)
+        return repo_data
+
+    def analyze_account(self, account: str, max_repos: int = 30, request_budget: Optional[int] = None,
+                        effort_budget: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Analyzes an account's original, active repositories concurrently within a
+        request budget and aggregates the per-repository scores into a profile.
+        With an effort budget, also plans the fixes that raise the scores most across
+        all repositories. Returns None if the account does not exist.
+        """
+        listing = self.list_repositories(account)
+        if listing is None:
+            return None
+
+        skipped = Counter()
+        candidates = []
+        for repo in listing:
+            reason = self._skip_reason(repo)
+            if reason:
+                skipped[reason] += 1
+            else:
+                candidates.append(repo)
+
+        # Cached analyses are free; spend the budget on the most recently pushed of the rest
+        budget = self._request_budget(request_budget)
+        cost = self.CALLS_PER_ANALYSIS + self.scoring.sampler.max_requests
+        selected = []
+        for repo in candidates:
+            if len(selected) >= max_repos:
+                skipped["over_limit"] += 1
+                continue
+            owner = repo.get("owner", {}).get("login", account)
+            cached = self.cache is not None and self.cache.peek(owner, repo["name"]) is not None
+            if not cached:
+                if budget < cost:
+                    skipped["over_budget"] += 1
+                    continue
+                budget -= cost
+            selected.append((owner, repo))
+
+        results = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [(owner, repo, executor.submit(self._analyze, owner, repo)) for owner, repo in selected]
+            for owner, repo, future in futures:
+                try:
+                    repo_data = future.result()
+                except Exception as e:
+                    logger.error(f"Portfolio analysis failed for {owner}/{repo['name']}: {e}")
+                    skipped["failed"] += 1
+                    continue
+                if "error" in repo_data:
+                    skipped["failed"] += 1
+                    continue
+                results.append(self._summarize(repo, self.scoring.calculate_score(repo_data)))
+
+        profile = self.aggregate(results)
+        profile.update({
+            "account": account,
+            "listed_count": len(listing),
+            "analyzed_count": len(results),
+            "skipped": dict(skipped),
+            "repos": sorted(results, key=lambda r: r["score"], reverse=True),
+        })
+        if effort_budget is not None:
+            profile["improvement_plan"] = self.scoring.planner.plan_cohort(
+                [(r["name"], encode_weaknesses(r["weaknesses"]), r["score"]) for r in profile["repos"]], effort_budget
+            )
+        return profile
+
+    @staticmethod
+    def _summarize(listing: Dict[str, Any], score_result: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "name": listing["name"],
+            "url": listing.get("html_url"),
+            "language": listing.get("language"),
+            "stars": listing.get("stargazers_count", 0),
+            "size_kb": listing.get("size", 0),
+            "score": score_result["total_score"],
+            "level": score_result["level"],
+            "weaknesses": score_result["weaknesses"],
+            "weight": PortfolioService._weight(listing),
+        }
+
+    @staticmethod
+    def _weight(listing: Dict[str, Any]) -> float:
+        """
+        Larger and more starred projects say more about a candidate, with diminishing returns.
+        """
+        return round(1 + math.log10(1 + listing.get("size", 0)) + math.log10(1 + listing.get("stargazers_count", 0)), 3)
+
+    def aggregate(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Combines per-repository results into a weighted score, level distribution
+        and the weaknesses that recur across repositories.
+        """
+        if not results:
+            return {"weighted_score": 0, "level": ScoringService.level_for_score(0),
+                    "level_distribution": {}, "recurring_weaknesses": []}
+
+        total_weight = sum(r["weight"] for r in results)
+        weighted_score = round(sum(r["score"] * r["weight"] for r in results) / total_weight, 1)
+
+        weakness_counts = Counter(w for r in results for w in set(r["weaknesses"]))
+        recurring: List[Tuple[str, int]] = [(w, n) for w, n in weakness_counts.most_common() if n >= 2 or len(results) == 1]
+
+        return {
+            "weighted_score": weighted_score,
+            "level": ScoringService.level_for_score(weighted_score),
+            "level_distribution": dict(Counter(r["level"] for r in results)),
+            "recurring_weaknesses": [
+                {"weakness": w, "repo_count": n, "share": round(n / len(results), 2)} for w, n in recurring
+            ],
+        }
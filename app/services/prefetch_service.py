@@ -0,0 +1,155 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache_service import ResponseCache
+from .github_service import GitHubService, GitHubUnavailableError
+from .metrics_service import metrics
+from .scoring_service import ScoringService
+from ..utils.helpers import Deadline
+
+logger = logging.getLogger(__name__)
+
+Key = Tuple[str, str]
+
+
+class Prefetcher:
+    """
+    Speculatively fetches the GitHub data an analysis requests first (metadata,
+    newest commits and file tree) while the user is still about to submit the
+    URL. Responses land in `responses`, a short-lived in-memory cache that the
+    shared GitHubService reads as `prefetched`; fetching through that same
+    service keeps one circuit breaker and one view of the remaining quota.
+
+    Prefetches run on a small pool of their own, so they never hold request
+    workers; when `max_pending` are queued, or fewer than `min_quota` GitHub
+    requests are left, new ones are skipped. Each client has at most
+    `per_client` outstanding, a newer one superseding its oldest, and cancel()
+    stops one between fetches.
+    """
+
+    def __init__(self, scoring_service: ScoringService, responses: ResponseCache,
+                 github_service: GitHubService, workers: Optional[int] = None,
+                 max_pending: Optional[int] = None, per_client: Optional[int] = None,
+                 deadline: Optional[float] = None, min_quota: Optional[int] = None):
+        self.scoring = scoring_service
+        self.responses = responses
+        # The analyzing service, reading `responses` as its `prefetched` cache
+        self.github = github_service
+        self.max_pending = max_pending or int(os.getenv("PREFETCH_MAX_PENDING", "32"))
+        self.per_client = per_client or int(os.getenv("PREFETCH_PER_CLIENT", "2"))
+        self.deadline = deadline or float(os.getenv("PREFETCH_DEADLINE", "15"))
+        # Speculative requests must leave the remaining quota to real analyses
+        self.min_quota = min_quota or int(os.getenv("PREFETCH_MIN_GITHUB_QUOTA", "500"))
+        self._pool = ThreadPoolExecutor(max_workers=workers or int(os.getenv("PREFETCH_WORKERS", "2")),
+                                        thread_name_prefix="prefetch")
+        # Outstanding prefetches in submission order; a repository's clients share one
+        self._jobs: "OrderedDict[Key, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(owner: str, repo: str) -> Key:
+        return owner.lower(), repo.lower()
+
+    def quota_low(self) -> bool:
+        """
+        Whether the last GitHub response left fewer than `min_quota` core requests
+        before the quota resets.
+        """
+        remaining = metrics.github_rate_limit_remaining.get("core")
+        reset = metrics.github_rate_limit_reset.get("core")
+        return remaining is not None and remaining < self.min_quota and (reset is None or reset > time.time())
+
+    def prefetch(self, client: str, owner: str, repo: str) -> str:
+        """
+        Starts prefetching a repository for a client. Returns 'started', 'pending'
+        (already being prefetched) or 'skipped' (too many queued, or quota low).
+        """
+        key = self._key(owner, repo)
+        superseded: List[Key] = []
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None:
+                job["clients"].add(client)
+                return "pending"
+            if len(self._jobs) >= self.max_pending or self.quota_low():
+                metrics.prefetches.inc("skipped")
+                return "skipped"
+            own = [k for k, j in self._jobs.items() if client in j["clients"]]
+            superseded = own[:max(0, len(own) - self.per_client + 1)]
+            job = {"clients": {client}, "cancelled": threading.Event()}
+            self._jobs[key] = job
+            job["future"] = self._pool.submit(self._run, key, owner, repo, job["cancelled"])
+        for other in superseded:
+            self._release(client, other)
+        metrics.prefetches.inc("started")
+        return "started"
+
+    def cancel(self, client: str, owner: str, repo: str) -> bool:
+        """
+        Withdraws a client's prefetch of a repository; it stops once no client wants it.
+        Returns whether the client had one outstanding.
+        """
+        return self._release(client, self._key(owner, repo))
+
+    def _release(self, client: str, key: Key) -> bool:
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None or client not in job["clients"]:
+                return False
+            job["clients"].discard(client)
+            if job["clients"]:
+                return True
+            del self._jobs[key]
+            job["cancelled"].set()
+            future: Future = job["future"]
+        future.cancel()
+        metrics.prefetches.inc("cancelled")
+        return True
+
+    def _run(self, key: Key, owner: str, repo: str, cancelled: threading.Event):
+        try:
+            with Deadline(self.deadline).scope(), self.github.prefetching():
+                self._fetch(owner, repo, cancelled)
+        except GitHubUnavailableError as e:
+            logger.info(f"Prefetch of {owner}/{repo} stopped: {e}")
+        except Exception as e:
+            logger.warning(f"Prefetch of {owner}/{repo} failed: {e}")
+        finally:
+            with self._lock:
+                job = self._jobs.get(key)
+                if job is not None and job["cancelled"] is cancelled:
+                    del self._jobs[key]
+
+    def _fetch(self, owner: str, repo: str, cancelled: threading.Event):
+        """
+        Issues the requests an analysis starts with, exactly as it issues them, so
+        their cache keys match. Checks for cancellation between them.
+        """
+        if cancelled.is_set() or self.quota_low():
+            return
+        metadata = self.github.get_repo_metadata(owner, repo)
+        # Forks are analyzed from their divergence from the parent instead
+        if not metadata or metadata.get("fork") or cancelled.is_set():
+            return
+        size = self.scoring.HISTORY_PAGE_SIZE
+        if self.scoring.history_sample_pages > 0:
+            self.github.get_commit_history_page(owner, repo, per_page=size)
+        else:
+            self.github.get_commit_history(owner, repo, per_page=size)
+        # A repository analyzed before is updated from the subtrees that changed
+        if cancelled.is_set() or self.scoring.structures.get(owner, repo) is not None:
+            return
+        self.github.get_git_tree(owner, repo, branch=metadata.get("default_branch", "main"))
+
+    def shutdown(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+            self._jobs.clear()
+        for job in jobs:
+            job["cancelled"].set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
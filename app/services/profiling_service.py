@@ -0,0 +1,93 @@
+import cProfile
+import hmac
+import os
+import pstats
+import sys
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+# Profilers of the worker threads that ran work for the request being profiled
+_worker_profilers: ContextVar[Optional[List[cProfile.Profile]]] = ContextVar("worker_profilers", default=None)
+_worker_profilers_lock = threading.Lock()
+
+
+def profiled(fn: Callable, *args, **kwargs) -> Any:
+    """
+    Runs fn, under a profiler of its own while the calling request is being profiled.
+    cProfile only sees the thread that enabled it, so executor work (submitted with
+    copy_context().run, which carries the request's context) is wrapped in this.
+    """
+    profilers = _worker_profilers.get()
+    if profilers is None or sys.getprofile() is not None:
+        return fn(*args, **kwargs)
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler is already active (cProfile is process-wide from Python 3.12)
+        return fn(*args, **kwargs)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+        with _worker_profilers_lock:
+            profilers.append(profiler)
+
+
+class ProfilingService:
+    """
+    Opt-in, admin-guarded deterministic profiling of individual API requests.
+    Profiling is disabled unless an ADMIN_TOKEN is configured.
+    """
+
+    def __init__(self, admin_token: Optional[str] = None, top_n: int = 25):
+        self.admin_token = admin_token or os.getenv("ADMIN_TOKEN")
+        self.top_n = top_n
+
+    def is_authorized(self, token: Optional[str]) -> bool:
+        """
+        Checks a caller-supplied admin token in constant time.
+        """
+        if not self.admin_token or not token:
+            return False
+        return hmac.compare_digest(self.admin_token.encode(), token.encode())
+
+    @contextmanager
+    def profile(self):
+        """
+        Runs the enclosed block under cProfile and yields a list that is filled
+        with the hottest functions (by self time) once the block exits. Includes
+        the executor work the block ran through profiled(); work still running
+        when the block exits (e.g. a losing hedged request) is left out.
+        """
+        hot_functions: List[Dict[str, Any]] = []
+        workers: List[cProfile.Profile] = []
+        token = _worker_profilers.set(workers)
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield hot_functions
+        finally:
+            profiler.disable()
+            _worker_profilers.reset(token)
+            with _worker_profilers_lock:
+                finished = list(workers)
+            hot_functions.extend(self._top_functions(profiler, *finished))
+
+    def _top_functions(self, *profilers: cProfile.Profile) -> List[Dict[str, Any]]:
+        """
+        Summarizes the (merged) profiler stats as the top N functions ordered by self time.
+        """
+        stats = pstats.Stats(*profilers)
+        rows = []
+        for (filename, line, func), (_, calls, self_time, cumulative, _) in stats.stats.items():
+            rows.append({
+                "function": f"{os.path.basename(filename)}:{line}({func})" if line else func,
+                "calls": calls,
+                "self_ms": round(self_time * 1000, 3),
+                "cumulative_ms": round(cumulative * 1000, 3),
+            })
+        rows.sort(key=lambda r: r["self_ms"], reverse=True)
+        return rows[:self.top_n]
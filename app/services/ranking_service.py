@@ -0,0 +1,245 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from bisect import bisect_left, insort
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAX_SCORE = 100
+
+
+class ScoreSketch:
+    """
+    Exact, fixed-size quantile sketch for integer scores 0-100.
+
+    Scores have only 101 possible values, so a Fenwick (binary indexed) tree of
+    counts is both a lossless distribution and O(log 101) to update and query,
+    regardless of how many repositories have been analyzed.
+    """
+
+    def __init__(self):
+        self._tree = [0] * (MAX_SCORE + 2)
+        self.total = 0
+
+    def add(self, score: int, delta: int = 1):
+        self.total += delta
+        i = min(MAX_SCORE, max(0, int(score))) + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def count_below(self, score: int) -> int:
+        """
+        Number of recorded scores strictly below the given score.
+        """
+        i = min(MAX_SCORE + 1, max(0, int(score)))
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def percentile(self, score: int) -> Optional[float]:
+        """
+        Percentage of recorded scores strictly below the given score ("better than X%").
+        """
+        if self.total <= 0:
+            return None
+        return round(100.0 * self.count_below(score) / self.total, 1)
+
+
+class RankingService:
+    """
+    Indexed store of the latest score per analyzed repository.
+
+    Supports percentile lookups (globally or per language) through ScoreSketch,
+    and top-k leaderboards filtered by language and/or level through sorted
+    indexes. Re-analyzing a repository replaces its previous entry.
+
+    With a SQLite file, entries are shared by every worker process on the host:
+    each write gets the next sequence number, and before answering a worker
+    applies the rows written since it last looked. Without one (or while the file
+    can't be used) the index is per process.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("RANKING_DB") or None
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._global = ScoreSketch()
+        self._by_language: Dict[str, ScoreSketch] = {}
+        # Sorted (-score, key) lists per leaderboard filter; (None, None) is the global board
+        self._boards: Dict[Tuple[Optional[str], Optional[str]], List[Tuple[int, str]]] = {}
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+        self._seq = 0  # Highest shared row applied to the in-memory indexes
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not cross a fork; reopen in each process (caller holds the lock)
+        if self._conn is None or self._conn_pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Autocommit mode, so the write transaction in record() is under our control
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rankings (key TEXT PRIMARY KEY, repo TEXT NOT NULL, "
+                "score INTEGER NOT NULL, level TEXT NOT NULL, language TEXT, seq INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS rankings_seq ON rankings (seq)")
+            self._conn, self._conn_pid = conn, os.getpid()
+        return self._conn
+
+    def _sync(self):
+        """
+        Applies the entries other workers wrote since the last sync (caller holds the lock).
+        """
+        if not self.path:
+            return
+        try:
+            rows = self._connection().execute(
+                "SELECT key, repo, score, level, language, seq FROM rankings WHERE seq > ? ORDER BY seq",
+                (self._seq,)).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read shared rankings, answering from this worker's: {e}")
+            return
+        for key, repo, score, level, language, seq in rows:
+            self._apply(key, {"repo": repo, "score": score, "level": level, "language": language})
+            self._seq = seq
+
+    @staticmethod
+    def primary_language(repo_data: Dict[str, Any]) -> Optional[str]:
+        distribution = repo_data.get("tech_stack", {}).get("language_distribution") or {}
+        if not distribution:
+            return None
+        return max(distribution.items(), key=lambda kv: kv[1])[0]
+
+    @staticmethod
+    def _board_keys(language: Optional[str], level: str) -> List[Tuple[Optional[str], Optional[str]]]:
+        keys = [(None, None), (None, level)]
+        if language:
+            keys += [(language, None), (language, level)]
+        return keys
+
+    def record(self, owner: str, repo: str, score: int, level: str, language: Optional[str] = None):
+        """
+        Adds or replaces a repository's latest score.
+        """
+        key = f"{owner}/{repo}".lower()
+        entry = {"repo": f"{owner}/{repo}", "score": int(score), "level": level, "language": language}
+        with self._lock:
+            self._sync()
+            if self._entries.get(key) == entry:
+                return
+            if self.path:
+                try:
+                    conn = self._connection()
+                    # IMMEDIATE takes the write lock up front, so concurrent workers get distinct sequence numbers
+                    conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        conn.execute(
+                            "INSERT OR REPLACE INTO rankings (key, repo, score, level, language, seq) "
+                            "VALUES (?, ?, ?, ?, ?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM rankings))",
+                            (key, entry["repo"], entry["score"], level, language))
+                        conn.execute("COMMIT")
+                    except BaseException:
+                        conn.execute("ROLLBACK")
+                        raise
+                    self._sync()
+                    return
+                except sqlite3.Error as e:
+                    logger.warning(f"Could not share the ranking of {entry['repo']}, keeping it in this worker: {e}")
+            self._apply(key, entry)
+
+    def _apply(self, key: str, entry: Dict[str, Any]):
+        previous = self._entries.get(key)
+        if previous is not None:
+            if previous == entry:
+                return
+            self._remove(key, previous)
+        self._entries[key] = entry
+        self._global.add(entry["score"])
+        if entry["language"]:
+            self._by_language.setdefault(entry["language"], ScoreSketch()).add(entry["score"])
+        for board in self._board_keys(entry["language"], entry["level"]):
+            insort(self._boards.setdefault(board, []), (-entry["score"], key))
+
+    def _remove(self, key: str, entry: Dict[str, Any]):
+        self._global.add(entry["score"], -1)
+        if entry["language"]:
+            self._by_language[entry["language"]].add(entry["score"], -1)
+        for board in self._board_keys(entry["language"], entry["level"]):
+            items = self._boards[board]
+            index = bisect_left(items, (-entry["score"], key))
+            if index < len(items) and items[index] == (-entry["score"], key):
+                del items[index]
+
+    def percentile(self, score: int, language: Optional[str] = None, exclude: Optional[str] = None) -> Optional[float]:
+        """
+        Percentage of analyzed repositories (optionally of one language) scoring
+        below `score`, leaving out `exclude` ("owner/repo", the repository being
+        ranked). None when there are no others.
+        """
+        with self._lock:
+            self._sync()
+            sketch = self._by_language.get(language) if language else self._global
+            if not sketch:
+                return None
+            below, total = sketch.count_below(score), sketch.total
+            own = self._entries.get(exclude.lower()) if exclude else None
+            if own is not None and (not language or own["language"] == language):
+                total -= 1
+                below -= 1 if own["score"] < score else 0
+            return round(100.0 * below / total, 1) if total > 0 else None
+
+    def leaderboard(self, k: int = 10, language: Optional[str] = None, level: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Returns the top k repositories, optionally filtered by language and/or level.
+        """
+        with self._lock:
+            self._sync()
+            items = self._boards.get((language, level), [])[:k]
+            return [dict(self._entries[key], rank=i + 1) for i, (_, key) in enumerate(items)]
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._sync()
+            return len(self._entries)
+
+    def save_snapshot(self, path: str):
+        """
+        Writes every entry to a JSON snapshot, which keeps a per-process index
+        across restarts (a shared file needs none).
+        """
+        with self._lock:
+            self._sync()
+            entries = list(self._entries.values())
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": 1, "entries": entries}, f)
+        os.replace(tmp_path, path)
+
+    def load_snapshot(self, path: str) -> int:
+        """
+        Restores entries from a snapshot. Returns the number of entries loaded.
+        """
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path) as f:
+                entries = json.load(f).get("entries", [])
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable ranking snapshot {path}: {e}")
+            return 0
+        for entry in entries:
+            owner, repo = entry["repo"].split("/", 1)
+            self.record(owner, repo, entry["score"], entry["level"], entry.get("language"))
+        return len(entries)
@@ -0,0 +1,121 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucketLimiter:
+    """
+    Per-client token buckets. Each client may spend up to `capacity` tokens at
+    once; spent tokens come back at `refill_per_second`. With a SQLite file the
+    buckets are shared by every worker process on the host (WAL mode, one short
+    write transaction per check); without one they are per process.
+    """
+
+    # Rows of clients idle long enough for a full refill are deleted every this many checks
+    CLEANUP_EVERY = 1000
+
+    def __init__(self, path: Optional[str] = None, capacity: Optional[float] = None,
+                 refill_per_second: Optional[float] = None):
+        self.path = path or os.getenv("RATE_LIMIT_DB") or None
+        self.capacity = capacity or float(os.getenv("RATE_LIMIT_CAPACITY", "30"))
+        self.refill_per_second = refill_per_second or float(os.getenv("RATE_LIMIT_REFILL_PER_MINUTE", "12")) / 60
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+        self._checks = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not cross a fork; reopen in each process (caller holds the lock)
+        if self._conn is None or self._conn_pid != os.getpid():
+            if self.path:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+            # Autocommit mode, so the write transaction below is under our control
+            conn = sqlite3.connect(self.path or ":memory:", timeout=5, isolation_level=None, check_same_thread=False)
+            if self.path:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets "
+                "(client TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn, self._conn_pid = conn, os.getpid()
+        return self._conn
+
+    def acquire(self, client: str, cost: float = 1.0) -> Tuple[bool, float]:
+        """
+        Takes `cost` tokens from the client's bucket (costs above the capacity are
+        capped, so any request can eventually pass). Returns whether it was allowed
+        and, if not, the seconds until enough tokens will be back. Fails open if
+        the shared state cannot be read.
+        """
+        cost = min(cost, self.capacity)
+        with self._lock:
+            self._checks += 1
+            try:
+                conn = self._connection()
+                # IMMEDIATE takes the write lock up front, so concurrent workers cannot both spend the same tokens
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    now = time.time()
+                    row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE client = ?", (client,)).fetchone()
+                    tokens = self.capacity if row is None else min(
+                        self.capacity, row[0] + max(0.0, now - row[1]) * self.refill_per_second)
+                    allowed = tokens >= cost
+                    if allowed:
+                        tokens -= cost
+                    conn.execute("INSERT OR REPLACE INTO buckets (client, tokens, updated_at) VALUES (?, ?, ?)",
+                                 (client, tokens, now))
+                    if self._checks % self.CLEANUP_EVERY == 0:
+                        conn.execute("DELETE FROM buckets WHERE updated_at < ?",
+                                     (now - self.capacity / self.refill_per_second,))
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+            except sqlite3.Error as e:
+                logger.warning(f"Rate limit check failed, allowing the request: {e}")
+                return True, 0.0
+        return allowed, 0.0 if allowed else (cost - tokens) / self.refill_per_second
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._conn_pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+
+class LoadShedder:
+    """
+    Bounds the expensive requests one worker serves at a time. Requests beyond
+    `max_in_flight` are turned away immediately instead of queueing behind the
+    others, which keeps latency stable for the ones admitted.
+    """
+
+    def __init__(self, max_in_flight: Optional[int] = None, retry_after: Optional[float] = None):
+        self.max_in_flight = max_in_flight or int(os.getenv("MAX_IN_FLIGHT_ANALYSES", "16"))
+        # Suggested client back-off when shedding
+        self.retry_after = retry_after or float(os.getenv("SHED_RETRY_AFTER", "5"))
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._in_flight >= self.max_in_flight:
+                return False
+            self._in_flight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
@@ -1,4 +1,4 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from datetime import datetime
 
 class ReportService:
@@ -7,10 +7,12 @@ class ReportService:
         repo_url: str, 
         score_data: Dict[str, Any], 
         summary: str, 
-        roadmap: List[str]
+        roadmap: List[str],
+        date: Optional[datetime] = None
     ) -> str:
         """
         Generates a professionally formatted Markdown report suitable for PDF conversion.
+        Dated today unless a `date` is given.
         """
         score = score_data.get("total_score", 0)
         level = score_data.get("level", "Unknown")
@@ -19,7 +21,7 @@ class ReportService:
         # 1. Header & Overview
         report = []
         report.append(f"# GitHub Repository Evaluation Report")
-        report.append(f"**Date:** {datetime.now().strftime('%Y-%m-%d')}")
+        report.append(f"**Date:** {(date or datetime.now()).strftime('%Y-%m-%d')}")
         report.append(f"**Target Repository:** {repo_url}")
         report.append("\n---")
 
@@ -1,9 +1,12 @@
-from typing import List
+from typing import List, Union
+
+from .improvement_service import WEAKNESS_TABLE, Weakness, decode_weaknesses, encode_weaknesses
 
 class RoadmapService:
-    def generate_roadmap(self, weaknesses: List[str]) -> List[str]:
+    def generate_roadmap(self, weaknesses: List[Union[Weakness, str]]) -> List[str]:
         """
-        Generates an actionable, strict improvement roadmap based on specific weaknesses.
+        Generates an actionable, strict improvement roadmap based on specific weaknesses
+        (codes or their messages).
         """
         roadmap = []
         
@@ -17,23 +20,10 @@ class RoadmapService:
                 "Explore containerization (Docker) to ensure environment reproducibility."
             ]
 
-        for weakness in weaknesses:
-            w_lower = weakness.lower()
-            
-            if "readme" in w_lower:
-                roadmap.append("Documentation First: Create a README.md immediately. Include installation steps, usage examples, and a clear project description. No code exists if it's not documented.")
-                
-            if "test" in w_lower:
-                roadmap.append("Zero Tolerance for Untested Code: Set up pytest (or equivalent). Write unit tests for your core logic. Aim for at least 60% coverage before adding new features.")
-                
-            if "folder" in w_lower or "structure" in w_lower:
-                roadmap.append("Refactor Architecture: Move your source code into a `src` or `app` directory. Separate implementation from configuration. Don't dump files in the root.")
-                
-            if "commit" in w_lower and "count" in w_lower:
-                roadmap.append("Commit Granularity: Stop pushing massive updates. Break work into small, atomic commits. Each commit should handle ONE specific task or fix.")
-                
-            if "concentrated" in w_lower or "days" in w_lower:
-                roadmap.append("Show Consistency: Coding is a habit, not a sprint. Commit code on at least 3 separate days this week. Prove you can maintain a project over time.")
+        for code in decode_weaknesses(encode_weaknesses(weaknesses)):
+            advice = WEAKNESS_TABLE[code]["roadmap"]
+            if advice:
+                roadmap.append(advice)
 
         # Fill with general best practices if we have fewer than 5 items
         generic_advice = [
@@ -0,0 +1,274 @@
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Any, Dict, List, Optional, Tuple
+
+from .github_service import GitHubService
+from .structure_service import DirNode, StructureIndex, compute_totals
+from .metrics_service import metrics
+from .profiling_service import profiled
+
+logger = logging.getLogger(__name__)
+
+# Test definitions across the common frameworks (pytest/unittest, Jest/Mocha/Vitest,
+# Go, Rust, JUnit, RSpec/Minitest, xUnit/NUnit/MSTest, PHPUnit, ExUnit, Dart)
+TEST_PATTERN = re.compile(
+    r"^\s*(?:async\s+)?def\s+test\w*\s*\("
+    r"|^\s*class\s+Test\w*"
+    r"|\b(?:it|test|describe)\s*\(\s*['\"`]"
+    r"|\bfunc\s+Test\w*\s*\(\s*\w+\s+\*testing\.T"
+    r"|#\[(?:\w+::)?test\]"
+    r"|@(?:Test|ParameterizedTest)\b"
+    r"|^\s*(?:it|describe|context|test)\s+['\"]"
+    r"|\[(?:Fact|Theory|Test|TestMethod)\]"
+    r"|\bfunction\s+test\w+\s*\("
+    r"|^\s*test\s+['\"]",
+    re.MULTILINE,
+)
+# A CI config that defines work to run, not just an empty or placeholder file
+CI_PATTERN = re.compile(r"^(?:jobs|stages|steps|script|pipelines|workflows)\s*:|^\s+(?:runs-on|script|steps)\s*:|\bpipeline\s*\{|\bstage\s*\(", re.MULTILINE)
+JS_TEST_RUNNERS = ("jest", "vitest", "mocha", "ava", "jasmine", "@playwright/test", "cypress", "karma", "tap")
+NPM_DEFAULT_TEST = "no test specified"
+# Files that keep a folder in git or describe it, rather than test anything
+PLACEHOLDER_EXTENSIONS = {"gitkeep", "keep", "md", "txt"}
+
+
+class BlobSampler:
+    """
+    Verifies that tests and CI actually exist by inspecting a small sample of
+    candidate files (test files, CI configs, root manifests) from the tree.
+
+    Blobs are fetched concurrently by SHA within a strict per-analysis request
+    and byte budget. Verdicts are cached per blob SHA, so content shared between
+    repositories (forks, templates, vendored files) is never fetched twice.
+    """
+
+    # How many blobs of each kind may be inspected per analysis
+    KIND_QUOTAS = {"test": 5, "ci": 2, "manifest": 1}
+    # A sample of this many test files without any test counts as conclusive
+    CONCLUSIVE_TEST_SAMPLE = 3
+
+    def __init__(
+        self,
+        github_service: GitHubService,
+        max_requests: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        max_file_bytes: int = 64 * 1024,
+        max_workers: int = 4,
+        cache_size: int = 50000
+    ):
+        self.github = github_service
+        self.max_requests = max_requests if max_requests is not None else int(os.getenv("SAMPLER_MAX_REQUESTS", "6"))
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("SAMPLER_MAX_BYTES", str(256 * 1024)))
+        self.max_file_bytes = max_file_bytes
+        self.max_workers = max_workers
+        self.cache_size = cache_size
+        self._verdicts: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="blob-sampler")
+
+    @staticmethod
+    def inspect(kind: str, path: str, content: str) -> Dict[str, Any]:
+        """
+        Extracts what a candidate file proves: test definitions, CI jobs or a test runner.
+        """
+        if kind == "test":
+            return {"tests": len(TEST_PATTERN.findall(content))}
+        if kind == "ci":
+            return {"ci_jobs": bool(CI_PATTERN.search(content))}
+
+        runner = None
+        name = path.rsplit("/", 1)[-1].lower()
+        if name == "package.json":
+            try:
+                manifest = json.loads(content)
+            except ValueError:
+                manifest = {}
+            if isinstance(manifest, dict):
+                deps = dict(manifest.get("devDependencies") or {}, **(manifest.get("dependencies") or {}))
+                runner = next((r for r in JS_TEST_RUNNERS if r in deps), None)
+                test_script = (manifest.get("scripts") or {}).get("test") or ""
+                if runner is None and test_script and NPM_DEFAULT_TEST not in test_script:
+                    runner = test_script.split()[0]
+        elif "pytest" in content:
+            runner = "pytest"
+        elif name == "tox.ini":
+            runner = "tox"
+        return {"test_runner": runner}
+
+    def _cached(self, kind: str, sha: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            verdict = self._verdicts.get((kind, sha))
+            if verdict is not None:
+                self._verdicts.move_to_end((kind, sha))
+            return verdict
+
+    def _store(self, kind: str, sha: str, verdict: Dict[str, Any]):
+        with self._lock:
+            self._verdicts[(kind, sha)] = verdict
+            while len(self._verdicts) > self.cache_size:
+                self._verdicts.popitem(last=False)
+
+    def _select(self, candidates: Dict[str, Tuple[str, Optional[str], Optional[int]]]) -> Dict[str, List[Tuple[str, str, Optional[int]]]]:
+        """
+        Groups sampleable candidates by kind: blobs with a known SHA under the size
+        cap, cached verdicts first, the rest spread evenly over the (path-sorted) tree.
+        """
+        by_kind: Dict[str, List[Tuple[str, str, Optional[int]]]] = {kind: [] for kind in self.KIND_QUOTAS}
+        for path in sorted(candidates):
+            kind, sha, size = candidates[path]
+            if sha and (size is None or 0 < size <= self.max_file_bytes):
+                by_kind[kind].append((path, sha, size))
+
+        selected = {}
+        for kind, items in by_kind.items():
+            cached = [item for item in items if self._cached(kind, item[1]) is not None]
+            rest = [item for item in items if self._cached(kind, item[1]) is None]
+            step = max(1, len(rest) // max(1, self.KIND_QUOTAS[kind]))
+            selected[kind] = cached + rest[::step]
+        return selected
+
+    def _fetch(self, owner: str, repo: str, kind: str, path: str, sha: str) -> Optional[Dict[str, Any]]:
+        content = self.github.get_blob(owner, repo, sha)
+        if content is None:
+            return None
+        verdict = self.inspect(kind, path, content.decode("utf-8", errors="replace"))
+        self._store(kind, sha, verdict)
+        return verdict
+
+    def verify(self, owner: str, repo: str, index: StructureIndex) -> Dict[str, Any]:
+        """
+        Samples the index's candidate blobs and returns the evidence found:
+        tests / ci: 'verified', 'not_found' (sampled, nothing real), 'missing' (no
+        candidate files) or 'unchecked' (budget exhausted, fetches failed, or test
+        files of a type that is not sampled).
+        """
+        selected = self._select(index.candidates)
+        requests_left = self.max_requests
+        bytes_left = self.max_bytes
+        evidence: Dict[str, Any] = {"test_runner": None, "sampled_files": 0, "fetched_files": 0, "fetched_bytes": 0}
+        counts = index.candidate_counts
+        found = {"test": False, "ci": False}
+        inspected = {"test": 0, "ci": 0}
+
+        for kind in ("ci", "manifest", "test"):
+            quota = self.KIND_QUOTAS[kind]
+            queue = list(selected[kind])
+            while queue and quota > 0 and not found.get(kind):
+                # Cached verdicts are free; fetches are issued in concurrent waves within budget
+                wave, verdicts = [], []
+                while queue and quota > 0 and len(wave) < self.max_workers:
+                    path, sha, size = queue.pop(0)
+                    verdict = self._cached(kind, sha)
+                    if verdict is not None:
+                        metrics.record_cache("blob", True)
+                        verdicts.append(verdict)
+                        quota -= 1
+                        continue
+                    cost = size if size is not None else self.max_file_bytes
+                    if requests_left <= 0 or cost > bytes_left:
+                        queue = []
+                        break
+                    metrics.record_cache("blob", False)
+                    requests_left -= 1
+                    bytes_left -= cost
+                    wave.append((cost, self._executor.submit(copy_context().run, profiled, self._fetch, owner, repo, kind, path, sha)))
+                    quota -= 1
+                for cost, future in wave:
+                    try:
+                        verdict = future.result()
+                    except Exception as e:
+                        # Sampling only refines the heuristics; never fail the analysis over it
+                        logger.warning(f"Blob sampling failed for {owner}/{repo}: {e}")
+                        verdict = None
+                    if verdict is not None:
+                        evidence["fetched_files"] += 1
+                        evidence["fetched_bytes"] += cost
+                        verdicts.append(verdict)
+                for verdict in verdicts:
+                    evidence["sampled_files"] += 1
+                    if kind == "manifest":
+                        evidence["test_runner"] = evidence["test_runner"] or verdict.get("test_runner")
+                        continue
+                    inspected[kind] += 1
+                    if verdict.get("tests") or verdict.get("ci_jobs"):
+                        found[kind] = True
+
+        for kind, label in (("test", "tests"), ("ci", "ci")):
+            if found[kind]:
+                evidence[label] = "verified"
+            elif not counts.get(kind):
+                continue
+            elif inspected[kind] and (inspected[kind] >= min(counts[kind], self.CONCLUSIVE_TEST_SAMPLE) or kind == "ci"):
+                evidence[label] = "not_found"
+            else:
+                evidence[label] = "unchecked"
+        self._mark_absent(evidence, index)
+        return evidence
+
+    @staticmethod
+    def _holds_unsampled_tests(node: DirNode, in_tests: bool = False) -> bool:
+        """
+        Whether a test folder below `node` holds files besides placeholders.
+        """
+        if in_tests and (sum(node.extensions.values()) < node.file_count
+                         or any(ext not in PLACEHOLDER_EXTENSIONS for ext in node.extensions)):
+            return True
+        for name, child in node.children.items():
+            child_in_tests = in_tests or "test" in name.lower()
+            # Memoized totals skip subtrees without any test folder
+            if (child_in_tests or compute_totals(child).has_tests) and \
+                    BlobSampler._holds_unsampled_tests(child, child_in_tests):
+                return True
+        return False
+
+    @staticmethod
+    def _mark_absent(evidence: Dict[str, Any], index: StructureIndex):
+        """
+        Sets the evidence for kinds without candidates: 'missing', unless a test
+        folder holds files of a type the sampler does not read (Lua, shell, ...).
+        That is 'unchecked', listed under 'unsampled', and leaves the folder-name
+        heuristic to decide.
+        """
+        evidence["unsampled"] = []
+        for kind, label in (("test", "tests"), ("ci", "ci")):
+            if index.candidate_counts.get(kind):
+                continue
+            if kind == "test" and BlobSampler._holds_unsampled_tests(index.root):
+                evidence[label] = "unchecked"
+                evidence["unsampled"].append(label)
+            else:
+                evidence[label] = "missing"
+
+    @staticmethod
+    def apply(structure: Dict[str, Any], evidence: Dict[str, Any]):
+        """
+        Resolves has_tests / has_ci from folder-name heuristics plus sampled evidence,
+        and records the evidence on the structure.
+        """
+        structure["evidence"] = evidence
+        for flag, label in (("has_tests", "tests"), ("has_ci", "ci")):
+            status = evidence.get(label)
+            if status == "verified":
+                structure[flag] = True
+            elif status in ("missing", "not_found"):
+                structure[flag] = False
+
+    def carry_over(self, evidence: Optional[Dict[str, Any]], index: StructureIndex) -> Dict[str, Any]:
+        """
+        Re-derives evidence after an update whose blobs can't be sampled (webhook
+        pushes carry no SHAs): keeps earlier verdicts unless the candidates for a
+        kind disappeared, or appeared where there were none.
+        """
+        evidence = dict(evidence or {})
+        for kind, label in (("test", "tests"), ("ci", "ci")):
+            had_none = evidence.get(label) in (None, "missing") or label in evidence.get("unsampled", [])
+            if index.candidate_counts.get(kind) and had_none:
+                evidence[label] = "unchecked"
+        BlobSampler._mark_absent(evidence, index)
+        return evidence
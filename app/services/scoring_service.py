@@ -1,84 +1,473 @@
-from datetime import datetime
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from datetime import datetime, timezone
 from collections import Counter
-from typing import Dict, Any, List
-from .github_service import GitHubService
+from typing import Dict, Any, List, Iterator, Optional, Tuple
+from .github_service import GitHubService, GitHubUnavailableError
+from .improvement_service import (
+    WEAKNESS_TABLE, ImprovementPlanner, Weakness, decode_weaknesses, encode_weaknesses, weakness_messages
+)
+from .metadata_service import MetadataLoader
+from .metrics_service import metrics
+from .profiling_service import profiled
+from .sampler_service import BlobSampler
+from .structure_service import StructureIndex, StructureStore
+from .template_service import TemplateRegistry
+from ..utils.helpers import Deadline, estimate_total, stratified_pages
+
+logger = logging.getLogger(__name__)
+
+# Identifies the scoring rules; bump it whenever the same commit would score or render
+# differently, so cached analyses (and their ETags) are not reused across the change
+SCORING_VERSION = "4"
+
+# Share of files copied from another repository beyond which a repository counts as a template copy
+TEMPLATE_DUMP_SHARE = 0.8
 
 class ScoringService:
-    def __init__(self, github_service: GitHubService):
+    def __init__(self, github_service: GitHubService, structure_store: Optional[StructureStore] = None,
+                 sampler: Optional[BlobSampler] = None, templates: Optional[TemplateRegistry] = None,
+                 metadata_loader: Optional[MetadataLoader] = None):
         self.github = github_service
+        # Batch workloads share bulk metadata queries; otherwise one request per repository
+        self.metadata_loader = metadata_loader
+        self.structures = structure_store or StructureStore()
+        self.templates = templates or TemplateRegistry()
+        self.sampler = sampler or BlobSampler(github_service)
+        self.planner = ImprovementPlanner()
+        self.analysis_deadline = float(os.getenv("ANALYSIS_DEADLINE", "45"))
+        # Re-analysis walks changed subtrees only while that takes at most this many tree requests
+        self.tree_walk_max_fetches = int(os.getenv("TREE_WALK_MAX_FETCHES", "32"))
+        self._tree_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tree")
+        # Older commit pages read to estimate activity over histories longer than one page (0: newest page only)
+        self.history_sample_pages = int(os.getenv("COMMIT_SAMPLE_PAGES", "4"))
+        self._history_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="history")
+
+    # The compare API lists at most this many changed files
+    COMPARE_FILE_LIMIT = 300
 
-    def analyze_repository(self, owner: str, repo: str) -> Dict[str, Any]:
+    # Commits per history page (the API maximum); activity is analyzed on the newest page
+    HISTORY_PAGE_SIZE = 100
+
+    # Stages emitted by iter_analysis, in the order their data becomes available
+    ANALYSIS_STAGES = ("metadata", "structure", "activity", "documentation", "tech_stack")
+
+    def analyze_repository(self, owner: str, repo: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Analyzes a GitHub repository and extracts detailed metrics for advanced scoring.
+        Pass already-fetched metadata (e.g. from an account listing) to skip that request.
         """
+        repo_data = {}
+        for stage, payload in self.iter_analysis(owner, repo, metadata=metadata):
+            if stage == "error":
+                return payload
+            if stage != "metadata":
+                repo_data[stage] = payload
+        return repo_data
+
+    def iter_analysis(self, owner: str, repo: str, metadata: Optional[Dict[str, Any]] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Runs the analysis stage by stage, yielding (stage, payload) as soon as each
+        stage's GitHub data has been fetched and processed. Yields a single
+        ("error", {...}) pair instead if the repository does not exist.
+        All GitHub calls share one deadline (ANALYSIS_DEADLINE seconds).
+        """
+        deadline = Deadline(self.analysis_deadline)
+        stages = self._iter_analysis(owner, repo, metadata)
+        while True:
+            # Entered per step: consumers may drive the generator from different threads
+            with deadline.scope():
+                step = next(stages, None)
+            if step is None:
+                return
+            yield step
+
+    def _iter_analysis(self, owner: str, repo: str, metadata: Optional[Dict[str, Any]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
         # 1. Fetch Basic Metadata
-        metadata = self.github.get_repo_metadata(owner, repo)
+        if metadata is None and self.metadata_loader is not None:
+            metadata = self.metadata_loader.load(owner, repo)
+        elif metadata is None:
+            metadata = self.github.get_repo_metadata(owner, repo)
         if not metadata:
-            return {"error": "Repository not found"}
+            yield "error", {"error": "Repository not found"}
+            return
+
+        yield "metadata", metadata
 
         default_branch = metadata.get("default_branch", "main")
-        
-        # 2. Fetch File Tree (Recursive)
-        tree_data = self.github.get_git_tree(owner, repo, branch=default_branch)
+
+        # Forks: fetch only the divergence from the parent (and reuse its analysis when cached)
+        fork = None
+        if metadata.get("fork") and metadata.get("parent"):
+            fork = self._fork_divergence(owner, repo, default_branch, metadata["parent"])
+        index = fork["index"] if fork else None
+
+        # 2. Fetch File Tree (Recursive), unless its root tree was analyzed before (in this or
+        # any other repository); after an earlier analysis, only the subtrees that changed
+        commits, history = None, None
+        fresh = False
+        if fork is None:
+            # Fetched first: the newest commit names the root tree
+            commits, history = self._commit_history(owner, repo)
+            root_sha = commits[0].get("commit", {}).get("tree", {}).get("sha") if commits else None
+            previous = self.structures.get(owner, repo)
+            if previous is not None and root_sha and previous["index"].root_sha == root_sha:
+                index = previous["index"]
+            else:
+                index = self.templates.lookup(root_sha)
+            # Indexes updated from webhooks or compares lack SHAs only on the changed paths
+            if index is None and previous is not None and previous["index"].has_tree_shas():
+                index = self._walk_changed_trees(owner, repo, default_branch, previous["index"])
+                fresh = index is not None and index is not previous["index"]
+        tree_data = None
+        if index is None:
+            tree_data = self.github.get_git_tree(owner, repo, branch=default_branch)
+            fresh = True
         tree_items = tree_data.get("tree", []) if tree_data else []
 
         # 3. Analyze File Structure
-        files_count = 0
-        folders_count = 0
-        max_depth = 0
-        has_readme = False
-        has_tests = False
-        has_gitignore = False
-        has_ci = False # .github/workflows etc.
-        extensions = []
-        standard_folders_detected = []
-        root_files_count = 0
-        
-        standard_folders = {"src", "app", "lib", "utils", "services", "components", "api", "routes", "models"}
+        with metrics.time_stage("tree"):
+            if index is None:
+                index = StructureIndex.from_tree_items(tree_items, root_sha=tree_data.get("sha") if tree_data else None)
+            # Dates the repository, so a tree copied from it is not attributed the other way round
+            first_commit = self._first_commit(commits, history) if fork is None else None
+            upstream = (metadata.get("template_repository") or {}).get("full_name")
+            template = self.templates.match(owner, repo, index, first_commit, upstream)
+            if fresh:
+                self.templates.register(owner, repo, index, first_commit)
+            elif first_commit:
+                self.templates.claim(owner, repo, index, first_commit)
+            structure, extensions = index.summary(), index.extensions()
+            structure["template"] = template
+
+        # 3b. Confirm tests / CI from a bounded sample of file contents
+        with metrics.time_stage("sampling"):
+            evidence = self.sampler.verify(owner, repo, index)
+        BlobSampler.apply(structure, evidence)
+        yield "structure", structure
+
+        # 4. Commit History & Messages (for forks, only commits made on the fork)
+        if fork:
+            commits = fork["commits"]
 
-        for item in tree_items:
-            path = item.get("path", "")
-            item_type = item.get("type")
-            low_path = path.lower()
-            
-            # Depth calculation
-            depth = path.count("/") + 1
-            if depth > max_depth:
-                max_depth = depth
-
-            if item_type == "blob":  # File
-                files_count += 1
-                if "/" not in path:
-                    root_files_count += 1
-                
-                if low_path.endswith("readme.md"):
-                    has_readme = True
-                if ".gitignore" in low_path:
-                    has_gitignore = True
-                
-                # Extension tracking
-                if "." in path.rsplit("/", 1)[-1]:
-                    ext = path.rsplit(".", 1)[-1].lower()
-                    extensions.append(ext)
-
-            elif item_type == "tree":  # Directory
-                folders_count += 1
-                folder_name = path.split("/")[-1].lower()
-                
-                if folder_name in standard_folders:
-                    standard_folders_detected.append(folder_name)
-                    
-                if "test" in folder_name:
-                    has_tests = True
-                
-                if ".github" in low_path or ".circleci" in low_path:
-                    has_ci = True
-
-        # 4. Fetch Commit History & Messages
-        commits = self.github.get_commit_history(owner, repo, per_page=100)
-        commit_count = len(commits)
-        
         # 5. Analyze Commits
+        head_sha = fork["head_sha"] if fork else (commits[0].get("sha") if commits else None)
+        activity = self.analyze_activity(commits)
+        activity["head_sha"] = head_sha
+        if history:
+            self._apply_history(activity, history)
+        if fork:
+            activity["fork"] = fork["summary"]
+        yield "activity", activity
+
+        parent_data = fork["parent_data"] if fork else None
+
+        # 6. Readme Content Analysis
+        readme_content = ""
+        if parent_data and not fork["readme_changed"]:
+            readme_content = parent_data["documentation"]["readme_content"]
+        elif structure["has_readme"]:
+             readme_content = self.github.get_readme_content(owner, repo) or ""
+
+        documentation = {
+            "readme_content": readme_content
+        }
+        yield "documentation", documentation
+
+        # 7. Fetch Languages
+        if parent_data and not fork["files_changed"]:
+            languages = parent_data["tech_stack"]["language_distribution"]
+        else:
+            languages = self.github.get_languages(owner, repo) or {}
+
+        tech_stack = {
+            "languages": list(languages.keys()),
+            "language_distribution": languages,
+            "detected_extensions": extensions
+        }
+        yield "tech_stack", tech_stack
+
+        if head_sha:
+            self.structures.put(owner, repo, head_sha, index, {
+                "documentation": documentation, "tech_stack": tech_stack,
+                "activity": activity, "commits": self._slim_commits(commits),
+                "evidence": evidence, "upstream": upstream
+            })
+
+    def _commit_history(self, owner: str, repo: str) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Fetches the newest page of commits. For longer histories, also reads the
+        last page and a stratified sample of the pages in between (at most
+        history_sample_pages in total, concurrently) and returns activity estimated
+        over the whole history, else None.
+        """
+        if self.history_sample_pages <= 0:
+            return self.github.get_commit_history(owner, repo, per_page=self.HISTORY_PAGE_SIZE), None
+        commits, pages = self.github.get_commit_history_page(owner, repo, per_page=self.HISTORY_PAGE_SIZE)
+        if not pages or pages <= 1:
+            return commits, None
+
+        with metrics.time_stage("history"):
+            # The last page is always read: it holds the first commit and fixes the total count
+            sample = [pages] + stratified_pages(2, pages - 1, self.history_sample_pages - 1)
+            futures = [
+                (page, self._history_pool.submit(copy_context().run, profiled, self.github.get_commit_history,
+                                                 owner, repo, page, self.HISTORY_PAGE_SIZE))
+                for page in sample
+            ]
+            fetched: Dict[int, List[Dict[str, Any]]] = {}
+            for page, future in futures:
+                try:
+                    fetched[page] = future.result()
+                except GitHubUnavailableError as e:
+                    logger.warning(f"Skipping commit page {page} of {owner}/{repo}: {e}")
+        return commits, self._estimate_history(commits, fetched, pages, skipped=len(sample) - len(fetched))
+
+    def _first_commit(self, commits: Optional[List[Dict[str, Any]]], history: Optional[Dict[str, Any]]) -> Optional[str]:
+        """
+        Date of the repository's first commit, if the commits read include it.
+        """
+        if history:
+            return history.get("first_commit")
+        if commits and len(commits) < self.HISTORY_PAGE_SIZE:
+            return self.analyze_activity(commits[-1:])["latest_commit"]
+        return None
+
+    @staticmethod
+    def _day_changes(commits: List[Dict[str, Any]]) -> float:
+        """
+        Active days a page of commits adds to the history: the day changes between
+        its consecutive commits, scaled up for the (unseen) change at its boundary.
+        """
+        days = [c.get("commit", {}).get("author", {}).get("date", "")[:10] for c in commits]
+        changes = sum(1 for newer, older in zip(days, days[1:]) if newer != older)
+        return changes * len(days) / (len(days) - 1) if len(days) > 1 else float(len(days))
+
+    def _estimate_history(self, newest: List[Dict[str, Any]], fetched: Dict[int, List[Dict[str, Any]]],
+                          pages: int, skipped: int = 0) -> Dict[str, Any]:
+        """
+        Estimates the active days over all `pages` history pages. The newest page
+        counts exactly; the other pages read stand in for the unread ones.
+        `skipped` sampled pages could not be fetched.
+        """
+        last = fetched.get(pages)
+        if len(fetched) == pages - 1:
+            # Every page was read
+            everything = newest + [c for page in sorted(fetched) for c in fetched[page]]
+            days = self.analyze_activity(everything)["unique_active_days"]
+            estimate, interval = days, (days, days)
+        else:
+            exact = self.analyze_activity(newest)["unique_active_days"]
+            middle = [self._day_changes(page_commits) for page, page_commits in fetched.items() if page != pages]
+            population = pages - 1
+            # The last page is always read and usually partial: count it exactly rather than as a sample
+            # (unless no page in between could be read, when it is the only stand-in for them)
+            if last and middle:
+                exact += self._day_changes(last)
+                population -= 1
+            elif last:
+                middle = [self._day_changes(last)]
+            # Day changes are at least as variable as if each of a page's commits started a day independently
+            size = self.HISTORY_PAGE_SIZE
+            estimate, interval = estimate_total(exact, middle, population,
+                                                min_variance=lambda mean: mean * max(0.0, 1 - mean / size))
+        return {
+            "pages": pages,
+            "pages_read": 1 + len(fetched),
+            "pages_skipped": skipped,
+            "total_commits": (pages - 1) * self.HISTORY_PAGE_SIZE + len(last) if last else None,
+            "first_commit": self.analyze_activity(last[-1:])["latest_commit"] if last else None,
+            "active_days_estimate": round(estimate),
+            "active_days_interval": [round(bound) for bound in interval] if interval else None,
+        }
+
+    @staticmethod
+    def _apply_history(activity: Dict[str, Any], history: Dict[str, Any]):
+        """
+        Adds whole-history estimates to activity analyzed on the newest page.
+        """
+        activity["history"] = history
+        activity["unique_active_days"] = max(activity["unique_active_days"], history["active_days_estimate"])
+
+    @staticmethod
+    def _slim_commits(commits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Keeps only the commit fields activity analysis reads.
+        """
+        return [
+            {"sha": c.get("sha"), "commit": {"message": c.get("commit", {}).get("message", ""),
+                                             "author": {"date": c.get("commit", {}).get("author", {}).get("date")}}}
+            for c in commits
+        ]
+
+    @staticmethod
+    def _push_commit(commit: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Converts a webhook push commit into the commits API shape (UTC author date).
+        """
+        date = None
+        timestamp = commit.get("timestamp")
+        if timestamp:
+            try:
+                parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+                date = parsed.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+            except ValueError:
+                pass
+        return {"sha": commit.get("id"), "commit": {"message": commit.get("message", ""), "author": {"date": date}}}
+
+    def apply_push(self, owner: str, repo: str, before: Optional[str], after: Optional[str],
+                   pushed_commits: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Updates the stored analysis with the commits of a push (oldest first, as in
+        webhook payloads) and returns the new repo data. Needs no GitHub call unless
+        a README changed. Returns None if the stored analysis is not at `before`.
+        """
+        snapshot = self.structures.get(owner, repo)
+        if snapshot is None or not before or not after or snapshot["commit"] != before:
+            return None
+        stored = snapshot["repo_data"]
+
+        changes = [
+            {"filename": path, "status": status}
+            for commit in pushed_commits
+            for status, kind in (("added", "added"), ("removed", "removed"), ("modified", "modified"))
+            for path in commit.get(kind) or []
+        ]
+        with metrics.time_stage("tree"):
+            index = snapshot["index"].apply_changes(changes)
+            structure, extensions = index.summary(), index.extensions()
+            first_commit = None if "fork" in stored["activity"] else self._first_commit(
+                stored["commits"], stored["activity"].get("history"))
+            structure["template"] = self.templates.match(owner, repo, index, first_commit, stored.get("upstream"))
+        evidence = self.sampler.carry_over(stored.get("evidence"), index)
+        BlobSampler.apply(structure, evidence)
+
+        commits = ([self._push_commit(c) for c in reversed(pushed_commits)] + stored["commits"])[:100]
+        activity = self.analyze_activity(commits)
+        activity["head_sha"] = after
+        if "history" in stored["activity"]:
+            history = stored["activity"]["history"]
+            self._apply_history(activity, dict(history, total_commits=history["total_commits"] + len(pushed_commits)))
+        if "fork" in stored["activity"]:
+            activity["fork"] = dict(stored["activity"]["fork"], ahead_by=stored["activity"]["fork"]["ahead_by"] + len(pushed_commits))
+
+        documentation = stored["documentation"]
+        if any(c["filename"].rsplit("/", 1)[-1].lower().startswith("readme") for c in changes):
+            readme_content = ""
+            if structure["has_readme"]:
+                readme_content = self.github.get_readme_content(owner, repo) or ""
+            documentation = {"readme_content": readme_content}
+
+        # Language byte counts are not in the payload; keep them, but refresh the extensions
+        tech_stack = dict(stored["tech_stack"], detected_extensions=extensions)
+
+        self.structures.put(owner, repo, after, index, {
+            "documentation": documentation, "tech_stack": tech_stack,
+            "activity": activity, "commits": commits, "evidence": evidence, "upstream": stored.get("upstream")
+        })
+        return {"structure": structure, "activity": activity, "documentation": documentation, "tech_stack": tech_stack}
+
+    def _walk_changed_trees(self, owner: str, repo: str, branch: str, previous: StructureIndex) -> Optional[StructureIndex]:
+        """
+        Re-derives the structure index from the one of an earlier analysis by walking
+        non-recursive trees from the root, fetching only the subtrees whose SHA
+        changed. Returns None when the full recursive tree should be fetched instead.
+        """
+        listing = self.github.get_git_tree(owner, repo, branch=branch, recursive=False)
+        if not listing or listing.get("truncated"):
+            return None
+        if listing.get("sha") == previous.root_sha:
+            metrics.record_cache("tree_walk", True)
+            return previous
+
+        def fetch_trees(batch: List[Tuple[str, bool]]) -> List[Optional[Dict[str, Any]]]:
+            futures = [
+                self._tree_pool.submit(copy_context().run, profiled, self.github.get_git_tree, owner, repo, sha, recursive)
+                for sha, recursive in batch
+            ]
+            return [future.result() for future in futures]
+
+        with metrics.time_stage("tree_walk"):
+            index = previous.refresh(listing, fetch_trees, self.tree_walk_max_fetches)
+        metrics.record_cache("tree_walk", index is not None)
+        return index
+
+    def _fork_divergence(self, owner: str, repo: str, branch: str, parent: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Compares a fork against its parent. Returns the commits made on the fork
+        (newest first) and, when the parent's analysis is cached and the compare
+        listing is complete, the fork's structure index derived from the parent's
+        plus the parent data that is still valid. Returns None if the comparison fails.
+        """
+        parent_owner = parent.get("owner", {}).get("login")
+        parent_repo = parent.get("name")
+        if not parent_owner or not parent_repo:
+            return None
+
+        snapshot = self.structures.get(parent_owner, parent_repo)
+        metrics.record_cache("structure", snapshot is not None)
+        base = snapshot["commit"] if snapshot else f"{parent_owner}:{parent.get('default_branch', 'main')}"
+        head = f"{owner}:{branch}"
+        comparison = self.github.compare_commits(owner, repo, base, head)
+        if not comparison:
+            return None
+
+        ahead_by = comparison.get("ahead_by", 0)
+        behind_by = comparison.get("behind_by", 0)
+        listed_commits = comparison.get("commits") or []
+        commits = list(reversed(listed_commits))[:100]
+        if ahead_by == 0:
+            head_sha = comparison.get("merge_base_commit", {}).get("sha")
+        elif len(listed_commits) >= ahead_by:
+            head_sha = listed_commits[-1].get("sha")
+        else:
+            head_sha = None  # More commits than the compare API lists; the newest is unknown
+
+        index = None
+        changed: List[Dict[str, Any]] = []
+        if snapshot:
+            # Three-dot compares list changes since the merge base. If the parent moved on
+            # after the fork point, first undo the parent's changes since then.
+            changed = comparison.get("files") or []
+            complete = len(changed) < self.COMPARE_FILE_LIMIT
+            index = snapshot["index"]
+            if complete and behind_by:
+                upstream = self.github.compare_commits(owner, repo, head, base)
+                upstream_files = (upstream or {}).get("files")
+                if upstream_files is None or len(upstream_files) >= self.COMPARE_FILE_LIMIT:
+                    complete = False
+                else:
+                    index = index.apply_changes(upstream_files, reverse=True)
+                    changed = upstream_files + changed
+            if complete:
+                index = index.apply_changes(comparison.get("files") or [])
+            else:
+                index = None
+
+        changed_names = [f.get("filename", "").rsplit("/", 1)[-1].lower() for f in changed] + [
+            f.get("previous_filename", "").rsplit("/", 1)[-1].lower() for f in changed if f.get("previous_filename")
+        ]
+        return {
+            "index": index,
+            "commits": commits,
+            "head_sha": head_sha,
+            "parent_data": snapshot["repo_data"] if index is not None else None,
+            "files_changed": bool(changed),
+            "readme_changed": any(name.startswith("readme") for name in changed_names),
+            "summary": {
+                "parent": f"{parent_owner}/{parent_repo}",
+                "ahead_by": ahead_by,
+                "behind_by": behind_by,
+                "reused_parent_analysis": index is not None,
+            },
+        }
+
+    def analyze_activity(self, commits: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Derives commit activity metrics from a commit list (newest first).
+        """
         commit_dates = []
         commit_messages = []
         
@@ -97,50 +486,49 @@ class ScoringService:
                     pass
         
         active_days = set(d.date() for d in commit_dates)
-        
-        # 6. Readme Content Analysis
-        readme_content = ""
-        if has_readme:
-             readme_content = self.github.get_readme_content(owner, repo) or ""
-
-        # 7. Fetch Languages
-        languages = self.github.get_languages(owner, repo) or {}
 
         return {
-            "structure": {
-                "file_count": files_count,
-                "folder_count": folders_count,
-                "root_files_count": root_files_count,
-                "max_depth": max_depth,
-                "has_readme": has_readme,
-                "has_tests": has_tests,
-                "has_gitignore": has_gitignore,
-                "has_ci": has_ci,
-                "standard_folders": list(set(standard_folders_detected))
-            },
-            "activity": {
-                "analyzed_commit_count": commit_count,
-                "unique_active_days": len(active_days),
-                "commit_messages": commit_messages,
-                "latest_commit": commit_dates[0].isoformat() if commit_dates else None,
-            },
-            "documentation": {
-                "readme_content": readme_content
-            },
-            "tech_stack": {
-                "languages": list(languages.keys()),
-                "language_distribution": languages,
-                "detected_extensions": list(set(extensions))
-            }
+            "analyzed_commit_count": len(commits),
+            "unique_active_days": len(active_days),
+            "commit_messages": commit_messages,
+            "latest_commit": commit_dates[0].isoformat() if commit_dates else None,
         }
 
+    def analyze_commit_log(self, commits: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Activity of a complete commit log (newest first), as an analysis that read
+        every history page reports it: the newest page plus exact history.
+        """
+        size = self.HISTORY_PAGE_SIZE
+        newest = commits[:size]
+        activity = self.analyze_activity(newest)
+        pages = -(-len(commits) // size)
+        if pages > 1 and self.history_sample_pages > 0:
+            fetched = {page: commits[(page - 1) * size:page * size] for page in range(2, pages + 1)}
+            self._apply_history(activity, self._estimate_history(newest, fetched, pages))
+        return activity
+
+    @staticmethod
+    def is_inactive(latest_commit: Optional[str]) -> bool:
+        """
+        Whether the latest commit (activity's latest_commit) is more than 180 days old.
+        """
+        if not latest_commit:
+            return False
+        try:
+            # Basic ISO parsing - assuming UTC from GitHub or similar
+            # Remove Z if present for fromisoformat in older pythons, though 3.7+ handles it usually
+            latest_date = datetime.fromisoformat(latest_commit.replace("Z", "+00:00"))
+        except ValueError:
+            return False # Fail safe
+        return (datetime.now(latest_date.tzinfo) - latest_date).days > 180
+
     def calculate_score(self, repo_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Calculates a deterministic score (0-100) using advanced heuristics.
         Now returns a transparent breakdown with reasons and improvement hints.
         """
         score = 0
-        weaknesses = []
         breakdown = {}
         
         structure = repo_data.get("structure", {})
@@ -148,14 +536,91 @@ class ScoringService:
         documentation = repo_data.get("documentation", {})
         stack = repo_data.get("tech_stack", {})
 
-        # Helper to structure valid category output
-        def create_category(name, current, max_pts, reasons, hint):
+        categories = {
+            "Code Organization": self._score_code_organization(structure),
+            "Documentation": self._score_documentation(structure, documentation),
+            "Commit Hygiene": self._score_commit_hygiene(activity),
+            "Engineering Standards": self._score_engineering_standards(structure),
+            "Tech Stack": self._score_tech_stack(stack),
+        }
+        weakness_mask = 0
+        for name, (category, category_weaknesses) in categories.items():
+            score += category["score"]
+            breakdown[name] = category
+            weakness_mask |= encode_weaknesses(category_weaknesses)
+
+        # Determine Level
+        level = self.level_for_score(score)
+        
+        # Calculate Health Flags
+        health_flags = self._calculate_health_flags(structure, activity)
+        
+        # Calculate Score Simulation
+        simulation = self._calculate_score_simulation(score, weakness_mask)
+             
+        return {
+            "total_score": score,
+            "level": level,
+            "breakdown": breakdown,
+            "weaknesses": weakness_messages(weakness_mask),
+            "weakness_codes": [code.name for code in decode_weaknesses(weakness_mask)],
+            "flags": health_flags,
+            "simulation": simulation,
+            "packages": self.score_packages(structure)
+        }
+
+    @staticmethod
+    def level_for_score(score: float) -> str:
+        """
+        Maps a 0-100 score onto the Beginner/Intermediate/Advanced/Pro levels.
+        """
+        level = "Beginner"
+        if score >= 85:
+            level = "Pro"
+        elif score >= 65:
+            level = "Advanced"
+        elif score >= 40:
+             level = "Intermediate"
+        return level
+
+    def score_stage(self, stage: str, repo_data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        Scores the categories that can be computed once the given analysis stage
+        is available, for progressive results. repo_data needs that stage and
+        the ones before it (see ANALYSIS_STAGES).
+        """
+        structure = repo_data.get("structure", {})
+        if stage == "structure":
             return {
-                "score": current,
-                "max_score": max_pts,
-                "reasons": reasons,
-                "hint": hint
+                "Code Organization": self._score_code_organization(structure)[0],
+                "Engineering Standards": self._score_engineering_standards(structure)[0],
             }
+        if stage == "activity":
+            return {"Commit Hygiene": self._score_commit_hygiene(repo_data.get("activity", {}))[0]}
+        if stage == "documentation":
+            return {"Documentation": self._score_documentation(structure, repo_data.get("documentation", {}))[0]}
+        if stage == "tech_stack":
+            return {"Tech Stack": self._score_tech_stack(repo_data.get("tech_stack", {}))[0]}
+        return {}
+
+    # Helper to structure valid category output
+    def _create_category(self, name, current, max_pts, reasons, hint):
+        return {
+            "score": current,
+            "max_score": max_pts,
+            "reasons": reasons,
+            "hint": hint
+        }
+
+    def _score_code_organization(self, structure: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Weakness]]:
+        """
+        Scores Code Organization (max 20 pts) from structure metrics.
+        Returns the category breakdown and the weaknesses it found.
+        """
+        if structure.get("packages"):
+            return self._score_monorepo_organization(structure["packages"])
+
+        weaknesses = []
 
         # --- 1. Code Organization (Max 20 pts) ---
         org_current = 0
@@ -167,7 +632,7 @@ class ScoringService:
              org_reasons.append("✅ Detected standard folders (src/app/utils)")
         else:
              org_reasons.append("❌ Standard architecture folders (src, app, utils) not detected")
-             weaknesses.append("Standard architecture folders (src, app, utils) not detected")
+             weaknesses.append(Weakness.NO_STANDARD_FOLDERS)
              
         # H2: Avoiding Root Dumping (5 pts)
         total_files = structure.get("file_count", 0)
@@ -177,7 +642,7 @@ class ScoringService:
             org_reasons.append("✅ Modular file distribution")
         elif total_files > 3:
             org_reasons.append("❌ High file concentration in root directory")
-            weaknesses.append("High file concentration in root directory")
+            weaknesses.append(Weakness.ROOT_CONCENTRATION)
             
         # H3: General Structure (5 pts)
         if structure.get("folder_count", 0) > 2:
@@ -192,11 +657,67 @@ class ScoringService:
         else:
             org_reasons.append(f"⚠️ Directory depth ({depth} levels) falls outside standard range")
         
-        score += org_current
-        breakdown["Code Organization"] = create_category(
+        category = self._create_category(
             "Code Organization", org_current, 20, org_reasons, 
             "Refactor code into logical subdirectories (e.g., /src, /components) to improve modularity."
         )
+        return category, weaknesses
+
+    def _score_monorepo_organization(self, packages: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], List[Weakness]]:
+        """
+        Scores Code Organization for a monorepo as the file-weighted average of its
+        packages, each judged relative to its own root. A weakness is reported when
+        packages holding at least half of the files share it.
+        """
+        scored = [(pkg, self._score_code_organization(pkg)) for pkg in packages]
+        weights = [max(1, pkg.get("file_count", 0)) for pkg in packages]
+        total_weight = sum(weights)
+        org_current = int(round(sum(cat["score"] * w for (_, (cat, _)), w in zip(scored, weights)) / total_weight))
+
+        weakness_weight = Counter()
+        for (_, (_, pkg_weaknesses)), w in zip(scored, weights):
+            for weakness in set(pkg_weaknesses):
+                weakness_weight[weakness] += w
+        weaknesses = [w for w, weight in weakness_weight.items() if weight * 2 >= total_weight]
+
+        org_reasons = [f"✅ Monorepo detected: {len(packages)} packages scored individually"]
+        weakest = sorted(scored, key=lambda item: item[1][0]["score"])[:3]
+        for pkg, (cat, _) in weakest:
+            if cat["score"] < cat["max_score"]:
+                org_reasons.append(f"⚠️ Package {pkg['path']} scores {cat['score']}/{cat['max_score']}")
+        org_reasons.extend(f"❌ {WEAKNESS_TABLE[w]['message']} (most packages)" for w in weaknesses)
+
+        category = self._create_category(
+            "Code Organization", org_current, 20, org_reasons,
+            "Give every package the same layout (e.g., /src, /tests) so each can be navigated on its own."
+        )
+        return category, weaknesses
+
+    def score_packages(self, structure: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Per-package breakdown of the structure-based categories for monorepos.
+        Returns an empty list for single-package repositories.
+        """
+        results = []
+        for pkg in structure.get("packages") or []:
+            organization, _ = self._score_code_organization(pkg)
+            standards, _ = self._score_engineering_standards(pkg)
+            results.append({
+                "path": pkg["path"],
+                "manifests": pkg.get("manifests", []),
+                "file_count": pkg.get("file_count", 0),
+                "score": organization["score"] + standards["score"],
+                "max_score": organization["max_score"] + standards["max_score"],
+                "breakdown": {"Code Organization": organization, "Engineering Standards": standards},
+            })
+        return results
+
+    def _score_documentation(self, structure: Dict[str, Any], documentation: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Weakness]]:
+        """
+        Scores Documentation (max 20 pts) from README presence and content.
+        Returns the category breakdown and the weaknesses it found.
+        """
+        weaknesses = []
 
         # --- 2. Documentation Quality (Max 20 pts) ---
         doc_current = 0
@@ -209,7 +730,7 @@ class ScoringService:
             doc_reasons.append("✅ README.md is present")
         else:
             doc_reasons.append("❌ README.md file is absent")
-            weaknesses.append("README.md file is absent")
+            weaknesses.append(Weakness.NO_README)
 
         # H2: Completeness (15 pts - 5 per section)
         required_sections = ["usage", "install", "setup", "getting started"]
@@ -224,18 +745,25 @@ class ScoringService:
         else:
             if structure.get("has_readme"):
                  doc_reasons.append("❌ Documentation omits 'Usage' or 'Installation' steps")
-                 weaknesses.append("Documentation omits 'Usage' or 'Installation' steps")
+                 weaknesses.append(Weakness.README_MISSING_SECTIONS)
         
         if len(readme_text) > 200: 
             doc_current += 5
         else:
             doc_reasons.append("⚠️ Documentation content is brief")
             
-        score += doc_current
-        breakdown["Documentation"] = create_category(
+        category = self._create_category(
             "Documentation", doc_current, 20, doc_reasons, 
             "Expand documentation to include setup steps and usage examples."
         )
+        return category, weaknesses
+
+    def _score_commit_hygiene(self, activity: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Weakness]]:
+        """
+        Scores Commit Hygiene (max 20 pts) from commit messages and activity.
+        Returns the category breakdown and the weaknesses it found.
+        """
+        weaknesses = []
 
         # --- 3. Commit Hygiene & Consistency (Max 20 pts) ---
         git_current = 0
@@ -251,7 +779,7 @@ class ScoringService:
              git_reasons.append("✅ Semantic prefixes detected")
         else:
              git_reasons.append("❌ Commit messages do not follow semantic conventions")
-             weaknesses.append("Commit messages do not follow semantic conventions (e.g., feat:, fix:)")
+             weaknesses.append(Weakness.NON_SEMANTIC_COMMITS)
 
         # H2: Volume & Frequency (10 pts)
         if activity.get("analyzed_commit_count", 0) > 10:
@@ -263,7 +791,7 @@ class ScoringService:
              git_reasons.append("✅ Consistent development activity")
         elif activity.get("analyzed_commit_count", 0) > 5 and activity.get("unique_active_days", 0) == 1:
              git_reasons.append("⚠️ Activity concentrated in single day")
-             weaknesses.append("Activity concentrated in single day")
+             weaknesses.append(Weakness.SINGLE_DAY_ACTIVITY)
              
         # H3: Avoid generic messages (5 pts)
         bad_messages = ["update", "file", "upload", "changes", "fix"]
@@ -272,30 +800,46 @@ class ScoringService:
              git_current += 5
         elif lazy_count > 0:
              git_reasons.append(f"❌ Generic commit messages detected ({lazy_count})")
-             weaknesses.append("Generic commit messages detected (e.g., 'Update file')")
+             weaknesses.append(Weakness.GENERIC_COMMIT_MESSAGES)
 
-        score += git_current
-        breakdown["Commit Hygiene"] = create_category(
+        category = self._create_category(
             "Commit Hygiene", git_current, 20, git_reasons, 
             "Adhere to conventional commits (feat: ...) and commit incrementally."
         )
+        return category, weaknesses
+
+    def _score_engineering_standards(self, structure: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Weakness]]:
+        """
+        Scores Engineering Standards (max 20 pts) from tests, CI and .gitignore.
+        Returns the category breakdown and the weaknesses it found.
+        """
+        weaknesses = []
 
         # --- 4. Engineering Standards (Max 20 pts) ---
         eng_current = 0
         eng_reasons = []
         
         # H1: Testing (10 pts)
+        evidence = structure.get("evidence") or {}
         if structure.get("has_tests"):
             eng_current += 10
-            eng_reasons.append("✅ Automated tests identified")
+            if evidence.get("tests") == "verified":
+                eng_reasons.append("✅ Automated tests verified in sampled test files")
+            else:
+                eng_reasons.append("✅ Automated tests identified")
         else:
-            eng_reasons.append("❌ Testing framework not detected")
-            weaknesses.append("Testing framework not detected")
+            if evidence.get("tests") == "not_found":
+                eng_reasons.append("❌ Testing framework not detected (test files contain no test cases)")
+            else:
+                eng_reasons.append("❌ Testing framework not detected")
+            weaknesses.append(Weakness.NO_TESTS)
             
         # H2: CI/CD (5 pts)
         if structure.get("has_ci"):
             eng_current += 5
             eng_reasons.append("✅ CI/CD configuration present")
+        elif evidence.get("ci") == "not_found":
+            eng_reasons.append("⚠️ CI/CD configuration defines no jobs")
         else:
             eng_reasons.append("⚠️ CI/CD pipeline not configured")
             
@@ -305,13 +849,20 @@ class ScoringService:
             eng_reasons.append("✅ .gitignore detected")
         else:
             eng_reasons.append("❌ .gitignore file is missing")
-            weaknesses.append(".gitignore file is missing")
+            weaknesses.append(Weakness.NO_GITIGNORE)
             
-        score += eng_current
-        breakdown["Engineering Standards"] = create_category(
+        category = self._create_category(
             "Engineering Standards", eng_current, 20, eng_reasons, 
             "Initialize a test suite and ensure version control excludes binaries."
         )
+        return category, weaknesses
+
+    def _score_tech_stack(self, stack: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Weakness]]:
+        """
+        Scores Tech Stack (max 20 pts) from languages and file extensions.
+        Returns the category breakdown and the weaknesses it found.
+        """
+        weaknesses = []
 
         # --- 5. Tech Stack & Complexity (Max 20 pts) ---
         tech_current = 0
@@ -331,79 +882,36 @@ class ScoringService:
         else:
              tech_current += 5
              
-        score += tech_current
-        breakdown["Tech Stack"] = create_category(
+        category = self._create_category(
             "Tech Stack", tech_current, 20, tech_reasons, 
             "Demonstrate complexity through diverse tooling or asset management."
         )
+        return category, weaknesses
 
-        # Determine Level
-        level = "Beginner"
-        if score >= 85:
-            level = "Pro"
-        elif score >= 65:
-            level = "Advanced"
-        elif score >= 40:
-             level = "Intermediate"
-        
-        # Calculate Health Flags
-        health_flags = self._calculate_health_flags(structure, activity)
-        
-        # Calculate Score Simulation
-        simulation = self._calculate_score_simulation(score, weaknesses)
-             
-        return {
-            "total_score": score,
-            "level": level,
-            "breakdown": breakdown,
-            "weaknesses": list(set(weaknesses)), # Remove dupes
-            "flags": health_flags,
-            "simulation": simulation
-        }
-
-    def _calculate_score_simulation(self, current_score: int, weaknesses: List[str]) -> Dict[str, Any]:
+    def _calculate_score_simulation(self, current_score: int, weakness_mask: int) -> Dict[str, Any]:
         """
         Simulates potential score improvements based on fixing specific weaknesses.
-        Returns the new simulated score and the top 3 high-impact actions.
+        Returns the new simulated score, the top 3 high-impact actions and the best
+        plan within the default effort budget.
         """
-        potential_gain = 0
-        impacts = []
-        
-        # Define Point Deltas for specific fixes
-        deltas = {
-            "CRITICAL: Missing README.md": {"points": 20, "label": "Create comprehensive README documentation"},
-            "README.md file is absent": {"points": 20, "label": "Create comprehensive README documentation"},
-            "Documentation omits 'Usage' or 'Installation' steps": {"points": 10, "label": "Document installation and usage steps"},
-            "No automated tests detected": {"points": 15, "label": "Implement automated test suite"},
-            "Testing framework not detected": {"points": 15, "label": "Implement automated test suite"},
-            "Missing standard folders (e.g., src, app, utils)": {"points": 10, "label": "Structure code into modular directories (src/)"},
-            "Standard architecture folders (src, app, utils) not detected": {"points": 10, "label": "Structure code into modular directories (src/)"},
-            "Commit messages lack semantic prefixes (feat:, fix:)": {"points": 10, "label": "Adopt semantic commit message convention"},
-            "Commit messages do not follow semantic conventions (e.g., feat:, fix:)": {"points": 10, "label": "Adopt semantic commit message convention"},
-            "Missing .gitignore (security/cleanliness risk)": {"points": 5, "label": "Add .gitignore to exclude build artifacts"},
-            ".gitignore file is missing": {"points": 5, "label": "Add .gitignore to exclude build artifacts"}
-        }
-        
-        for w in weaknesses:
-            if w in deltas:
-                d = deltas[w]
-                potential_gain += d["points"]
-                impacts.append({
-                    "action": d["label"],
-                    "points_gain": f"+{d['points']}"
-                })
-        
+        gains = [WEAKNESS_TABLE[code] for code in decode_weaknesses(weakness_mask) if WEAKNESS_TABLE[code]["points"]]
+        potential_gain = sum(d["points"] for d in gains)
+
         # Cap score at 100
         simulated_score = min(100, current_score + potential_gain)
-        
+
         # Sort impacts by points descending and take top 3
-        top_impacts = sorted(impacts, key=lambda x: int(x["points_gain"].replace("+", "")), reverse=True)[:3]
-        
+        top_impacts = [
+            {"action": d["action"], "points_gain": f"+{d['points']}"}
+            for d in sorted(gains, key=lambda d: d["points"], reverse=True)[:3]
+        ]
+
         return {
             "current_score": current_score,
             "potential_score": simulated_score,
             "points_gap": simulated_score - current_score,
-            "top_improvements": top_impacts
+            "top_improvements": top_impacts,
+            "plan": self.planner.plan(weakness_mask, current_score)
         }
 
     def _calculate_health_flags(self, structure: Dict[str, Any], activity: Dict[str, Any]) -> Dict[str, Any]:
@@ -425,21 +933,8 @@ class ScoringService:
         }
         
         # 3. Inactive (6 months)
-        latest_str = activity.get("latest_commit")
-        is_inactive = False
-        if latest_str:
-            try:
-                # Basic ISO parsing - assuming UTC from GitHub or similar
-                # Remove Z if present for fromisoformat in older pythons, though 3.7+ handles it usually
-                latest_date = datetime.fromisoformat(latest_str.replace("Z", "+00:00"))
-                days_diff = (datetime.now(latest_date.tzinfo) - latest_date).days
-                if days_diff > 180:
-                    is_inactive = True
-            except ValueError:
-                pass # Fail safe
-        
         flags["is_inactive"] = {
-            "value": is_inactive,
+            "value": self.is_inactive(activity.get("latest_commit")),
             "description": "No contribution activity recorded in the last 180 days."
         }
 
@@ -450,6 +945,15 @@ class ScoringService:
             "description": "Entire codebase appears committed in a single transaction."
         }
 
+        # 4b. Starter template pushed with little work of its own
+        template = structure.get("template") or {}
+        flags["is_template_dump"] = {
+            "value": template.get("share", 0) >= TEMPLATE_DUMP_SHARE and (
+                commit_count < 5 or activity.get("unique_active_days", 0) <= 1),
+            "description": f"File tree is largely identical to {template['template']} and was pushed with few commits."
+            if template else "File tree is largely identical to another analyzed repository.",
+        }
+
         # 5. Overengineered (Too many folders for few files)
         file_count = structure.get("file_count", 0)
         folder_count = structure.get("folder_count", 0)
@@ -472,6 +976,17 @@ class ScoringService:
 
         return flags
 
+    @staticmethod
+    def _history_uncertain(history: Optional[Dict[str, Any]]) -> bool:
+        """
+        Whether sampled activity estimates are too loose to trust: no interval, or
+        one wider than half the estimate.
+        """
+        if not history:
+            return False
+        interval = history.get("active_days_interval")
+        return interval is None or interval[1] - interval[0] > history["active_days_estimate"] / 2
+
     def _calculate_confidence(self, structure: Dict[str, Any], activity: Dict[str, Any]) -> Dict[str, Any]:
         """
         Determines how confident the system is in the score based on data availability.
@@ -494,6 +1009,11 @@ class ScoringService:
         elif active_days < 2 and commits > 5:
             level = "Medium"
             reason = "Medium confidence: Activity compressed into single day reduces behavioral insights."
+        elif self._history_uncertain(activity.get("history")):
+            history = activity["history"]
+            level = "Medium"
+            reason = (f"Medium confidence: Activity estimated from {history['pages_read']} of "
+                      f"{history['pages']} pages of commit history.")
             
         return {
             "level": level,
@@ -0,0 +1,694 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+STANDARD_FOLDERS = {"src", "app", "lib", "utils", "services", "components", "api", "routes", "models"}
+
+# Files that mark the root of an independently buildable package
+MANIFEST_FILES = {
+    "package.json", "pyproject.toml", "setup.py", "go.mod", "cargo.toml", "pom.xml",
+    "build.gradle", "build.gradle.kts", "composer.json", "gemfile", "mix.exs", "pubspec.yaml",
+}
+
+# A repository is treated as a monorepo when it has at least this many non-root packages
+MIN_MONOREPO_PACKAGES = 2
+# Largest packages kept in the per-package breakdown, bounding response size for huge monorepos
+MAX_PACKAGES = 200
+
+_EMPTY: FrozenSet[str] = frozenset()
+# Shared by every node and total without candidates; never updated in place
+_NO_COUNTS: Dict[str, int] = {}
+
+# Blobs worth sampling to verify that tests and CI are real rather than empty folders
+CODE_EXTENSIONS = {
+    "py", "js", "jsx", "ts", "tsx", "mjs", "cjs", "go", "rs", "java", "kt", "rb", "php", "cs",
+    "swift", "scala", "ex", "exs", "dart", "c", "cc", "cpp",
+}
+CI_FILES = {".gitlab-ci.yml", ".travis.yml", "jenkinsfile", "azure-pipelines.yml", "bitbucket-pipelines.yml", ".drone.yml"}
+CI_DIRS = {".github/workflows", ".circleci"}
+TEST_CONFIG_FILES = {"package.json", "pyproject.toml", "setup.cfg", "tox.ini", "pytest.ini"}
+# Candidates kept per kind (an evenly spaced sample); large repositories have thousands of test files
+MAX_CANDIDATES = 64
+
+
+def classify_candidate(path: str) -> Optional[str]:
+    """
+    Returns 'test', 'ci' or 'manifest' for blobs the sampler may inspect, else None.
+    """
+    parent, _, name = path.lower().rpartition("/")
+    return _classify(parent, name)
+
+
+def _classify(low_parent: str, low_name: str) -> Optional[str]:
+    if low_parent in CI_DIRS:
+        return "ci" if low_name.endswith((".yml", ".yaml")) else None
+    if not low_parent and low_name in CI_FILES:
+        return "ci"
+    if not low_parent and low_name in TEST_CONFIG_FILES:
+        return "manifest"
+    if "." in low_name and low_name.rsplit(".", 1)[-1] in CODE_EXTENSIONS and (
+            "test" in low_name or "spec" in low_name or "test" in low_parent):
+        return "test"
+    return None
+
+
+def _add_counts(current: Dict[str, int], other: Dict[str, int]) -> Dict[str, int]:
+    if not other:
+        return current
+    if not current:
+        return other
+    merged = dict(current)
+    for kind, count in other.items():
+        merged[kind] = merged.get(kind, 0) + count
+    return merged
+
+
+def _within(path: str, prefixes: Set[str]) -> bool:
+    """
+    Whether `path` is one of `prefixes` or lies below one of them.
+    """
+    while path:
+        if path in prefixes:
+            return True
+        path = path.rpartition("/")[0]
+    return False
+
+
+def _thin(candidates: Dict[str, Tuple[str, Optional[str], Optional[int]]]) -> Dict[str, Tuple[str, Optional[str], Optional[int]]]:
+    """
+    Keeps an evenly spaced sample of at most 2 * MAX_CANDIDATES candidates per kind.
+    """
+    by_kind: Dict[str, List[str]] = {}
+    for path, candidate in candidates.items():
+        by_kind.setdefault(candidate[0], []).append(path)
+    for paths in by_kind.values():
+        if len(paths) > 2 * MAX_CANDIDATES:
+            paths.sort()
+            kept = set(paths[::len(paths) // MAX_CANDIDATES])
+            for path in paths:
+                if path not in kept:
+                    del candidates[path]
+    return candidates
+
+
+def _union(current: FrozenSet[str], other: FrozenSet[str]) -> FrozenSet[str]:
+    if other <= current:
+        return current
+    if not current:
+        return other
+    return current | other
+
+
+class _Totals:
+    """
+    Aggregated structure features of everything below one directory.
+    Depends only on the directory's contents (not its own name), like a git tree SHA.
+    The frozenset is shared with children whenever a directory adds nothing new.
+    """
+
+    __slots__ = ("files", "folders", "height", "standard_folders",
+                 "has_readme", "has_tests", "has_gitignore", "has_ci", "candidates")
+
+    def __init__(self):
+        self.files = 0
+        self.folders = 0
+        self.height = 0
+        self.standard_folders: FrozenSet[str] = _EMPTY
+        self.has_readme = False
+        self.has_tests = False
+        self.has_gitignore = False
+        self.has_ci = False
+        self.candidates = _NO_COUNTS  # sampler candidates per kind (see classify_candidate)
+
+    def add_child(self, name: str, child: "_Totals"):
+        low_name = name.lower()
+        self.folders += 1 + child.folders
+        self.files += child.files
+        self.height = max(self.height, 1 + child.height)
+        self.standard_folders = _union(self.standard_folders, child.standard_folders)
+        if low_name in STANDARD_FOLDERS and low_name not in self.standard_folders:
+            self.standard_folders = self.standard_folders | {low_name}
+        self.has_readme = self.has_readme or child.has_readme
+        self.has_tests = self.has_tests or child.has_tests or "test" in low_name
+        self.has_ci = self.has_ci or child.has_ci or ".github" in low_name or ".circleci" in low_name
+        # Any file below a directory whose name contains '.gitignore' has it in its path
+        self.has_gitignore = self.has_gitignore or child.has_gitignore or (".gitignore" in low_name and child.files > 0)
+        self.candidates = _add_counts(self.candidates, child.candidates)
+
+
+class DirNode:
+    """
+    One directory in the structure trie: direct file aggregates plus subdirectories.
+    Nodes are treated as immutable once built, so identical subtrees can be shared
+    between snapshots and their totals memoized.
+    """
+
+    __slots__ = ("sha", "children", "file_count", "extensions", "readme_count", "gitignore_count",
+                 "manifests", "candidate_counts", "_totals")
+
+    def __init__(self, sha: Optional[str] = None):
+        self.sha = sha
+        self.children: Dict[str, "DirNode"] = {}
+        self.file_count = 0
+        self.extensions: Dict[str, int] = {}
+        self.readme_count = 0
+        self.gitignore_count = 0
+        self.manifests: Tuple[str, ...] = ()
+        self.candidate_counts = _NO_COUNTS  # sampler candidates per kind among the direct files
+        self._totals: Optional[_Totals] = None
+
+    def add_file(self, name: str):
+        low_name = name.lower()
+        self.file_count += 1
+        if low_name.endswith("readme.md"):
+            self.readme_count += 1
+        if ".gitignore" in low_name:
+            self.gitignore_count += 1
+        if "." in name:
+            ext = low_name.rsplit(".", 1)[-1]
+            self.extensions[ext] = self.extensions.get(ext, 0) + 1
+        if low_name in MANIFEST_FILES and low_name not in self.manifests:
+            self.manifests += (low_name,)
+
+    def remove_file(self, name: str):
+        low_name = name.lower()
+        self.file_count = max(0, self.file_count - 1)
+        if low_name.endswith("readme.md"):
+            self.readme_count = max(0, self.readme_count - 1)
+        if ".gitignore" in low_name:
+            self.gitignore_count = max(0, self.gitignore_count - 1)
+        if "." in name:
+            ext = low_name.rsplit(".", 1)[-1]
+            remaining = self.extensions.get(ext, 0) - 1
+            if remaining > 0:
+                self.extensions[ext] = remaining
+            else:
+                self.extensions.pop(ext, None)
+        if low_name in self.manifests:
+            self.manifests = tuple(m for m in self.manifests if m != low_name)
+
+    def count_candidate(self, kind: str, delta: int = 1):
+        counts = dict(self.candidate_counts)
+        remaining = counts.get(kind, 0) + delta
+        if remaining > 0:
+            counts[kind] = remaining
+        else:
+            counts.pop(kind, None)
+        self.candidate_counts = counts or _NO_COUNTS
+
+    def copy(self) -> "DirNode":
+        """
+        Shallow copy for copy-on-write updates. The copy's content differs from
+        the original's, so it has no tree SHA.
+        """
+        node = DirNode()
+        node.children = dict(self.children)
+        node.file_count = self.file_count
+        node.extensions = dict(self.extensions)
+        node.readme_count = self.readme_count
+        node.gitignore_count = self.gitignore_count
+        node.manifests = self.manifests
+        node.candidate_counts = self.candidate_counts
+        return node
+
+    def is_empty(self) -> bool:
+        return self.file_count == 0 and not self.children
+
+    def own_totals(self) -> _Totals:
+        """
+        Totals for the files directly in this directory (subdirectories excluded).
+        """
+        totals = _Totals()
+        totals.files = self.file_count
+        totals.height = 1 if self.file_count else 0
+        totals.has_readme = self.readme_count > 0
+        totals.has_gitignore = self.gitignore_count > 0
+        totals.candidates = self.candidate_counts
+        return totals
+
+
+def compute_totals(node: DirNode, exclude: Optional[Set[int]] = None) -> _Totals:
+    """
+    Aggregates a subtree bottom-up without recursion. Results are memoized on each
+    node unless `exclude` (ids of subtrees to leave out) is given.
+    """
+    memoize = exclude is None
+    if memoize and node._totals is not None:
+        return node._totals
+
+    results: Dict[int, _Totals] = {}
+    stack: List[Tuple[DirNode, bool]] = [(node, False)]
+    while stack:
+        current, expanded = stack.pop()
+        if memoize and current._totals is not None:
+            results[id(current)] = current._totals
+            continue
+        if not expanded:
+            stack.append((current, True))
+            for child in current.children.values():
+                if exclude is None or id(child) not in exclude:
+                    stack.append((child, False))
+            continue
+        totals = current.own_totals()
+        for name, child in current.children.items():
+            if exclude is None or id(child) not in exclude:
+                totals.add_child(name, results[id(child)])
+        if memoize:
+            current._totals = totals
+        results[id(current)] = totals
+    return results[id(node)]
+
+
+class StructureIndex:
+    """
+    Prefix trie of a repository's directories with per-directory aggregates,
+    built in a single pass over a recursive tree listing. Summarizes into the
+    structure metrics used for scoring, and detects package roots (manifests)
+    so monorepo packages can be scored individually.
+    """
+
+    def __init__(self, root: DirNode, package_paths: Optional[List[str]] = None,
+                 candidates: Optional[Dict[str, Tuple[str, Optional[str], Optional[int]]]] = None,
+                 candidate_counts: Optional[Dict[str, int]] = None):
+        self.root = root
+        self.package_paths = package_paths if package_paths is not None else self._find_package_paths()
+        # path -> (kind, blob sha, size) for a bounded sample of the blobs the sampler may
+        # inspect (see classify_candidate), and how many blobs of each kind there are in total
+        self.candidates = candidates if candidates is not None else {}
+        self.candidate_counts = candidate_counts if candidate_counts is not None else {}
+
+    @classmethod
+    def from_tree_items(cls, tree_items: Iterable[Dict[str, Any]], root_sha: Optional[str] = None) -> "StructureIndex":
+        """
+        Builds the trie from a recursive git tree listing in one pass.
+        """
+        root = DirNode(root_sha)
+        directories: Dict[str, DirNode] = {"": root}
+        package_paths: Set[str] = set()
+        samples: Dict[str, List[Tuple[str, Optional[str], Optional[int]]]] = {}
+        counts: Dict[str, int] = {}
+        strides: Dict[str, int] = {}
+        extension_names: Dict[str, str] = {}  # one shared string per extension across nodes
+
+        def directory(path: str) -> DirNode:
+            node = directories.get(path)
+            if node is None:
+                parent_path, _, name = path.rpartition("/")
+                node = DirNode()
+                directory(parent_path).children[name] = node
+                directories[path] = node
+            return node
+
+        # Listings are path-sorted, so consecutive blobs usually share a directory
+        last_parent, last_node, low_parent = "", root, ""
+        # Root and CI directories need full classification; test directories only make code files candidates
+        special_dir, test_dir = True, False
+        for item in tree_items:
+            item_type = item.get("type")
+            if item_type == "blob":
+                path = item.get("path", "")
+                parent_path, _, name = path.rpartition("/")
+                if parent_path != last_parent:
+                    last_parent, last_node = parent_path, directory(parent_path)
+                    low_parent = parent_path.lower()
+                    special_dir = not parent_path or low_parent in CI_DIRS
+                    test_dir = "test" in low_parent
+                node = last_node
+                # Inlined DirNode.add_file: this loop runs once per file in the repository
+                low_name = name.lower()
+                node.file_count += 1
+                ext = None
+                if "." in low_name:
+                    ext = low_name.rsplit(".", 1)[-1]
+                    ext = extension_names.setdefault(ext, ext)
+                    node.extensions[ext] = node.extensions.get(ext, 0) + 1
+                    if low_name.endswith("readme.md"):
+                        node.readme_count += 1
+                    if ".gitignore" in low_name:
+                        node.gitignore_count += 1
+                if low_name in MANIFEST_FILES and low_name not in node.manifests:
+                    node.manifests += (low_name,)
+                    package_paths.add(parent_path)
+
+                if special_dir:
+                    kind = _classify(low_parent, low_name)
+                elif ext in CODE_EXTENSIONS and (test_dir or "test" in low_name or "spec" in low_name):
+                    kind = "test"
+                else:
+                    continue
+                if kind:
+                    node_counts = node.candidate_counts
+                    if node_counts is _NO_COUNTS:
+                        node_counts = node.candidate_counts = {}
+                    node_counts[kind] = node_counts.get(kind, 0) + 1
+                    # Keep every stride-th candidate, doubling the stride whenever the sample fills up
+                    seen = counts.get(kind, 0)
+                    counts[kind] = seen + 1
+                    stride = strides.setdefault(kind, 1)
+                    if seen % stride == 0:
+                        sample = samples.setdefault(kind, [])
+                        sample.append((path, item.get("sha"), item.get("size")))
+                        if len(sample) >= 2 * MAX_CANDIDATES:
+                            del sample[1::2]
+                            strides[kind] = stride * 2
+            elif item_type == "tree":
+                directory(item.get("path", "")).sha = item.get("sha")
+
+        candidates = {path: (kind, sha, size) for kind, sample in samples.items() for path, sha, size in sample}
+        return cls(root, sorted(package_paths), candidates, counts)
+
+    def _find_package_paths(self) -> List[str]:
+        return sorted(path for path, node in self.iter_nodes() if node.manifests)
+
+    @property
+    def root_sha(self) -> Optional[str]:
+        return self.root.sha
+
+    def has_tree_shas(self) -> bool:
+        """
+        Whether the root or a top-level directory carries its git tree SHA.
+        """
+        return bool(self.root.sha) or any(child.sha for child in self.root.children.values())
+
+    def node_at(self, path: str) -> Optional[DirNode]:
+        node = self.root
+        for part in filter(None, path.split("/")):
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+
+    def apply_changes(self, files: Iterable[Dict[str, Any]], reverse: bool = False) -> "StructureIndex":
+        """
+        Returns a new index with file changes applied, as listed by the compare API
+        (filename, status, previous_filename). With reverse=True the changes are
+        undone instead. Only directories on changed paths are copied; every other
+        subtree, and its memoized totals, is shared with this index.
+        """
+        root = self.root.copy()
+        copied = {id(root)}
+
+        def writable_path(path: str, create: bool) -> List[Tuple[str, DirNode]]:
+            # (name, node) pairs from the root down to the directory at `path`, copying as needed
+            chain = [("", root)]
+            for part in filter(None, path.split("/")):
+                parent = chain[-1][1]
+                child = parent.children.get(part)
+                if child is None:
+                    if not create:
+                        return []
+                    child = DirNode()
+                elif id(child) not in copied:
+                    child = child.copy()
+                else:
+                    chain.append((part, child))
+                    continue
+                copied.add(id(child))
+                parent.children[part] = child
+                chain.append((part, child))
+            return chain
+
+        def add(path: str) -> DirNode:
+            parent_path, _, name = path.rpartition("/")
+            node = writable_path(parent_path, create=True)[-1][1]
+            node.add_file(name)
+            return node
+
+        def remove(path: str) -> Optional[DirNode]:
+            parent_path, _, name = path.rpartition("/")
+            chain = writable_path(parent_path, create=False)
+            if not chain:
+                return None
+            node = chain[-1][1]
+            node.remove_file(name)
+            # Git has no empty directories, so prune any left behind
+            for i in range(len(chain) - 1, 0, -1):
+                name, node = chain[i]
+                if not node.is_empty():
+                    break
+                chain[i - 1][1].children.pop(name, None)
+            return node
+
+        candidates = dict(self.candidates)
+        counts = dict(self.candidate_counts)
+
+        def track(path: str, present: bool, node: Optional[DirNode] = None, sha: Optional[str] = None):
+            # Blob SHAs are only known going forward (compare API); otherwise the blob can't be sampled.
+            # Without a node the file was modified in place, so the counts stay the same.
+            kind = classify_candidate(path)
+            if kind is None:
+                return
+            if node is not None:
+                counts[kind] = max(0, counts.get(kind, 0) + (1 if present else -1))
+                node.count_candidate(kind, 1 if present else -1)
+            if present:
+                candidates[path] = (kind, sha, None)
+            else:
+                candidates.pop(path, None)
+
+        for change in files:
+            status = change.get("status")
+            filename = change.get("filename", "")
+            previous = change.get("previous_filename")
+            sha = None if reverse else change.get("sha")
+            if status == "renamed" and previous:
+                removed_from = remove(filename if reverse else previous)
+                added_to = add(previous if reverse else filename)
+                track(filename, not reverse, added_to if not reverse else removed_from, sha)
+                track(previous, reverse, removed_from if not reverse else added_to)
+            elif status in ("added", "copied"):
+                track(filename, not reverse, (remove if reverse else add)(filename), sha)
+            elif status == "removed":
+                track(filename, reverse, (add if reverse else remove)(filename))
+            elif status in ("modified", "changed"):
+                track(filename, True, sha=sha)
+
+        return StructureIndex(root, candidates=candidates, candidate_counts=counts)
+
+    def refresh(self, root_listing: Dict[str, Any],
+                fetch_trees: Callable[[List[Tuple[str, bool]]], List[Optional[Dict[str, Any]]]],
+                max_fetches: int) -> Optional["StructureIndex"]:
+        """
+        Builds the index of a newer version of the repository from its non-recursive
+        root tree listing, descending only into subtrees whose SHA differs from this
+        index's. Unchanged subtrees, and their memoized totals, are shared.
+
+        `fetch_trees` fetches a batch of (tree SHA, recursive) listings; directories
+        that did not exist before are fetched recursively in one request each.
+        Returns None if more than `max_fetches` listings would be needed, or one is
+        missing or truncated.
+        """
+        root = DirNode(root_listing.get("sha"))
+        reused: Set[str] = set()
+        package_paths: List[str] = []
+        candidates: Dict[str, Tuple[str, Optional[str], Optional[int]]] = {}
+        fetches = 0
+        # (path, new node, previous node, listing) of the directories to fill in, one level at a time
+        level: List[Tuple[str, DirNode, Optional[DirNode], Dict[str, Any]]] = [("", root, self.root, root_listing)]
+        while level:
+            changed: List[Tuple[str, DirNode, str, Optional[DirNode], Optional[str]]] = []
+            for path, node, previous, listing in level:
+                low_parent = path.lower()
+                for entry in listing.get("tree") or []:
+                    name = entry.get("path", "")
+                    child_path = f"{path}/{name}" if path else name
+                    if entry.get("type") == "blob":
+                        node.add_file(name)
+                        kind = _classify(low_parent, name.lower())
+                        if kind:
+                            node.count_candidate(kind)
+                            candidates[child_path] = (kind, entry.get("sha"), entry.get("size"))
+                    elif entry.get("type") == "tree":
+                        sha = entry.get("sha")
+                        old_child = previous.children.get(name) if previous is not None else None
+                        if old_child is not None and sha and old_child.sha == sha:
+                            node.children[name] = old_child
+                            reused.add(child_path)
+                        else:
+                            changed.append((child_path, node, name, old_child, sha))
+                if node.manifests:
+                    package_paths.append(path)
+            if not changed:
+                break
+
+            fetches += len(changed)
+            if fetches > max_fetches:
+                return None
+            listings = fetch_trees([(sha, old_child is None) for _, _, _, old_child, sha in changed])
+            level = []
+            for (child_path, parent, name, old_child, sha), listing in zip(changed, listings):
+                if not listing or listing.get("truncated"):
+                    return None
+                if old_child is None:
+                    # A new directory: classify its recursive listing with full paths
+                    prefix = child_path + "/"
+                    subtree = StructureIndex.from_tree_items(
+                        dict(item, path=prefix + item.get("path", "")) for item in listing.get("tree") or []
+                    )
+                    child = subtree.node_at(child_path) or DirNode()
+                    child.sha = sha
+                    parent.children[name] = child
+                    package_paths.extend(subtree.package_paths)
+                    candidates.update(subtree.candidates)
+                else:
+                    child = DirNode(sha)
+                    parent.children[name] = child
+                    level.append((child_path, child, old_child, listing))
+
+        # Whatever lies below a reused subtree is unchanged
+        for path, candidate in self.candidates.items():
+            if path not in candidates and _within(path.rpartition("/")[0], reused):
+                candidates[path] = candidate
+        package_paths.extend(path for path in self.package_paths if path and _within(path, reused))
+        counts = dict(compute_totals(root).candidates)
+        return StructureIndex(root, sorted(set(package_paths)), _thin(candidates), counts)
+
+    def share_subtrees(self, nodes: Dict[str, DirNode]) -> List[str]:
+        """
+        Replaces subtrees whose tree SHA is already in `nodes` (from other snapshots)
+        with those nodes, so identical subtrees share memory and memoized totals, and
+        registers this index's other SHAs. Returns the SHAs it registered.
+        Only call this before the index is shared, since it updates nodes in place.
+        """
+        registered: List[str] = []
+        if self.root.sha and self.root.sha not in nodes:
+            nodes[self.root.sha] = self.root
+            registered.append(self.root.sha)
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            for name, child in node.children.items():
+                known = nodes.get(child.sha) if child.sha else None
+                if known is not None:
+                    if known is not child:
+                        node.children[name] = known
+                    continue
+                if child.sha:
+                    nodes[child.sha] = child
+                    registered.append(child.sha)
+                stack.append(child)
+        return registered
+
+    def is_monorepo(self) -> bool:
+        return sum(1 for p in self.package_paths if p) >= MIN_MONOREPO_PACKAGES
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Returns the structure metrics consumed by ScoringService.calculate_score.
+        """
+        totals = compute_totals(self.root)
+        structure = self._structure_dict(self.root, totals)
+        structure["packages"] = self.packages() if self.is_monorepo() else []
+        return structure
+
+    def iter_nodes(self) -> Iterator[Tuple[str, DirNode]]:
+        """
+        Yields (path, node) for every directory, parents before children.
+        """
+        stack = [("", self.root)]
+        while stack:
+            path, node = stack.pop()
+            yield path, node
+            for name, child in node.children.items():
+                stack.append((f"{path}/{name}" if path else name, child))
+
+    def extensions(self) -> List[str]:
+        extensions: Set[str] = set()
+        for _, node in self.iter_nodes():
+            extensions.update(node.extensions)
+        return list(extensions)
+
+    @staticmethod
+    def _structure_dict(node: DirNode, totals: _Totals) -> Dict[str, Any]:
+        return {
+            "file_count": totals.files,
+            "folder_count": totals.folders,
+            "root_files_count": node.file_count,
+            "max_depth": totals.height,
+            "has_readme": totals.has_readme,
+            "has_tests": totals.has_tests,
+            "has_gitignore": totals.has_gitignore,
+            "has_ci": totals.has_ci,
+            "standard_folders": list(totals.standard_folders)
+        }
+
+    def packages(self) -> List[Dict[str, Any]]:
+        """
+        Per-package structure features. Each package covers its directory minus any
+        nested packages; repository-wide CI and .gitignore are inherited.
+        """
+        repo_totals = compute_totals(self.root)
+        package_nodes = {path: self.node_at(path) for path in self.package_paths}
+        nested_ids = {id(node) for path, node in package_nodes.items() if path and node is not None}
+
+        packages = []
+        for path, node in package_nodes.items():
+            if node is None:
+                continue
+            exclude = nested_ids - {id(node)}
+            totals = compute_totals(node, exclude=exclude) if exclude else compute_totals(node)
+            features = self._structure_dict(node, totals)
+            features["has_ci"] = features["has_ci"] or repo_totals.has_ci
+            features["has_gitignore"] = features["has_gitignore"] or repo_totals.has_gitignore
+            features.update({"path": path or ".", "manifests": sorted(node.manifests)})
+            packages.append(features)
+        if len(packages) > MAX_PACKAGES:
+            packages = sorted(packages, key=lambda pkg: pkg["file_count"], reverse=True)[:MAX_PACKAGES]
+            packages.sort(key=lambda pkg: pkg["path"])
+        return packages
+
+
+class StructureStore:
+    """
+    In-memory LRU of recently built structure indexes per repository, tagged with
+    the commit they were built from, plus the rest of that analysis. Lets a fork
+    be analyzed as a delta against its already-analyzed parent. Bounded both by
+    entry count and by the total number of files indexed.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, max_files: Optional[int] = None):
+        self.max_entries = max_entries or int(os.getenv("STRUCTURE_CACHE_SIZE", "64"))
+        self.max_files = max_files or int(os.getenv("STRUCTURE_CACHE_FILES", "500000"))
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._files = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(owner: str, repo: str) -> str:
+        return f"{owner}/{repo}".lower()
+
+    def get(self, owner: str, repo: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns {"commit", "index", "repo_data"} for the repository, if present.
+        """
+        key = self.key(owner, repo)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, owner: str, repo: str, commit_sha: str, index: StructureIndex, repo_data: Dict[str, Any]):
+        key = self.key(owner, repo)
+        files = compute_totals(index.root).files
+        if files > self.max_files:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._files -= previous["files"]
+            self._entries[key] = {"commit": commit_sha, "index": index, "repo_data": repo_data, "files": files}
+            self._files += files
+            while len(self._entries) > self.max_entries or self._files > self.max_files:
+                _, evicted = self._entries.popitem(last=False)
+                self._files -= evicted["files"]
+
+    def invalidate(self, owner: str, repo: str):
+        with self._lock:
+            entry = self._entries.pop(self.key(owner, repo), None)
+            if entry is not None:
+                self._files -= entry["files"]
+
+    def __len__(self) -> int:
+        return len(self._entries)
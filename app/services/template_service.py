@@ -0,0 +1,147 @@
+import os
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .metrics_service import metrics
+from .structure_service import DirNode, StructureIndex, compute_totals
+
+
+class TemplateRegistry:
+    """
+    Content-addressed structure results shared across all repositories.
+
+    Every analyzed directory is remembered by git tree SHA together with its
+    origin: of the repositories seen with it, the one whose history starts
+    earliest (the first seen among equally old or undated ones), so the answer
+    does not depend on which one this worker happened to analyze first.
+    A repository whose root tree was analyzed before (a scaffold pushed unchanged,
+    a course starter kit) reuses that index without fetching its tree; identical
+    subtrees of different repositories share one node and its memoized totals.
+    The same records tell which older repository a tree was copied from.
+    """
+
+    def __init__(self, max_trees: Optional[int] = None, max_files: Optional[int] = None,
+                 min_files: Optional[int] = None):
+        # Bounds for directory nodes by SHA, and for the files of whole indexes kept by root SHA
+        self.max_trees = max_trees or int(os.getenv("TEMPLATE_CACHE_TREES", "200000"))
+        self.max_files = max_files or int(os.getenv("TEMPLATE_CACHE_FILES", "500000"))
+        # Shared subtrees smaller than this don't count as copied (e.g. a stock CI workflow)
+        self.min_files = min_files or int(os.getenv("TEMPLATE_MIN_FILES", "20"))
+        self._nodes: "OrderedDict[str, DirNode]" = OrderedDict()
+        # tree SHA -> (repository, its first commit) with the earliest first commit seen
+        self._origins: Dict[str, Tuple[str, Optional[str]]] = {}
+        self._indexes: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._indexed_files = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(owner: str, repo: str) -> str:
+        return f"{owner}/{repo}".lower()
+
+    @staticmethod
+    def _older(first_commit: Optional[str], than: Optional[str]) -> bool:
+        # Strictly earlier first commit; an undated repository is older than none
+        return first_commit is not None and (than is None or first_commit < than)
+
+    def lookup(self, tree_sha: Optional[str]) -> Optional[StructureIndex]:
+        """
+        Returns the index of an already analyzed root tree. It is shared, so treat it as immutable.
+        """
+        if not tree_sha:
+            return None
+        with self._lock:
+            entry = self._indexes.get(tree_sha)
+            if entry is not None:
+                self._indexes.move_to_end(tree_sha)
+        metrics.record_cache("template", entry is not None)
+        return entry["index"] if entry else None
+
+    def register(self, owner: str, repo: str, index: StructureIndex, first_commit: Optional[str] = None):
+        """
+        Records a freshly built index: its subtrees are deduplicated against every
+        subtree seen before, and the whole index is kept under its root tree SHA.
+        `first_commit` (ISO date, if known) dates the repository for claim().
+        """
+        files = compute_totals(index.root).files
+        with self._lock:
+            index.share_subtrees(self._nodes)
+            self._claim(self.key(owner, repo), first_commit, index)
+            while len(self._nodes) > self.max_trees:
+                sha, _ = self._nodes.popitem(last=False)
+                self._origins.pop(sha, None)
+
+            if not index.root_sha or files > self.max_files or index.root_sha in self._indexes:
+                return
+            self._indexes[index.root_sha] = {"index": index, "files": files}
+            self._indexed_files += files
+            while self._indexed_files > self.max_files:
+                _, evicted = self._indexes.popitem(last=False)
+                self._indexed_files -= evicted["files"]
+
+    def claim(self, owner: str, repo: str, index: StructureIndex, first_commit: Optional[str] = None):
+        """
+        Makes the repository the origin of the index's subtrees where its history
+        starts earlier than their current origin's. For indexes that were not
+        registered (reused from lookup()).
+        """
+        with self._lock:
+            self._claim(self.key(owner, repo), first_commit, index)
+
+    def _claim(self, key: str, first_commit: Optional[str], index: StructureIndex):
+        claim = (key, first_commit)
+        stack = [index.root]
+        while stack:
+            node = stack.pop()
+            if node.sha:
+                origin = self._origins.get(node.sha)
+                # A subtree's origin held all of it, so its subtrees' origins are no later
+                if origin is not None and not self._older(first_commit, origin[1]):
+                    continue
+                if node.sha in self._nodes:
+                    self._origins[node.sha] = claim
+            stack.extend(node.children.values())
+
+    def match(self, owner: str, repo: str, index: StructureIndex, first_commit: Optional[str] = None,
+              upstream: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Reports the older repository this tree was mostly copied from: how many
+        files lie in subtrees (of at least min_files files) that originate in
+        another repository, and which repository contributed most of them. Subtrees
+        whose origin started after this repository's `first_commit` were copied from
+        it, not into it (undated ones still count). `upstream`, the template GitHub
+        says the repository was generated from, is named instead when given. None
+        if nothing substantial is shared. Call before register, so new SHAs aren't
+        attributed yet.
+        """
+        key = self.key(owner, repo)
+        total = compute_totals(index.root).files
+        if not total:
+            return None
+        shared = 0
+        sources: Counter = Counter()
+        stack = [index.root]
+        while stack:
+            node = stack.pop()
+            origin = self._origins.get(node.sha) if node.sha else None
+            copied = origin is not None and origin[0] != key and not (
+                origin[1] is not None and self._older(first_commit, origin[1]))
+            if copied:
+                files = compute_totals(node).files
+                shared += files
+                sources[origin[0]] += files
+                continue
+            for child in node.children.values():
+                if compute_totals(child).files >= self.min_files:
+                    stack.append(child)
+        if not shared:
+            return None
+        template = upstream.lower() if upstream else sources.most_common(1)[0][0]
+        root_origin = self._origins.get(index.root_sha or "")
+        return {
+            "template": template,
+            "declared": upstream is not None,
+            "exact": shared == total and (upstream is not None or root_origin is not None and root_origin[0] == template),
+            "shared_files": shared,
+            "share": round(shared / total, 2),
+        }
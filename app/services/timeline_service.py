@@ -0,0 +1,281 @@
+import logging
+import os
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import copy_context
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from .github_service import GitHubService
+from .improvement_service import WEAKNESS_TABLE, Weakness, decode_weaknesses, encode_weaknesses
+from .metrics_service import metrics
+from .scoring_service import ScoringService
+from .structure_service import DirNode, StructureIndex
+from ..utils.helpers import Deadline
+
+logger = logging.getLogger(__name__)
+
+# Root-level README blobs of a snapshot: path -> blob SHA
+Readmes = Dict[str, Optional[str]]
+
+
+class TimelineService:
+    """
+    Reconstructs how a repository's score evolved by scoring a sample of past commits.
+
+    Only the oldest sampled snapshot needs its full tree; every later one is derived
+    from the previous snapshot and the compare API's file list, with unchanged
+    subtrees shared between snapshots. Snapshots are cached by tree SHA, so commits
+    that did not change the tree, and repeated timelines, cost no tree requests.
+    """
+
+    DEFAULT_POINTS = 12
+    COMMITS_PER_PAGE = 100
+
+    def __init__(self, github_service: GitHubService, scoring_service: ScoringService,
+                 max_commits: Optional[int] = None, cache_size: Optional[int] = None, max_workers: int = 4):
+        self.github = github_service
+        self.scoring = scoring_service
+        # History older than this many commits is not fetched (one request per 100 commits)
+        self.max_commits = max_commits or int(os.getenv("TIMELINE_MAX_COMMITS", "1000"))
+        self.cache_size = cache_size or int(os.getenv("TIMELINE_TREE_CACHE", "64"))
+        self._snapshots: "OrderedDict[str, Tuple[StructureIndex, Readmes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="timeline")
+
+    def _cached(self, tree_sha: Optional[str]) -> Optional[Tuple[StructureIndex, Readmes]]:
+        if not tree_sha:
+            return None
+        with self._lock:
+            snapshot = self._snapshots.get(tree_sha)
+            if snapshot is not None:
+                self._snapshots.move_to_end(tree_sha)
+        metrics.record_cache("timeline_tree", snapshot is not None)
+        return snapshot
+
+    def _store(self, tree_sha: Optional[str], snapshot: Tuple[StructureIndex, Readmes]):
+        if not tree_sha:
+            return
+        with self._lock:
+            self._snapshots[tree_sha] = snapshot
+            self._snapshots.move_to_end(tree_sha)
+            while len(self._snapshots) > self.cache_size:
+                self._snapshots.popitem(last=False)
+
+    @staticmethod
+    def _commit_date(commit: Dict[str, Any]) -> Optional[datetime]:
+        date = commit.get("commit", {}).get("author", {}).get("date")
+        if not date:
+            return None
+        try:
+            return datetime.strptime(date, "%Y-%m-%dT%H:%M:%SZ")
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _tree_sha(commit: Dict[str, Any]) -> Optional[str]:
+        return commit.get("commit", {}).get("tree", {}).get("sha")
+
+    def _history(self, owner: str, repo: str, since: Optional[str]) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Fetches up to max_commits commits, newest first. Also returns whether older
+        history was left out.
+        """
+        commits: List[Dict[str, Any]] = []
+        page = 1
+        while len(commits) < self.max_commits:
+            batch = self.github.get_commit_history(owner, repo, page=page, per_page=self.COMMITS_PER_PAGE, since=since)
+            commits.extend(batch)
+            if len(batch) < self.COMMITS_PER_PAGE:
+                return commits, False
+            page += 1
+        return commits[:self.max_commits], True
+
+    def sample_commits(self, commits: List[Dict[str, Any]], points: int) -> List[int]:
+        """
+        Picks up to `points` commits evenly spaced in time across the history
+        (newest first), always including the newest. Returns their list positions,
+        oldest first.
+        """
+        dated = sorted((date, i) for i, date in ((i, self._commit_date(c)) for i, c in enumerate(commits)) if date)
+        if not dated or points <= 1:
+            return [0] if commits else []
+        dates = [date for date, _ in dated]
+        first, span = dates[0], dates[-1] - dates[0]
+        chosen = {0}
+        for k in range(points - 1):
+            target = first + span * k / (points - 1)
+            chosen.add(dated[max(0, bisect_right(dates, target) - 1)][1])
+        # In history order, so each snapshot is diffed against its predecessor
+        return sorted(chosen, reverse=True)
+
+    @staticmethod
+    def _root_readmes(tree_items: List[Dict[str, Any]]) -> Readmes:
+        return {
+            item["path"]: item.get("sha") for item in tree_items
+            if item.get("type") == "blob" and "/" not in item.get("path", "/")
+            and item["path"].lower().startswith("readme")
+        }
+
+    @staticmethod
+    def _apply_readme_changes(readmes: Readmes, files: List[Dict[str, Any]]) -> Readmes:
+        readmes = dict(readmes)
+        for change in files:
+            filename = change.get("filename", "")
+            previous = change.get("previous_filename")
+            if previous and "/" not in previous:
+                readmes.pop(previous, None)
+            if "/" in filename or not filename.lower().startswith("readme"):
+                continue
+            if change.get("status") == "removed":
+                readmes.pop(filename, None)
+            else:
+                readmes[filename] = change.get("sha")
+        return readmes
+
+    @staticmethod
+    def _preferred_readme(readmes: Readmes) -> Optional[str]:
+        """
+        The README GitHub would render: README.md if present, else the first by name.
+        """
+        if not readmes:
+            return None
+        path = min(readmes, key=lambda p: (p.lower() != "readme.md", p.lower()))
+        return readmes[path]
+
+    def _full_snapshot(self, owner: str, repo: str, tree_sha: str) -> Tuple[StructureIndex, Readmes]:
+        tree_data = self.github.get_git_tree(owner, repo, branch=tree_sha)
+        tree_items = tree_data.get("tree", []) if tree_data else []
+        index = StructureIndex.from_tree_items(tree_items, root_sha=tree_data.get("sha") if tree_data else None)
+        return index, self._root_readmes(tree_items)
+
+    def _compare(self, owner: str, repo: str, base: str, head: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Files changed from `base` to `head`, or None unless the listing is a complete
+        forward diff (base is an ancestor of head, and not too many files changed).
+        """
+        comparison = self.github.compare_commits(owner, repo, base, head)
+        if not comparison or comparison.get("status") not in ("ahead", "identical"):
+            return None
+        files = comparison.get("files") or []
+        if len(files) >= ScoringService.COMPARE_FILE_LIMIT:
+            return None
+        return files
+
+    def build_timeline(self, owner: str, repo: str, points: Optional[int] = None,
+                       since: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Scores `points` commits sampled across the history (optionally only commits
+        after `since`) and reports when each weakness was resolved or introduced.
+        Returns {"error": ...} if the repository does not exist.
+        """
+        points = points or self.DEFAULT_POINTS
+        with Deadline(self.scoring.analysis_deadline).scope(), metrics.time_stage("timeline"):
+            metadata = self.github.get_repo_metadata(owner, repo)
+            if not metadata:
+                return {"error": "Repository not found"}
+            commits, truncated = self._history(owner, repo, since)
+            positions = self.sample_commits(commits, points)
+
+            # Fetch the diffs between consecutive snapshots concurrently; applying them stays sequential
+            diffs: Dict[int, Future] = {}
+            for previous, position in zip(positions, positions[1:]):
+                tree_sha = self._tree_sha(commits[position])
+                if tree_sha != self._tree_sha(commits[previous]) and tree_sha not in self._snapshots:
+                    diffs[position] = self._executor.submit(
+                        copy_context().run, self._compare, owner, repo, commits[previous]["sha"], commits[position]["sha"]
+                    )
+            languages = self.github.get_languages(owner, repo) or {}
+            timeline = self._score_points(owner, repo, commits, positions, diffs, languages)
+
+        return dict(timeline, repo=f"{owner}/{repo}", commits_considered=len(commits), history_truncated=truncated)
+
+    def _score_points(self, owner: str, repo: str, commits: List[Dict[str, Any]], positions: List[int],
+                      diffs: Dict[int, Future], languages: Dict[str, int]) -> Dict[str, Any]:
+        nodes: Dict[str, DirNode] = {}  # subtrees shared between this timeline's snapshots
+        readme_texts: Dict[Optional[str], str] = {None: ""}
+        index: Optional[StructureIndex] = None
+        readmes: Readmes = {}
+        evidence: Optional[Dict[str, Any]] = None
+        previous_tree, previous_mask = None, None
+        series: List[Dict[str, Any]] = []
+        last_resolved: Dict[Weakness, Dict[str, Any]] = {}
+
+        for position in positions:
+            commit = commits[position]
+            tree_sha = self._tree_sha(commit)
+            source = "unchanged"
+            if index is None or tree_sha != previous_tree:
+                cached = self._cached(tree_sha)
+                files = None
+                future = diffs.get(position)
+                if cached is None and future is not None and index is not None:
+                    try:
+                        files = future.result()
+                    except Exception as e:
+                        logger.warning(f"Timeline compare failed for {owner}/{repo}@{commit['sha']}: {e}")
+                if cached is not None:
+                    index, readmes = cached
+                    source = "cache"
+                elif files is not None:
+                    index = index.apply_changes(files)
+                    index.root.sha = tree_sha
+                    readmes = self._apply_readme_changes(readmes, files)
+                    source = "diff"
+                else:
+                    index, readmes = self._full_snapshot(owner, repo, tree_sha or commit["sha"])
+                    source = "tree"
+                if source != "cache":
+                    index.share_subtrees(nodes)
+                    self._store(tree_sha, (index, readmes))
+            previous_tree = tree_sha
+
+            readme_sha = self._preferred_readme(readmes)
+            if readme_sha not in readme_texts:
+                content = self.github.get_blob(owner, repo, readme_sha)
+                readme_texts[readme_sha] = content.decode("utf-8", errors="replace") if content else ""
+
+            structure = index.summary()
+            evidence = self.scoring.sampler.carry_over(evidence, index)
+            self.scoring.sampler.apply(structure, evidence)
+            history = commits[position:position + 100]
+            score = self.scoring.calculate_score({
+                "structure": structure,
+                "activity": self.scoring.analyze_activity(history),
+                "documentation": {"readme_content": readme_texts[readme_sha]},
+                # Language byte counts exist only for the current tree; extensions are per snapshot
+                "tech_stack": {"languages": list(languages), "language_distribution": languages,
+                               "detected_extensions": index.extensions()},
+            })
+
+            mask = encode_weaknesses(score["weakness_codes"])
+            resolved = previous_mask & ~mask if previous_mask is not None else 0
+            introduced = mask & ~previous_mask if previous_mask is not None else 0
+            date = commit.get("commit", {}).get("author", {}).get("date")
+            for code in decode_weaknesses(resolved):
+                last_resolved[code] = {"code": code.name, "message": WEAKNESS_TABLE[code]["message"],
+                                       "sha": commit["sha"], "date": date}
+            series.append({
+                "sha": commit["sha"],
+                "date": date,
+                "message": (commit.get("commit", {}).get("message") or "").split("\n", 1)[0],
+                "total_score": score["total_score"],
+                "level": score["level"],
+                "category_scores": {name: category["score"] for name, category in score["breakdown"].items()},
+                "weakness_codes": score["weakness_codes"],
+                "resolved": [code.name for code in decode_weaknesses(resolved)],
+                "introduced": [code.name for code in decode_weaknesses(introduced)],
+                "structure_source": source,
+            })
+            previous_mask = mask
+
+        final_mask = previous_mask or 0
+        return {
+            "points": series,
+            "score_change": series[-1]["total_score"] - series[0]["total_score"] if series else 0,
+            # Weaknesses fixed along the way and still fixed at the newest point, with when
+            "resolved_weaknesses": [entry for code, entry in last_resolved.items() if not final_mask & code],
+            "remaining_weaknesses": [code.name for code in decode_weaknesses(final_mask)],
+        }
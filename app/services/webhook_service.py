@@ -0,0 +1,115 @@
+import hashlib
+import hmac
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from .cache_service import AnalysisCache
+from .metrics_service import metrics
+from .scoring_service import ScoringService
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookService:
+    """
+    Keeps cached analyses fresh from GitHub webhook deliveries instead of polling.
+
+    Push events to a repository's default branch are applied as deltas to the
+    stored structure index and commit sample, so the repository is re-scored
+    without any GitHub API call (a changed README costs one). Pushes that
+    cannot be applied exactly fall back to a full re-analysis in the background.
+    """
+
+    # Pushes larger than this are cheaper to re-analyze than to replay
+    MAX_PUSH_COMMITS = 200
+    MAX_PUSH_CHANGES = 3000
+
+    def __init__(self, scoring_service: ScoringService, analysis_cache: AnalysisCache, secret: Optional[str] = None):
+        self.scoring = scoring_service
+        self.cache = analysis_cache
+        self.secret = secret or os.getenv("GITHUB_WEBHOOK_SECRET")
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="webhook-reanalysis")
+
+    def verify_signature(self, body: bytes, signature: Optional[str]) -> bool:
+        """
+        Checks the X-Hub-Signature-256 header ('sha256=<hex HMAC of the body>').
+        Always fails when no webhook secret is configured.
+        """
+        if not self.secret or not signature or not signature.startswith("sha256="):
+            return False
+        expected = hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, signature[len("sha256="):])
+
+    def handle(self, event: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Processes one verified delivery. Returns what was done, and the new score
+        result when a repository was re-scored in place.
+        """
+        if event == "ping":
+            return {"action": "pong"}
+
+        repository = payload.get("repository") or {}
+        full_name = repository.get("full_name", "")
+        if "/" not in full_name:
+            return {"action": "ignored", "reason": "no repository"}
+        owner, repo = full_name.split("/", 1)
+
+        if event == "push":
+            result = self._handle_push(owner, repo, repository, payload)
+        elif event == "repository":
+            # Renamed, transferred, archived, deleted, ...: cached results no longer apply
+            self._invalidate(owner, repo)
+            result = {"action": "invalidated"}
+        else:
+            result = {"action": "ignored", "reason": f"unsupported event '{event}'"}
+
+        metrics.webhook_deliveries.inc(event, result["action"])
+        result["repo"] = full_name
+        return result
+
+    def _handle_push(self, owner: str, repo: str, repository: Dict[str, Any], payload: Dict[str, Any]) -> Dict[str, Any]:
+        default_branch = repository.get("default_branch") or repository.get("master_branch") or "main"
+        if payload.get("ref") != f"refs/heads/{default_branch}":
+            return {"action": "ignored", "reason": "not the default branch"}
+        if payload.get("deleted"):
+            self._invalidate(owner, repo)
+            return {"action": "invalidated"}
+
+        if self.cache.peek(owner, repo) is None and self.scoring.structures.get(owner, repo) is None:
+            return {"action": "ignored", "reason": "not cached"}
+
+        commits = payload.get("commits") or []
+        changes = sum(len(c.get(kind) or []) for c in commits for kind in ("added", "removed", "modified"))
+        too_large = len(commits) > self.MAX_PUSH_COMMITS or changes > self.MAX_PUSH_CHANGES
+        repo_data = None
+        if not payload.get("forced") and not too_large:
+            repo_data = self.scoring.apply_push(owner, repo, payload.get("before"), payload.get("after"), commits)
+
+        if repo_data is None:
+            self._schedule_reanalysis(owner, repo)
+            return {"action": "reanalysis_scheduled"}
+
+        self.cache.put(owner, repo, repo_data)
+        return {"action": "updated", "repo_data": repo_data, "score": self.scoring.calculate_score(repo_data)}
+
+    def _invalidate(self, owner: str, repo: str):
+        self.cache.invalidate(owner, repo)
+        self.scoring.structures.invalidate(owner, repo)
+
+    def _schedule_reanalysis(self, owner: str, repo: str):
+        self._invalidate(owner, repo)
+        self._executor.submit(self._reanalyze, owner, repo)
+
+    def _reanalyze(self, owner: str, repo: str):
+        try:
+            repo_data = self.scoring.analyze_repository(owner, repo)
+        except Exception as e:
+            logger.warning(f"Webhook re-analysis failed for {owner}/{repo}: {e}")
+            return
+        if "error" not in repo_data:
+            self.cache.put(owner, repo, repo_data)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,200 @@
+import math
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Callable, Iterator, List, Optional, Tuple
+
+_current_deadline: ContextVar[Optional["Deadline"]] = ContextVar("deadline", default=None)
+
+
+class Deadline:
+    """
+    Point in time by which a unit of work (e.g. one analysis) must be finished.
+    Entering scope() makes it visible to code further down the call stack.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    @contextmanager
+    def scope(self) -> Iterator["Deadline"]:
+        """
+        Makes this deadline current, unless an enclosing one expires sooner.
+        """
+        enclosing = _current_deadline.get()
+        effective = enclosing if enclosing is not None and enclosing.expires_at < self.expires_at else self
+        token = _current_deadline.set(effective)
+        try:
+            yield effective
+        finally:
+            _current_deadline.reset(token)
+
+    @staticmethod
+    def current() -> Optional["Deadline"]:
+        return _current_deadline.get()
+
+
+def backoff_delay(attempt: int, base: float = 0.25, cap: float = 4.0) -> float:
+    """
+    Exponential backoff with full jitter: uniform in [0, min(cap, base * 2^attempt)].
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    Fails fast while a dependency is degraded.
+
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_timeout` seconds. Then a single trial call is let through (half-open):
+    its success closes the circuit, its failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 on_state_change: Optional[Callable[[str], None]] = None):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.on_state_change = on_state_change
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def _set_state(self, state: str):
+        if state != self._state:
+            self._state = state
+            if self.on_state_change:
+                self.on_state_change(state)
+
+    def allow(self) -> bool:
+        """
+        Returns whether a call may proceed. Every allowed call must be followed
+        by record_success(), record_failure() or release().
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._set_state(self.HALF_OPEN)
+                self._trial_in_flight = False
+            if self._state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            self._set_state(self.CLOSED)
+
+    def release(self):
+        """
+        Gives back an allowed call that was abandoned before it had an outcome,
+        so a half-open circuit can let another trial through.
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._set_state(self.OPEN)
+
+    def retry_after(self) -> float:
+        """
+        Seconds until the next trial call will be allowed.
+        """
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+
+_LAST_PAGE = re.compile(r'<[^>]*[?&]page=(\d+)[^>]*>;\s*rel="last"')
+
+
+def last_page(link: Optional[str]) -> Optional[int]:
+    """
+    Number of the last page named by a GitHub Link header, or None if there is
+    no rel="last" link (the response is the only or the last page).
+    """
+    match = _LAST_PAGE.search(link or "")
+    return int(match.group(1)) if match else None
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[int]:
+    """
+    Seconds to wait from a Retry-After header, given as delay-seconds or as an
+    HTTP-date (RFC 9110). None if the header is absent or malformed.
+    """
+    value = (value or "").strip()
+    if value.isdigit():
+        return int(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if when is None:
+        return None
+    return max(0, math.ceil(when.timestamp() - (time.time() if now is None else now)))
+
+
+def stratified_pages(first: int, last: int, count: int) -> List[int]:
+    """
+    Splits pages first..last into `count` equal strata and picks the middle page
+    of each (deterministic, so repeated analyses sample the same pages).
+    """
+    size = last - first + 1
+    if count >= size:
+        return list(range(first, last + 1))
+    if count <= 0:
+        return []
+    return [first + int((k + 0.5) * size / count) for k in range(count)]
+
+
+def estimate_total(exact: float, sample: List[float], population: int, z: float = 1.96,
+                   min_variance: Callable[[float], float] = lambda mean: 0.0) -> Tuple[float, Optional[Tuple[float, float]]]:
+    """
+    Estimates exact + the sum of a quantity over `population` units, of which
+    `sample` was observed. Returns the estimate and a normal-approximation
+    confidence interval (finite population corrected), or None for the interval
+    when fewer than two units were sampled from a larger population. A few
+    near-identical samples understate the variance; `min_variance(mean)` bounds it.
+    """
+    n = len(sample)
+    if n >= population:
+        total = exact + sum(sample)
+        return total, (total, total)
+    if n == 0:
+        return exact, None
+    mean = sum(sample) / n
+    estimate = exact + population * mean
+    if n < 2:
+        return estimate, None
+    variance = max(sum((x - mean) ** 2 for x in sample) / (n - 1), min_variance(mean))
+    margin = z * population * math.sqrt((1 - n / population) * variance / n)
+    return estimate, (max(exact + sum(sample), estimate - margin), estimate + margin)
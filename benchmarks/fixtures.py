@@ -0,0 +1,168 @@
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+# Directory and file names used to build realistic-looking synthetic repositories
+DIR_NAMES = [
+    "src", "app", "lib", "utils", "services", "components", "api", "routes", "models",
+    "tests", "docs", "config", "scripts", "assets", "core", "handlers", "views", "helpers",
+]
+EXTENSIONS = ["py", "js", "ts", "tsx", "go", "rs", "java", "md", "json", "yml", "css", "html"]
+COMMIT_MESSAGES = [
+    "feat: add scoring endpoint", "fix: handle empty tree", "docs: update readme",
+    "refactor: split services", "update", "chore: bump deps", "test: cover parser", "Fix typo",
+]
+
+
+def generate_tree(entries: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """
+    Generates a recursive git tree listing (as returned by the trees API) with
+    roughly one directory per ten files, nested up to eight levels deep.
+    """
+    rng = random.Random(seed)
+    items: List[Dict[str, Any]] = [
+        {"path": "README.md", "type": "blob", "sha": "readme", "size": 2048},
+        {"path": ".gitignore", "type": "blob", "sha": "gitignore", "size": 64},
+        {"path": ".github", "type": "tree", "sha": "github"},
+        {"path": ".github/workflows", "type": "tree", "sha": "workflows"},
+        {"path": ".github/workflows/ci.yml", "type": "blob", "sha": "ci", "size": 512},
+    ]
+    directories = [""]
+    while len(items) < entries:
+        if rng.random() < 0.1:
+            parent = rng.choice(directories)
+            if parent.count("/") < 7:
+                path = f"{parent}/{rng.choice(DIR_NAMES)}{len(directories)}".lstrip("/")
+                directories.append(path)
+                items.append({"path": path, "type": "tree", "sha": f"t{len(items)}"})
+                continue
+        parent = rng.choice(directories)
+        name = f"file{len(items)}.{rng.choice(EXTENSIONS)}"
+        items.append({
+            "path": f"{parent}/{name}".lstrip("/"),
+            "type": "blob",
+            "sha": f"b{len(items)}",
+            "size": rng.randint(100, 20000),
+        })
+    items = items[:entries]
+    items.sort(key=lambda item: item["path"])
+    return items
+
+
+def modify_tree(items: List[Dict[str, Any]], root_sha: str = "root") -> Tuple[List[Dict[str, Any]], str]:
+    """
+    The same tree with one file in its deepest directory changed: a new blob SHA,
+    and new tree SHAs for that directory and its ancestors. Returns the listing
+    and its root tree SHA.
+    """
+    blob = max((item for item in items if item["type"] == "blob"), key=lambda item: item["path"].count("/"))
+    ancestors = set()
+    path = blob["path"].rpartition("/")[0]
+    while path:
+        ancestors.add(path)
+        path = path.rpartition("/")[0]
+    modified = []
+    for item in items:
+        if item is blob or (item["type"] == "tree" and item["path"] in ancestors):
+            item = dict(item, sha=item["sha"] + "'")
+        modified.append(item)
+    return modified, root_sha + "'"
+
+
+def generate_commits(count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """
+    Generates a commit list (newest first) spread over roughly a year of history.
+    """
+    rng = random.Random(seed)
+    now = datetime(2026, 1, 1)
+    commits = []
+    for i in range(count):
+        date = now - timedelta(minutes=i * max(1, 525600 // max(count, 1)) + rng.randint(0, 59))
+        commits.append({
+            "sha": f"{i:040x}",
+            "commit": {
+                "message": rng.choice(COMMIT_MESSAGES),
+                "author": {"name": "dev", "date": date.strftime("%Y-%m-%dT%H:%M:%SZ")},
+            },
+        })
+    return commits
+
+
+def generate_readme(size_bytes: int, seed: int = 42) -> str:
+    """
+    Generates Markdown README content of approximately the requested size.
+    """
+    rng = random.Random(seed)
+    sections = ["# Project\n", "## Installation\n\npip install -r requirements.txt\n", "## Usage\n\npython main.py\n"]
+    words = ["repository", "service", "score", "analysis", "engineering", "module", "test", "deploy"]
+    text = "".join(sections)
+    chunks = [text]
+    length = len(text)
+    while length < size_bytes:
+        line = " ".join(rng.choice(words) for _ in range(12)) + "\n"
+        chunks.append(line)
+        length += len(line)
+    return "".join(chunks)[:size_bytes]
+
+
+class StubGitHubService:
+    """
+    In-memory stand-in for GitHubService that serves pre-generated fixtures,
+    so benchmarks measure analysis cost rather than network latency.
+    """
+
+    def __init__(self, tree: List[Dict[str, Any]], commits: List[Dict[str, Any]], readme: str,
+                 languages: Optional[Dict[str, int]] = None):
+        self.tree = tree
+        self.root_sha = "root"
+        self._directories: Dict[str, Tuple[Dict[str, str], Dict[str, List[Dict[str, Any]]]]] = {}
+        self.commits = commits
+        self.readme = readme
+        self.languages = languages or {"Python": 120000, "JavaScript": 40000, "HTML": 3000}
+
+    def get_repo_metadata(self, owner: str, repo: str) -> Dict[str, Any]:
+        return {"full_name": f"{owner}/{repo}", "default_branch": "main", "fork": False, "size": len(self.tree)}
+
+    def get_git_tree(self, owner: str, repo: str, branch: str = "main", recursive: bool = True) -> Optional[Dict[str, Any]]:
+        sha = self.root_sha if branch == "main" else branch
+        if sha == self.root_sha and recursive:
+            return {"sha": sha, "tree": self.tree, "truncated": False}
+        # Non-recursive listings by tree SHA, indexed once per tree version
+        if self.root_sha not in self._directories:
+            paths = {item["sha"]: item["path"] for item in self.tree if item["type"] == "tree"}
+            entries: Dict[str, List[Dict[str, Any]]] = {}
+            for item in self.tree:
+                parent, _, name = item["path"].rpartition("/")
+                entries.setdefault(parent, []).append(dict(item, path=name))
+            self._directories[self.root_sha] = (paths, entries)
+        paths, entries = self._directories[self.root_sha]
+        directory = "" if sha == self.root_sha else paths.get(sha)
+        if directory is None or recursive:
+            return None
+        return {"sha": sha, "tree": entries.get(directory, []), "truncated": False}
+
+    def get_commit_history(self, owner: str, repo: str, page: int = 1, per_page: int = 30,
+                           since: Optional[str] = None) -> List[Dict[str, Any]]:
+        return self.commits
+
+    def get_commit_history_page(self, owner: str, repo: str, page: int = 1,
+                                per_page: int = 100) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        pages = -(-len(self.commits) // per_page)
+        return self.commits[(page - 1) * per_page:page * per_page], pages if page < pages else None
+
+    def get_readme_content(self, owner: str, repo: str) -> Optional[str]:
+        return self.readme
+
+    def compare_commits(self, owner: str, repo: str, base: str, head: str) -> Dict[str, Any]:
+        return {"status": "identical", "ahead_by": 0, "behind_by": 0, "commits": [], "files": []}
+
+    def get_blob(self, owner: str, repo: str, sha: str) -> bytes:
+        if sha == "ci":
+            return b"name: CI\non: [push]\njobs:\n  test:\n    runs-on: ubuntu-latest\n"
+        return b"def test_fixture():\n    assert True\n"
+
+    def get_languages(self, owner: str, repo: str) -> Dict[str, int]:
+        return self.languages
+
+    def get_repo_contents(self, owner: str, repo: str, path: str = "") -> List[Dict[str, Any]]:
+        return []
@@ -0,0 +1,340 @@
+"""
+Micro-benchmarks for the scoring pipeline.
+
+Usage:
+    python -m benchmarks.run                    # full suite, compare against baselines
+    python -m benchmarks.run --quick            # skip the largest fixtures
+    python -m benchmarks.run --filter tree      # only cases whose name contains 'tree'
+    python -m benchmarks.run --update-baseline  # record current results as the new baseline
+
+Exits with status 1 when any case is slower (or uses more peak memory) than its
+baseline by more than the regression threshold, or when a case's output (e.g. the
+fixture's score, level and weaknesses) differs from the recorded one. Timings are
+re-recorded with --update-baseline; a deliberate scoring change is accepted with
+--update-outputs.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.services.scoring_service import ScoringService
+from app.services.summary_service import SummaryService
+from app.services.roadmap_service import RoadmapService
+from app.services.report_service import ReportService
+from app.services.pdf_service import PDFService
+
+from .fixtures import StubGitHubService, generate_commits, generate_readme, generate_tree, modify_tree
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+DEFAULT_THRESHOLD = 0.25
+MIN_TIME_PER_REPEAT = 0.2  # seconds; small cases are looped until a repeat takes this long
+REPEATS = 3
+
+KB = 1024
+MB = 1024 * 1024
+
+
+class Case:
+    """
+    A named benchmark: `setup` builds fixtures (excluded from measurement) and
+    returns the zero-argument callable that is timed. `output` reduces what the
+    callable returns to the JSON value checked against the recorded one.
+    """
+
+    def __init__(self, name: str, setup: Callable[[], Callable[[], Any]], large: bool = False,
+                 output: Optional[Callable[[Any], Any]] = None):
+        self.name = name
+        self.setup = setup
+        self.large = large
+        self.output = output
+
+
+def _repo_data(tree_entries: int, commit_count: int, readme_bytes: int) -> Dict[str, Any]:
+    stub = StubGitHubService(generate_tree(tree_entries), generate_commits(commit_count), generate_readme(readme_bytes))
+    return ScoringService(stub).analyze_repository("bench", "fixture")
+
+
+def _report_inputs(repo_data: Dict[str, Any]) -> Tuple[Dict[str, Any], str, List[str]]:
+    score_data = ScoringService(None).calculate_score(repo_data)
+    summary = SummaryService().generate_evaluation(score_data["total_score"], score_data["level"], score_data["weaknesses"])
+    roadmap = RoadmapService().generate_roadmap(score_data["weaknesses"])
+    return score_data, summary["recruiter"], roadmap
+
+
+def score_output(score_data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "total_score": score_data["total_score"],
+        "level": score_data["level"],
+        "breakdown": {category: part["score"] for category, part in score_data["breakdown"].items()},
+        "weakness_codes": score_data["weakness_codes"],
+    }
+
+
+def analysis_output(repo_data: Dict[str, Any]) -> Dict[str, Any]:
+    return score_output(ScoringService(None).calculate_score(repo_data))
+
+
+def flags_output(flags: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    return {name: flag.get("value", flag.get("level")) for name, flag in flags.items()}
+
+
+def analyze_case(tree_entries: int, commit_count: int, readme_bytes: int = KB):
+    def setup():
+        stub = StubGitHubService(generate_tree(tree_entries), generate_commits(commit_count), generate_readme(readme_bytes))
+        service = ScoringService(stub)
+
+        def analyze():
+            # A first analysis, not a re-analysis against the stored structure
+            service.structures.invalidate("bench", "fixture")
+            return service.analyze_repository("bench", "fixture")
+        return analyze
+    return setup
+
+
+def reanalyze_case(tree_entries: int):
+    def setup():
+        tree = generate_tree(tree_entries)
+        versions = [(tree, "root"), modify_tree(tree)]
+        stub = StubGitHubService(tree, generate_commits(100), generate_readme(KB))
+        service = ScoringService(stub)
+        service.analyze_repository("bench", "fixture")
+
+        def reanalyze():
+            # HEAD alternates between two trees that differ in one deeply nested file
+            stub.tree, stub.root_sha = versions[1] if stub.root_sha == "root" else versions[0]
+            return service.analyze_repository("bench", "fixture")
+        return reanalyze
+    return setup
+
+
+def score_case(tree_entries: int, commit_count: int, readme_bytes: int):
+    def setup():
+        repo_data = _repo_data(tree_entries, commit_count, readme_bytes)
+        service = ScoringService(None)
+        return lambda: service.calculate_score(repo_data)
+    return setup
+
+
+def health_flags_case(commit_count: int):
+    def setup():
+        repo_data = _repo_data(1000, commit_count, KB)
+        service = ScoringService(None)
+        return lambda: service._calculate_health_flags(repo_data["structure"], repo_data["activity"])
+    return setup
+
+
+def report_case(commit_count: int):
+    def setup():
+        score_data, summary, roadmap = _report_inputs(_repo_data(1000, commit_count, KB))
+        service = ReportService()
+        return lambda: service.generate_audit_report("https://github.com/bench/fixture", score_data, summary, roadmap)
+    return setup
+
+
+def pdf_case(commit_count: int):
+    def setup():
+        score_data, summary, roadmap = _report_inputs(_repo_data(1000, commit_count, KB))
+        service = PDFService()
+        return lambda: service.create_report("https://github.com/bench/fixture", score_data, summary, roadmap)
+    return setup
+
+
+def build_cases() -> List[Case]:
+    cases = []
+    for entries in (10, 1000, 100_000, 1_000_000):
+        cases.append(Case(f"analyze_repository[tree={entries}]", analyze_case(entries, 100),
+                          large=entries >= 1_000_000, output=analysis_output))
+    cases.append(Case("reanalyze_repository[tree=100000]", reanalyze_case(100_000), output=analysis_output))
+    for count in (10, 1000, 100_000):
+        cases.append(Case(f"analyze_repository[commits={count}]", analyze_case(100, count),
+                          large=count >= 100_000, output=analysis_output))
+    for count in (10, 1000, 100_000):
+        cases.append(Case(f"calculate_score[commits={count}]", score_case(100, count, KB),
+                          large=count >= 100_000, output=score_output))
+    for size, label in ((KB, "1KB"), (100 * KB, "100KB"), (5 * MB, "5MB")):
+        cases.append(Case(f"calculate_score[readme={label}]", score_case(100, 100, size),
+                          large=size >= 5 * MB, output=score_output))
+    for count in (10, 100_000):
+        cases.append(Case(f"_calculate_health_flags[commits={count}]", health_flags_case(count),
+                          large=count >= 100_000, output=flags_output))
+    # Reports are dated today, so only their timings are compared
+    cases.append(Case("generate_audit_report", report_case(100)))
+    cases.append(Case("create_report", pdf_case(100)))
+    return cases
+
+
+def measure_time(func: Callable[[], Any]) -> float:
+    """
+    Returns the best per-call wall time over REPEATS, looping small cases so
+    each repeat lasts at least MIN_TIME_PER_REPEAT.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_TIME_PER_REPEAT or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < MIN_TIME_PER_REPEAT / 10 else 2
+
+    best = elapsed / number
+    for _ in range(REPEATS - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def measure_peak_memory(func: Callable[[], Any]) -> int:
+    """
+    Returns the peak bytes allocated during a single call (fixtures excluded).
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return max(0, peak - baseline)
+
+
+def _load(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_baselines(path: str) -> Dict[str, Dict[str, float]]:
+    return _load(path).get("cases", {})
+
+
+def load_outputs(path: str) -> Dict[str, Any]:
+    return _load(path).get("outputs", {})
+
+
+def save_baselines(path: str, results: Dict[str, Dict[str, float]], threshold: float,
+                   outputs: Optional[Dict[str, Any]] = None):
+    """
+    Merges timings (and outputs, if given) into the baselines file; recorded
+    outputs of cases not given are kept.
+    """
+    existing = _load(path)
+    cases = dict(existing.get("cases", {}), **results)
+    recorded = dict(existing.get("outputs", {}), **(outputs or {}))
+    with open(path, "w") as f:
+        json.dump({"threshold": threshold, "cases": dict(sorted(cases.items())),
+                   "outputs": dict(sorted(recorded.items()))}, f, indent=2)
+        f.write("\n")
+
+
+def _format_time(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f}us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds:.2f}s"
+
+
+def _format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f}{unit}"
+        size /= 1024
+    return f"{size:.1f}TB"
+
+
+def compare(result: Dict[str, float], baseline: Optional[Dict[str, float]], threshold: float) -> Tuple[str, bool]:
+    """
+    Returns a short status string and whether the case regressed beyond the threshold.
+    """
+    if not baseline:
+        return "new", False
+    time_ratio = result["time_s"] / baseline["time_s"] if baseline["time_s"] else 1.0
+    mem_ratio = result["peak_bytes"] / baseline["peak_bytes"] if baseline["peak_bytes"] else 1.0
+    regressed = time_ratio > 1 + threshold or mem_ratio > 1 + threshold
+    status = f"time x{time_ratio:.2f}, mem x{mem_ratio:.2f}"
+    return ("REGRESSION " + status) if regressed else status, regressed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the repository scoring pipeline.")
+    parser.add_argument("--quick", action="store_true", help="skip the largest fixtures (1M tree entries, 100k commits, 5MB README)")
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this substring")
+    parser.add_argument("--threshold", type=float, default=None, help="allowed slowdown ratio before failing (default from baselines, else 0.25)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="path to the baselines JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="write the measured results as the new baseline")
+    parser.add_argument("--update-outputs", action="store_true",
+                        help="accept changed case outputs (a deliberate scoring change) and record them")
+    parser.add_argument("--no-memory", action="store_true", help="skip the (slower) peak memory measurement")
+    args = parser.parse_args(argv)
+
+    baselines = load_baselines(args.baseline)
+    expected_outputs = load_outputs(args.baseline)
+    threshold = args.threshold
+    if threshold is None and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            threshold = json.load(f).get("threshold")
+    threshold = DEFAULT_THRESHOLD if threshold is None else threshold
+
+    results: Dict[str, Dict[str, float]] = {}
+    outputs: Dict[str, Any] = {}
+    regressions = []
+    changed = []
+    print(f"{'case':<45} {'time':>10} {'peak mem':>10}  vs baseline (threshold +{threshold:.0%})")
+    for case in build_cases():
+        if args.filter not in case.name or (args.quick and case.large):
+            continue
+        func = case.setup()
+        if case.output is not None:
+            # Round-tripped through JSON so it compares equal to the recorded value
+            outputs[case.name] = json.loads(json.dumps(case.output(func())))
+        elapsed = measure_time(func)
+        peak = 0 if args.no_memory else measure_peak_memory(func)
+        results[case.name] = {"time_s": elapsed, "peak_bytes": peak}
+        baseline = baselines.get(case.name)
+        if args.no_memory and baseline:
+            baseline = dict(baseline, peak_bytes=0)
+        status, regressed = compare(results[case.name], baseline, threshold)
+        if regressed:
+            regressions.append(case.name)
+        expected = expected_outputs.get(case.name)
+        if case.name in outputs and expected is not None and outputs[case.name] != expected:
+            changed.append(case.name)
+            status += ", OUTPUT CHANGED"
+        print(f"{case.name:<45} {_format_time(elapsed):>10} {_format_bytes(peak):>10}  {status}")
+        del func
+        gc.collect()
+
+    for name in changed:
+        print(f"\n{name} output changed:\n  recorded: {json.dumps(expected_outputs[name])}\n  now:      {json.dumps(outputs[name])}")
+
+    if args.update_baseline or args.update_outputs:
+        # Timings never overwrite a recorded output; only --update-outputs does
+        accepted = outputs if args.update_outputs else {k: v for k, v in outputs.items() if k not in expected_outputs}
+        save_baselines(args.baseline, results if args.update_baseline else {}, threshold, accepted)
+        print(f"\nBaseline updated: {args.baseline}")
+        if changed and not args.update_outputs:
+            print(f"{len(changed)} case(s) changed output; rerun with --update-outputs if that is intended")
+            return 1
+        return 0
+
+    if changed:
+        print(f"\n{len(changed)} case(s) changed output: {', '.join(changed)}")
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+    return 1 if regressions or changed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Drives /analyze and /compare at a target concurrency and reports throughput,
+latency percentiles and worker saturation.
+
+Usage:
+    python -m loadtest.loadgen --target http://localhost:8000 --concurrency 32 --duration 60 --workers 4
+
+Worker saturation is derived from the Server-Timing 'total' each response carries:
+busy seconds summed over all responses divided by (wall time x worker count).
+Values near 100% mean the workers are the bottleneck; the gap between client
+latency and server time is queueing in front of the workers.
+"""
+import argparse
+import math
+import random
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+import requests
+
+SERVER_TOTAL = re.compile(r"(?:^|,\s*)total;dur=([\d.]+)")
+
+
+class Sample:
+    __slots__ = ("endpoint", "status", "latency", "server_time")
+
+    def __init__(self, endpoint: str, status: int, latency: float, server_time: Optional[float]):
+        self.endpoint = endpoint
+        self.status = status
+        self.latency = latency
+        self.server_time = server_time
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile
+    index = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def _server_time(response: requests.Response) -> Optional[float]:
+    match = SERVER_TOTAL.search(response.headers.get("Server-Timing", ""))
+    return float(match.group(1)) / 1000 if match else None
+
+
+def run_client(target: str, deadline: float, compare_ratio: float, repos: List[str],
+               samples: List[Sample], lock: threading.Lock, seed: int):
+    """
+    One closed-loop client: sends the next request as soon as the previous one returns.
+    """
+    rng = random.Random(seed)
+    session = requests.Session()
+    while time.time() < deadline:
+        if rng.random() < compare_ratio:
+            endpoint = "/compare"
+            payload = {"repo_url_1": rng.choice(repos), "repo_url_2": rng.choice(repos)}
+        else:
+            endpoint = "/analyze"
+            payload = {"repo_url": rng.choice(repos)}
+        start = time.perf_counter()
+        try:
+            response = session.post(target + endpoint, json=payload, timeout=120)
+            sample = Sample(endpoint, response.status_code, time.perf_counter() - start, _server_time(response))
+        except requests.exceptions.RequestException:
+            sample = Sample(endpoint, 0, time.perf_counter() - start, None)
+        with lock:
+            samples.append(sample)
+
+
+def report(samples: List[Sample], wall: float, workers: int) -> str:
+    lines = [f"{'endpoint':<10} {'requests':>8} {'errors':>7} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'server p50':>11}"]
+    groups: Dict[str, List[Sample]] = {}
+    for sample in samples:
+        groups.setdefault(sample.endpoint, []).append(sample)
+    groups["all"] = samples
+
+    for endpoint, group in groups.items():
+        latencies = sorted(s.latency for s in group)
+        server_times = sorted(s.server_time for s in group if s.server_time is not None)
+        errors = sum(1 for s in group if s.status != 200)
+        lines.append(
+            f"{endpoint:<10} {len(group):>8} {errors:>7} {len(group) / wall:>8.2f} "
+            f"{percentile(latencies, 50) * 1000:>7.0f}ms {percentile(latencies, 95) * 1000:>7.0f}ms "
+            f"{percentile(latencies, 99) * 1000:>7.0f}ms {percentile(server_times, 50) * 1000:>9.0f}ms"
+        )
+
+    busy = sum(s.server_time for s in samples if s.server_time is not None)
+    client = sum(s.latency for s in samples)
+    saturation = busy / (wall * workers) if wall and workers else 0.0
+    queueing = (client - busy) / len(samples) if samples else 0.0
+    lines.append("")
+    lines.append(f"wall time          {wall:.1f}s")
+    lines.append(f"worker saturation  {saturation:.0%} of {workers} worker(s)")
+    lines.append(f"mean queueing      {queueing * 1000:.0f}ms per request (client latency - server time)")
+    statuses: Dict[int, int] = {}
+    for sample in samples:
+        statuses[sample.status] = statuses.get(sample.status, 0) + 1
+    lines.append("status codes       " + ", ".join(f"{code or 'conn-error'}: {n}" for code, n in sorted(statuses.items())))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Repository Mirror API.")
+    parser.add_argument("--target", default="http://localhost:8000", help="base URL of the API under test")
+    parser.add_argument("--concurrency", type=int, default=16, help="number of concurrent closed-loop clients")
+    parser.add_argument("--duration", type=float, default=60.0, help="test duration in seconds")
+    parser.add_argument("--compare-ratio", type=float, default=0.2, help="fraction of requests sent to /compare")
+    parser.add_argument("--repos", type=int, default=200, help="number of distinct repository URLs to cycle through")
+    parser.add_argument("--workers", type=int, default=4, help="server worker count, for the saturation estimate")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    repos = [f"https://github.com/loadtest/repo-{i}" for i in range(args.repos)]
+    samples: List[Sample] = []
+    lock = threading.Lock()
+    start = time.time()
+    deadline = start + args.duration
+    threads = [
+        threading.Thread(target=run_client, args=(args.target, deadline, args.compare_ratio, repos, samples, lock, args.seed + i), daemon=True)
+        for i in range(args.concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(report(samples, time.time() - start, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Records real GitHub API responses for replay by the stub server.
+
+Usage:
+    GITHUB_TOKEN=... python -m loadtest.record octocat/Hello-World tiangolo/fastapi
+"""
+import argparse
+import json
+import os
+
+from app.services.github_service import GitHubService
+
+from .stub_github import RECORDINGS_DIR
+
+
+def record(service: GitHubService, full_name: str) -> dict:
+    """
+    Fetches every payload analyze_repository needs for one repository.
+    """
+    owner, repo = full_name.split("/", 1)
+    metadata = service.get_repo_metadata(owner, repo)
+    if not metadata:
+        raise ValueError(f"Repository not found: {full_name}")
+    return {
+        "metadata": metadata,
+        "tree": service.get_git_tree(owner, repo, branch=metadata.get("default_branch", "main")),
+        "commits": service.get_commit_history(owner, repo, per_page=100),
+        "readme": service.get_readme_content(owner, repo),
+        "languages": service.get_languages(owner, repo) or {},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record GitHub API responses for the load test stub.")
+    parser.add_argument("repos", nargs="+", help="repositories as owner/name")
+    parser.add_argument("--output", default=RECORDINGS_DIR, help="directory to write <owner>__<repo>.json files into")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    service = GitHubService()
+    for full_name in args.repos:
+        data = record(service, full_name)
+        path = os.path.join(args.output, full_name.replace("/", "__") + ".json")
+        with open(path, "w") as f:
+            json.dump(data, f)
+        print(f"Recorded {full_name} -> {path} ({len(data['tree'].get('tree', [])) if data['tree'] else 0} tree entries)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+"""
+Local stand-in for the GitHub REST API endpoints (and the bulk metadata GraphQL
+query) used by GitHubService.
+
+Replays recorded responses (see loadtest/record.py) with configurable latency,
+jitter, error rate and rate-limit headers. Any owner/repo is served: names that
+have no recording of their own are mapped deterministically onto one of the
+available recordings, so a load test can use many distinct repositories.
+
+Beyond the recorded payloads, commits are paged with a Link header, trees are
+listed by tree SHA (recursively or not), and blobs and compares are derived
+from the recorded tree and commits, as the sampling, history-estimation and
+fork/incremental paths request them.
+
+Usage:
+    python -m loadtest.stub_github --port 9000 --latency-ms 120 --jitter-ms 60 --error-rate 0.01
+    GITHUB_API_URL=http://localhost:9000 gunicorn main:app -k uvicorn.workers.UvicornWorker -w 4
+"""
+import argparse
+import base64
+import glob
+import json
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(__file__), "recordings")
+
+REPO_PATH = re.compile(r"^/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)(?P<rest>/.*)?$")
+COMPARE_PATH = re.compile(r"^/compare/(?P<base>.+?)\.\.\.(?P<head>.+)$")
+
+# Compare responses list at most this many commits, as GitHub's do
+MAX_COMPARE_COMMITS = 250
+
+# Synthetic profiles used when no recordings are present: (tree entries, commits, README bytes)
+SYNTHETIC_PROFILES = {
+    "synthetic-small": (50, 20, 1024),
+    "synthetic-medium": (2000, 100, 8 * 1024),
+    "synthetic-large": (50000, 100, 64 * 1024),
+}
+
+
+def load_recordings(directory: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Loads every <name>.json recording in the directory, falling back to synthetic profiles.
+    """
+    recordings = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        with open(path) as f:
+            recordings[os.path.splitext(os.path.basename(path))[0]] = json.load(f)
+    if recordings:
+        return recordings
+
+    from benchmarks.fixtures import generate_commits, generate_readme, generate_tree
+    for name, (entries, commits, readme_bytes) in SYNTHETIC_PROFILES.items():
+        recordings[name] = {
+            "metadata": {"full_name": name, "default_branch": "main", "fork": False, "archived": False, "size": entries},
+            "tree": {"sha": name, "tree": generate_tree(entries), "truncated": False},
+            "commits": generate_commits(commits),
+            "readme": generate_readme(readme_bytes),
+            "languages": {"Python": 120000, "JavaScript": 40000},
+        }
+    return recordings
+
+
+class RateLimiter:
+    """
+    Mimics GitHub's core quota: a fixed number of requests per window, reported via headers.
+    """
+
+    def __init__(self, limit: int, window: int):
+        self.limit = limit
+        self.window = window
+        self._lock = threading.Lock()
+        self._reset_at = int(time.time()) + window
+        self._used = 0
+
+    def consume(self) -> Tuple[bool, Dict[str, str]]:
+        with self._lock:
+            now = int(time.time())
+            if now >= self._reset_at:
+                self._reset_at = now + self.window
+                self._used = 0
+            allowed = self._used < self.limit
+            if allowed:
+                self._used += 1
+            headers = {
+                "X-RateLimit-Limit": str(self.limit),
+                "X-RateLimit-Remaining": str(max(0, self.limit - self._used)),
+                "X-RateLimit-Reset": str(self._reset_at),
+                "X-RateLimit-Used": str(self._used),
+                "X-RateLimit-Resource": "core",
+            }
+        return allowed, headers
+
+
+class StubGitHub:
+    """
+    Routes GitHub API paths to recorded payloads.
+    """
+
+    def __init__(self, recordings: Dict[str, Dict[str, Any]], latency_ms: float, jitter_ms: float,
+                 error_rate: float, rate_limiter: RateLimiter, seed: Optional[int] = None):
+        self.recordings = recordings
+        self.names = sorted(recordings)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limiter = rate_limiter
+        self.rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        # Per recording: directory paths by tree SHA, blob paths by SHA and each directory's children
+        self._trees: Dict[int, Tuple[Dict[str, str], Dict[str, str], Dict[str, List[Dict[str, Any]]]]] = {}
+        self._trees_lock = threading.Lock()
+
+    def recording_for(self, owner: str, repo: str) -> Dict[str, Any]:
+        key = f"{owner}/{repo}"
+        for name in (key.replace("/", "__"), repo):
+            if name in self.recordings:
+                return self.recordings[name]
+        return self.recordings[self.names[zlib.crc32(key.encode()) % len(self.names)]]
+
+    def delay(self) -> float:
+        with self._rng_lock:
+            jitter = self.rng.uniform(-self.jitter_ms, self.jitter_ms)
+            fail = self.rng.random() < self.error_rate
+        time.sleep(max(0.0, self.latency_ms + jitter) / 1000)
+        return fail
+
+    def tree_index(self, data: Dict[str, Any]) -> Tuple[Dict[str, str], Dict[str, str], Dict[str, List[Dict[str, Any]]]]:
+        """
+        Directory paths by tree SHA (the root is ''), blob paths by SHA and each
+        directory's direct children (with paths relative to it), built once per
+        recording.
+        """
+        with self._trees_lock:
+            index = self._trees.get(id(data))
+            if index is None:
+                tree = data.get("tree") or {}
+                paths = {tree.get("sha") or "": ""}
+                blobs: Dict[str, str] = {}
+                children: Dict[str, List[Dict[str, Any]]] = {"": []}
+                for item in tree.get("tree", []):
+                    parent, _, name = item["path"].rpartition("/")
+                    children.setdefault(parent, []).append(dict(item, path=name))
+                    if item.get("type") == "tree":
+                        children.setdefault(item["path"], [])
+                        if item.get("sha"):
+                            paths[item["sha"]] = item["path"]
+                    elif item.get("type") == "blob" and item.get("sha"):
+                        blobs[item["sha"]] = item["path"]
+                index = self._trees[id(data)] = (paths, blobs, children)
+        return index
+
+    def tree(self, data: Dict[str, Any], ref: str, recursive: bool) -> Tuple[int, Any]:
+        """
+        Lists a tree by SHA; any other ref (a branch or commit) names the root tree.
+        """
+        paths, _, children = self.tree_index(data)
+        directory = paths.get(ref, "")
+        sha = ref if ref in paths else (data.get("tree") or {}).get("sha")
+        if not recursive:
+            return 200, {"sha": sha, "tree": children.get(directory, []), "truncated": False}
+        items, stack = [], [""]
+        while stack:
+            relative = stack.pop()
+            for child in children.get(f"{directory}/{relative}".strip("/"), []):
+                path = f"{relative}/{child['path']}".lstrip("/")
+                items.append(dict(child, path=path))
+                if child.get("type") == "tree":
+                    stack.append(path)
+        return 200, {"sha": sha, "tree": items, "truncated": (data.get("tree") or {}).get("truncated", False)}
+
+    def blob(self, data: Dict[str, Any], sha: str) -> Tuple[int, Any]:
+        """
+        Serves recorded blob contents, else synthesizes content by file kind (a
+        test, a CI workflow, the README or a placeholder) for blobs of the tree.
+        """
+        recorded = (data.get("blobs") or {}).get(sha)
+        if recorded is None:
+            path = self.tree_index(data)[1].get(sha)
+            if path is None:
+                return 404, {"message": "Not Found"}
+            name = path.rsplit("/", 1)[-1].lower()
+            if name.startswith("readme"):
+                text = data.get("readme") or ""
+            elif path.startswith(".github/workflows/"):
+                text = "on: [push]\njobs:\n  test:\n    runs-on: ubuntu-latest\n    steps:\n      - run: pytest\n"
+            elif "test" in path.lower():
+                text = "def test_stub():\n    assert True\n"
+            else:
+                text = f"# {path}\n"
+            recorded = base64.b64encode(text.encode()).decode()
+        return 200, {"sha": sha, "encoding": "base64", "content": recorded, "size": len(base64.b64decode(recorded))}
+
+    def compare(self, data: Dict[str, Any], base: str, head: str) -> Tuple[int, Any]:
+        """
+        Compares two recorded commits. Refs that are not recorded commit SHAs
+        (branches, 'owner:branch') name the newest commit. The recording holds a
+        single tree, so no files are reported changed.
+        """
+        commits = data["commits"]
+        positions = {c.get("sha"): i for i, c in enumerate(commits)}
+        base_at, head_at = positions.get(base, 0), positions.get(head, 0)
+        ahead_by, behind_by = max(0, base_at - head_at), max(0, head_at - base_at)
+        status = "identical" if base_at == head_at else "ahead" if ahead_by else "behind"
+        listed = list(reversed(commits[head_at:base_at]))[:MAX_COMPARE_COMMITS]
+        return 200, {
+            "status": status, "ahead_by": ahead_by, "behind_by": behind_by, "total_commits": ahead_by,
+            "merge_base_commit": commits[max(base_at, head_at)] if commits else None,
+            "commits": listed, "files": [],
+        }
+
+    def commits_page(self, data: Dict[str, Any], path: str, query: Dict[str, List[str]],
+                     base_url: str) -> Tuple[int, Any, Dict[str, str]]:
+        """
+        Pages the recorded commits, with a Link header naming the next, previous,
+        first and last pages as GitHub's does.
+        """
+        commits = data["commits"]
+        page = max(1, int(query.get("page", ["1"])[0]))
+        per_page = max(1, min(100, int(query.get("per_page", ["30"])[0])))
+        last = max(1, -(-len(commits) // per_page))
+        links = []
+        for rel, target in (("prev", page - 1), ("next", page + 1), ("last", last), ("first", 1)):
+            if (rel in ("prev", "first") and page > 1) or (rel in ("next", "last") and page < last):
+                links.append(f'<{base_url}{path}?per_page={per_page}&page={target}>; rel="{rel}"')
+        headers = {"Link": ", ".join(links)} if links else {}
+        return 200, commits[(page - 1) * per_page:page * per_page], headers
+
+    def handle(self, path: str, query: Dict[str, List[str]], base_url: str = "") -> Tuple[int, Any, Dict[str, str]]:
+        """
+        Answers a REST request: (status, body, extra response headers).
+        """
+        match = REPO_PATH.match(path)
+        if not match:
+            return 404, {"message": "Not Found"}, {}
+        data = self.recording_for(match.group("owner"), match.group("repo"))
+        rest = match.group("rest") or ""
+
+        if rest == "/commits":
+            return self.commits_page(data, path, query, base_url)
+        status, body = self._route(data, rest, query)
+        return status, body, {}
+
+    def _route(self, data: Dict[str, Any], rest: str, query: Dict[str, List[str]]) -> Tuple[int, Any]:
+        if rest == "":
+            return 200, data["metadata"]
+        if rest.startswith("/git/trees/"):
+            return self.tree(data, rest[len("/git/trees/"):], query.get("recursive", ["0"])[0] not in ("0", ""))
+        if rest.startswith("/git/blobs/"):
+            return self.blob(data, rest[len("/git/blobs/"):])
+        compare = COMPARE_PATH.match(rest)
+        if compare:
+            return self.compare(data, compare.group("base"), compare.group("head"))
+        if rest == "/readme":
+            if data.get("readme") is None:
+                return 404, {"message": "Not Found"}
+            return 200, {"name": "README.md", "encoding": "base64",
+                         "content": base64.b64encode(data["readme"].encode()).decode()}
+        if rest == "/languages":
+            return 200, data.get("languages", {})
+        if rest.startswith("/contents"):
+            return 200, []
+        return 404, {"message": "Not Found"}
+
+    def handle_graphql(self, body: Dict[str, Any]) -> Tuple[int, Any]:
+        """
+        Answers the bulk repository metadata query: one aliased node per $o<i>/$n<i> pair.
+        """
+        variables = body.get("variables") or {}
+        data = {}
+        i = 0
+        while f"o{i}" in variables:
+            owner, repo = variables[f"o{i}"], variables[f"n{i}"]
+            metadata = self.recording_for(owner, repo)["metadata"]
+            data[f"r{i}"] = {
+                "name": repo, "nameWithOwner": f"{owner}/{repo}", "owner": {"login": owner},
+                "url": f"https://github.com/{owner}/{repo}", "description": metadata.get("description"),
+                "isFork": metadata.get("fork", False), "isArchived": metadata.get("archived", False),
+                "isPrivate": False, "isEmpty": not metadata.get("size"), "diskUsage": metadata.get("size", 0),
+                "pushedAt": metadata.get("pushed_at"), "stargazerCount": metadata.get("stargazers_count", 0),
+                "forkCount": metadata.get("forks_count", 0),
+                "defaultBranchRef": {"name": metadata.get("default_branch", "main")},
+                "primaryLanguage": {"name": metadata["language"]} if metadata.get("language") else None,
+                "parent": None,
+            }
+            i += 1
+        return 200, {"data": data}
+
+
+def make_handler(stub: StubGitHub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            base_url = f"http://{self.headers.get('Host', 'localhost')}"
+            self.respond(lambda: stub.handle(parsed.path, parse_qs(parsed.query), base_url))
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if urlparse(self.path).path != "/graphql":
+                self.respond(lambda: (404, {"message": "Not Found"}, {}))
+            else:
+                self.respond(lambda: stub.handle_graphql(request) + ({},))
+
+        def respond(self, answer):
+            fail = stub.delay()
+            allowed, headers = stub.rate_limiter.consume()
+            if not allowed:
+                status, body = 403, {"message": "API rate limit exceeded for stub."}
+            elif fail:
+                status, body = 502, {"message": "Server Error"}
+            else:
+                status, body, extra = answer()
+                headers.update(extra)
+
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass  # Keep the stub quiet under load
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recorded GitHub API responses for load testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--recordings", default=RECORDINGS_DIR, help="directory of <name>.json recordings")
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="mean added latency per call")
+    parser.add_argument("--jitter-ms", type=float, default=50.0, help="uniform +/- jitter around the mean latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with 502")
+    parser.add_argument("--rate-limit", type=int, default=5000, help="requests allowed per rate-limit window")
+    parser.add_argument("--rate-window", type=int, default=3600, help="rate-limit window in seconds")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    recordings = load_recordings(args.recordings)
+    stub = StubGitHub(recordings, args.latency_ms, args.jitter_ms, args.error_rate,
+                      RateLimiter(args.rate_limit, args.rate_window), seed=args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(stub))
+    server.daemon_threads = True
+    print(f"Stub GitHub API on http://{args.host}:{args.port} serving {len(recordings)} recording(s): {', '.join(stub.names)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
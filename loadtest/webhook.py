@@ -0,0 +1,94 @@
+"""
+Posts signed GitHub webhook deliveries to a running API, for testing
+/webhooks/github locally without configuring a real webhook.
+
+Usage:
+    # Replay a saved payload (e.g. copied from a webhook's "Recent Deliveries")
+    python -m loadtest.webhook --secret s3cret --event push payload.json
+
+    # Build a push payload from the command line
+    python -m loadtest.webhook --secret s3cret --repo octocat/hello --before <sha> --after <sha> \\
+        --added src/new.py --removed old.py --message "feat: add new module"
+
+The secret must match the server's GITHUB_WEBHOOK_SECRET.
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import time
+import uuid
+from typing import Any, Dict, List
+
+import requests
+
+
+def sign(secret: str, body: bytes) -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def build_push_payload(full_name: str, before: str, after: str, added: List[str], removed: List[str],
+                       modified: List[str], message: str, branch: str = "main") -> Dict[str, Any]:
+    """
+    Minimal push event payload with a single commit, shaped like GitHub's.
+    """
+    timestamp = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    commit = {
+        "id": after, "message": message, "timestamp": timestamp,
+        "author": {"name": "webhook-fixture"},
+        "added": added, "removed": removed, "modified": modified,
+    }
+    return {
+        "ref": f"refs/heads/{branch}",
+        "before": before,
+        "after": after,
+        "forced": False,
+        "deleted": False,
+        "repository": {"full_name": full_name, "default_branch": branch},
+        "commits": [commit],
+        "head_commit": commit,
+    }
+
+
+def deliver(target: str, secret: str, event: str, payload: Dict[str, Any]) -> requests.Response:
+    body = json.dumps(payload).encode()
+    headers = {
+        "Content-Type": "application/json",
+        "X-GitHub-Event": event,
+        "X-GitHub-Delivery": str(uuid.uuid4()),
+        "X-Hub-Signature-256": sign(secret, body),
+    }
+    return requests.post(f"{target}/webhooks/github", data=body, headers=headers, timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send a signed GitHub webhook delivery.")
+    parser.add_argument("payload", nargs="?", help="JSON payload file to replay")
+    parser.add_argument("--target", default="http://localhost:8000", help="base URL of the API")
+    parser.add_argument("--secret", required=True, help="webhook secret (GITHUB_WEBHOOK_SECRET on the server)")
+    parser.add_argument("--event", default="push", help="X-GitHub-Event header value")
+    parser.add_argument("--repo", help="owner/name, to build a push payload instead of replaying a file")
+    parser.add_argument("--before", default="0" * 40)
+    parser.add_argument("--after", default=uuid.uuid4().hex + "0" * 8)
+    parser.add_argument("--branch", default="main")
+    parser.add_argument("--added", nargs="*", default=[])
+    parser.add_argument("--removed", nargs="*", default=[])
+    parser.add_argument("--modified", nargs="*", default=[])
+    parser.add_argument("--message", default="chore: webhook fixture")
+    args = parser.parse_args()
+
+    if args.payload:
+        with open(args.payload) as f:
+            payload = json.load(f)
+    elif args.repo:
+        payload = build_push_payload(args.repo, args.before, args.after, args.added, args.removed,
+                                     args.modified, args.message, args.branch)
+    else:
+        parser.error("pass a payload file or --repo")
+
+    response = deliver(args.target, args.secret, args.event, payload)
+    print(response.status_code, response.text)
+
+
+if __name__ == "__main__":
+    main()
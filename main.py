@@ -1,20 +1,39 @@
-from fastapi import FastAPI, HTTPException, Body
-from pydantic import BaseModel, HttpUrl
-from typing import Dict, Any, List
+from fastapi import FastAPI, HTTPException, Body, Request, Header, Query
+from pydantic import BaseModel, HttpUrl, Field
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+import hashlib
+import json
 import logging
+import math
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from urllib.parse import urlparse
 
-from app.services.github_service import GitHubService
-from app.services.scoring_service import ScoringService
+from app.services.github_service import DeadlineExceeded, GitHubService, GitHubUnavailableError
+from app.services.improvement_service import ImprovementPlanner, encode_weaknesses
+from app.services.scoring_service import SCORING_VERSION, ScoringService
 from app.services.summary_service import SummaryService
 from app.services.roadmap_service import RoadmapService
+from app.services.metrics_service import metrics
+from app.services.profiling_service import ProfilingService
+from app.services.ratelimit_service import LoadShedder, TokenBucketLimiter
+from app.services.cache_service import AnalysisCache, CacheRefresher, ResponseCache
+from app.services.portfolio_service import PortfolioService
+from app.services.prefetch_service import Prefetcher
+from app.services.ranking_service import RankingService
+from app.services.timeline_service import TimelineService
+from app.services.webhook_service import WebhookService
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
 
 # ... (Previous code)
 
@@ -34,6 +53,66 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Routes that analyze repositories; only these count towards the load shedder's limit
+EXPENSIVE_PREFIXES = ("/analyze", "/compare", "/portfolio", "/plan", "/timeline", "/repos/")
+load_shedder = LoadShedder()
+
+# Registered before record_http_metrics so that the metrics middleware, added last, also sees shed requests
+@app.middleware("http")
+async def shed_load(request: Request, call_next):
+    """
+    Answers expensive requests with 503 at once while this worker already serves
+    its maximum, instead of letting them queue. The slot is held until the body
+    has been sent, so streamed analyses count too.
+    """
+    prefix = next((p for p in EXPENSIVE_PREFIXES if request.url.path.startswith(p)), None)
+    if prefix is None:
+        return await call_next(request)
+    if not load_shedder.try_acquire():
+        metrics.http_rejected.inc(prefix.rstrip("/"), "overloaded")
+        return JSONResponse(
+            {"detail": "The service is overloaded, please retry shortly."},
+            status_code=503,
+            headers={"Retry-After": str(max(1, math.ceil(load_shedder.retry_after)))}
+        )
+    try:
+        response = await call_next(request)
+    except BaseException:
+        load_shedder.release()
+        raise
+    body = response.body_iterator
+
+    async def release_when_sent():
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            load_shedder.release()
+
+    response.body_iterator = release_when_sent()
+    return response
+
+@app.middleware("http")
+async def record_http_metrics(request: Request, call_next):
+    """
+    Tracks in-flight requests, latency and response size per route template.
+    """
+    metrics.http_in_flight.inc()
+    start = time.perf_counter()
+    status = "500"
+    try:
+        response = await call_next(request)
+        status = str(response.status_code)
+        return response
+    finally:
+        metrics.http_in_flight.dec()
+        route = request.scope.get("route")
+        # Use the route template rather than the raw path to keep label cardinality bounded
+        route_label = getattr(route, "path", "unmatched")
+        metrics.http_request_duration.observe(route_label, status, value=time.perf_counter() - start)
+        if status != "500" and response.headers.get("content-length"):
+            metrics.http_response_size.observe(route_label, value=int(response.headers["content-length"]))
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -47,11 +126,125 @@ def read_root():
 from app.services.report_service import ReportService
 
 # Services Init
-github_service = GitHubService()
+# Responses fetched ahead of an analysis while its URL is being entered, kept for PREFETCH_TTL seconds
+prefetch_cache = ResponseCache(max_age=float(os.getenv("PREFETCH_TTL", "60")))
+github_service = GitHubService(prefetched=prefetch_cache)
 scoring_service = ScoringService(github_service)
+prefetcher = Prefetcher(scoring_service, prefetch_cache, github_service)
 summary_service = SummaryService()
 roadmap_service = RoadmapService()
 report_service = ReportService()
+profiling_service = ProfilingService()
+analysis_cache = AnalysisCache()
+cache_refresher = CacheRefresher(
+    analysis_cache,
+    scoring_service.analyze_repository,
+    snapshot_path=os.getenv("CACHE_SNAPSHOT_PATH", "data/analysis_snapshot.json")
+)
+portfolio_service = PortfolioService(github_service, scoring_service, analysis_cache)
+# Shared by all workers on the host; the JSON snapshot only serves an index without one
+ranking_service = RankingService(os.getenv("RANKING_DB", "data/rankings.sqlite"))
+RANKING_SNAPSHOT_PATH = os.getenv("RANKING_SNAPSHOT_PATH", "data/ranking_snapshot.json")
+webhook_service = WebhookService(scoring_service, analysis_cache)
+timeline_service = TimelineService(github_service, scoring_service)
+rate_limiter = TokenBucketLimiter(os.getenv("RATE_LIMIT_DB", "data/rate_limits.sqlite")) \
+    if os.getenv("RATE_LIMIT_ENABLED", "1") == "1" else None
+# Prefetches are not charged to the analysis bucket, but metered by a smaller one of their own
+prefetch_limiter = TokenBucketLimiter(
+    os.getenv("RATE_LIMIT_DB", "data/rate_limits.sqlite"),
+    capacity=float(os.getenv("PREFETCH_RATE_CAPACITY", "10")),
+    refill_per_second=float(os.getenv("PREFETCH_RATE_REFILL_PER_MINUTE", "6")) / 60
+) if rate_limiter is not None else None
+API_KEYS = {key.strip() for key in os.getenv("API_KEYS", "").split(",") if key.strip()}
+# Only behind a proxy that sets X-Forwarded-For (Render does) may it be trusted; otherwise anyone can spoof it
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "0") == "1"
+
+@app.on_event("startup")
+def warm_cache():
+    """
+    Serves popular repositories from cache immediately after a deploy by loading
+    the last snapshot, then keeps them warm in the background.
+    """
+    analysis_cache.load_snapshot(cache_refresher.snapshot_path)
+    if not len(ranking_service):
+        ranking_service.load_snapshot(RANKING_SNAPSHOT_PATH)
+    cache_refresher.start()
+
+@app.on_event("shutdown")
+def persist_cache():
+    cache_refresher.stop()
+    webhook_service.shutdown()
+    prefetcher.shutdown()
+    try:
+        analysis_cache.save_snapshot(cache_refresher.snapshot_path)
+        if ranking_service.path is None:
+            ranking_service.save_snapshot(RANKING_SNAPSHOT_PATH)
+    except OSError as e:
+        logger.warning(f"Could not write cache snapshots: {e}")
+
+def client_id(request: Request) -> str:
+    """
+    Who a request is rate limited as: its API key if it sent a valid one, else its IP address.
+    """
+    api_key = request.headers.get("x-api-key")
+    if api_key in API_KEYS:
+        return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:16]
+    forwarded = request.headers.get("x-forwarded-for") if RATE_LIMIT_TRUST_PROXY else None
+    if forwarded:
+        return "ip:" + forwarded.split(",")[0].strip()
+    return "ip:" + (request.client.host if request.client else "unknown")
+
+def admit(request: Request, cost: float = 1.0):
+    """
+    Charges a request to its client's token bucket before any GitHub call is made.
+    Raises 429 with a Retry-After header when the client has spent its budget.
+    """
+    if rate_limiter is None:
+        return
+    allowed, retry_after = rate_limiter.acquire(client_id(request), cost)
+    if not allowed:
+        route = request.scope.get("route")
+        metrics.http_rejected.inc(getattr(route, "path", "unmatched"), "rate_limited")
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded, please slow down.",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+
+def iter_repo_data(owner: str, repo_name: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Yields (stage, payload) for each analysis stage, replaying the analysis cache
+    when possible. A fresh analysis is cached once all stages have completed.
+    Yields a single ("error", {...}) pair for repositories that do not exist.
+    """
+    repo_data = analysis_cache.get(owner, repo_name)
+    if repo_data is not None:
+        for stage in scoring_service.ANALYSIS_STAGES:
+            if stage in repo_data:
+                yield stage, repo_data[stage]
+        return
+
+    repo_data = {}
+    for stage, payload in scoring_service.iter_analysis(owner, repo_name):
+        if stage == "error":
+            yield stage, payload
+            return
+        if stage != "metadata":
+            repo_data[stage] = payload
+        yield stage, payload
+    analysis_cache.put(owner, repo_name, repo_data)
+
+def get_repo_data(owner: str, repo_name: str) -> Dict[str, Any]:
+    """
+    Returns repository metrics from the analysis cache, analyzing on a miss.
+    """
+    repo_data = {}
+    for stage, payload in iter_repo_data(owner, repo_name):
+        if stage == "error":
+            return payload
+        if stage != "metadata":
+            repo_data[stage] = payload
+    return repo_data
 
 class AnalyzeRequest(BaseModel):
     repo_url: HttpUrl
@@ -66,6 +259,8 @@ class AnalyzeResponse(BaseModel):
     roadmap: List[str]
     details: Dict[str, Any]
     report: str
+    percentile: Optional[float] = None
+    profile: Optional[List[Dict[str, Any]]] = None
 
 def parse_github_url(url: str) -> tuple[str, str]:
     """
@@ -84,31 +279,141 @@ def parse_github_url(url: str) -> tuple[str, str]:
         
     return owner, repo
 
+@contextmanager
+def instrument_request(response: Response, profile: bool, admin_token: Optional[str]):
+    """
+    Collects per-stage timings into a Server-Timing header and, when an admin
+    asks for it, runs the request under the profiler. Yields the list that
+    receives the hot functions once the block exits.
+    """
+    if profile and not profiling_service.is_authorized(admin_token):
+        raise HTTPException(status_code=403, detail="Profiling requires a valid admin token.")
+
+    with metrics.collect_request_timings() as timings:
+        start = time.perf_counter()
+        if profile:
+            with profiling_service.profile() as hot_functions:
+                yield hot_functions
+        else:
+            yield []
+        timings.add("total", time.perf_counter() - start)
+
+    response.headers["Server-Timing"] = timings.header()
+    response.headers["Timing-Allow-Origin"] = "*"
+
 @app.post("/analyze", response_model=AnalyzeResponse)
-async def analyze_repo(request: AnalyzeRequest):
+def analyze_repo(
+    request: AnalyzeRequest,
+    response: Response,
+    http_request: Request,
+    profile: bool = False,
+    x_admin_token: Optional[str] = Header(None)
+):
     """
     Analyzes a GitHub repository and provides a score, mentor evaluation, and roadmap.
+    Pass ?profile=1 with an X-Admin-Token header to include the hottest functions.
+    A plain def: the blocking pipeline (and its retry sleeps) runs in the threadpool,
+    not on the event loop, so /health and /metrics stay responsive.
     """
+    admit(http_request)
     url_str = str(request.repo_url)
     logger.info(f"Received analysis request for: {url_str}")
-    
+
+    with instrument_request(response, profile, x_admin_token) as hot_functions:
+        result = run_analysis(url_str)
+
+    if profile:
+        result.profile = hot_functions
+    return result
+
+def run_analysis(url_str: str) -> AnalyzeResponse:
+    """
+    Runs the full analysis pipeline (fetch, score, summary, roadmap, report) for one URL.
+    """
+    owner, repo_name = parse_repo_url_or_400(url_str)
+    for event, payload in analysis_events(url_str, owner, repo_name):
+        if event == "result":
+            return payload
+
+def parse_repo_url_or_400(url_str: str) -> Tuple[str, str]:
     try:
-        owner, repo_name = parse_github_url(url_str)
+        return parse_github_url(url_str)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+def github_unavailable(e: GitHubUnavailableError) -> HTTPException:
+    """
+    Maps GitHub outages to 503 and exceeded deadlines to 504, with a Retry-After hint.
+    """
+    status_code = 504 if isinstance(e, DeadlineExceeded) else 503
+    headers = {"Retry-After": str(max(1, math.ceil(e.retry_after)))} if e.retry_after else None
+    return HTTPException(status_code=status_code, detail=f"GitHub is currently unavailable: {e}", headers=headers)
+
+def pin_repo_data(repo_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Copy of repo_data without what depends on this worker's earlier analyses
+    rather than on the commit: the template match (and so the template-dump
+    flag), the sampling counters (cached verdicts are not fetched) and whether a
+    fork reused its parent's analysis.
+    """
+    pinned = dict(repo_data)
+    if "structure" in pinned:
+        structure = {k: v for k, v in pinned["structure"].items() if k != "template"}
+        evidence = structure.get("evidence")
+        if evidence is not None:
+            structure["evidence"] = {k: evidence[k] for k in ("tests", "ci", "unsampled") if k in evidence}
+        pinned["structure"] = structure
+    fork = pinned.get("activity", {}).get("fork")
+    if fork is not None:
+        fork = {k: v for k, v in fork.items() if k != "reused_parent_analysis"}
+        pinned["activity"] = dict(pinned["activity"], fork=fork)
+    return pinned
+
+def analysis_complete(repo_data: Dict[str, Any]) -> bool:
+    """
+    Whether nothing an analysis needed was skipped over a failed or over-budget
+    fetch (tests/CI left unchecked, history pages unread); a retry may differ.
+    Tests left unchecked because no file of theirs can be sampled are final.
+    """
+    evidence = repo_data.get("structure", {}).get("evidence") or {}
+    history = repo_data.get("activity", {}).get("history") or {}
+    unchecked = [label for label in ("tests", "ci")
+                 if evidence.get(label) == "unchecked" and label not in evidence.get("unsampled", [])]
+    return not unchecked and not history.get("pages_skipped")
+
+def analysis_events(url_str: str, owner: str, repo_name: str, pinned: bool = False) -> Iterator[Tuple[str, Any]]:
+    """
+    Runs the analysis pipeline, yielding (event, payload) as each stage completes:
+    metadata, structure, activity, documentation, tech_stack, score, summary,
+    roadmap, report and finally ("result", AnalyzeResponse).
+    With `pinned`, the result depends only on the analyzed commit: the report is
+    dated by that commit, and the (ever changing) percentile and what this worker
+    happened to see before (see pin_repo_data) are left out.
+    """
     # 1. Analyze Core Metrics
+    repo_data = {}
     try:
-        repo_data = scoring_service.analyze_repository(owner, repo_name)
+        with metrics.time_stage("fetch"):
+            for stage, payload in iter_repo_data(owner, repo_name):
+                if stage == "error":
+                    raise HTTPException(status_code=404, detail=payload["error"])
+                if stage != "metadata":
+                    repo_data[stage] = payload
+                yield stage, payload
+    except HTTPException:
+        raise
+    except GitHubUnavailableError as e:
+        logger.error(f"GitHub unavailable while fetching repo data: {e}")
+        raise github_unavailable(e)
     except Exception as e:
         logger.error(f"Error fetching repo data: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch repository data from GitHub.")
-
-    if "error" in repo_data:
-         raise HTTPException(status_code=404, detail=repo_data["error"])
+    if pinned:
+        repo_data = pin_repo_data(repo_data)
 
     # 2. Calculate Score
-    score_result = scoring_service.calculate_score(repo_data)
+    with metrics.time_stage("score"):
+        score_result = scoring_service.calculate_score(repo_data)
     
     score = score_result["total_score"]
     level = score_result["level"]
@@ -117,16 +422,29 @@ async def analyze_repo(request: AnalyzeRequest):
     flags = score_result.get("flags", {})
     simulation = score_result.get("simulation", {})
 
+    ranking_service.record(owner, repo_name, score, level, ranking_service.primary_language(repo_data))
+    percentile = ranking_service.percentile(score, exclude=f"{owner}/{repo_name}")
+    yield "score", dict(score_result, percentile=percentile)
+
     # 3. Generate Evaluation Summary
-    summary_dict = summary_service.generate_evaluation(score, level, weaknesses)
+    with metrics.time_stage("summary"):
+        summary_dict = summary_service.generate_evaluation(score, level, weaknesses)
+    yield "summary", summary_dict
 
     # 4. Generate Improvement Roadmap
-    roadmap = roadmap_service.generate_roadmap(weaknesses)
+    with metrics.time_stage("roadmap"):
+        roadmap = roadmap_service.generate_roadmap(weaknesses)
+    yield "roadmap", roadmap
 
     # 5. Generate Full Audit Report
-    report_content = report_service.generate_audit_report(url_str, score_result, summary_dict["recruiter"], roadmap)
-
-    return AnalyzeResponse(
+    with metrics.time_stage("report"):
+        latest_commit = repo_data.get("activity", {}).get("latest_commit")
+        report_date = datetime.fromisoformat(latest_commit) if pinned and latest_commit else None
+        report_content = report_service.generate_audit_report(url_str, score_result, summary_dict["recruiter"], roadmap,
+                                                              date=report_date)
+    yield "report", report_content
+
+    yield "result", AnalyzeResponse(
         github_url=url_str,
         owner=owner,
         repo_name=repo_name,
@@ -139,11 +457,118 @@ async def analyze_repo(request: AnalyzeRequest):
             "weaknesses": weaknesses,
             "flags": flags,
             "simulation": simulation,
+            "packages": score_result.get("packages", []),
             "repo_stats": repo_data
         },
-        report=report_content
+        report=report_content,
+        percentile=None if pinned else percentile
+    )
+
+def format_sse(event: str, payload: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(payload))}\n\n"
+
+def stream_analysis(url_str: str, owner: str, repo_name: str) -> Iterator[str]:
+    """
+    Serializes analysis events as Server-Sent Events. Data stages also carry the
+    category scores that can already be computed from them.
+    """
+    repo_data = {}
+    try:
+        for event, payload in analysis_events(url_str, owner, repo_name):
+            if event in scoring_service.ANALYSIS_STAGES and event != "metadata":
+                repo_data[event] = payload
+                payload = {"data": payload, "scores": scoring_service.score_stage(event, repo_data)}
+            yield format_sse(event, payload)
+    except HTTPException as e:
+        yield format_sse("error", {"status_code": e.status_code, "detail": e.detail})
+
+@app.get("/analyze/stream")
+def analyze_repo_stream(repo_url: HttpUrl, http_request: Request):
+    """
+    Streaming variant of /analyze: pushes each stage as a Server-Sent Event as soon
+    as it completes. The final 'result' event carries the full AnalyzeResponse.
+    """
+    admit(http_request)
+    url_str = str(repo_url)
+    logger.info(f"Received streaming analysis request for: {url_str}")
+    owner, repo_name = parse_repo_url_or_400(url_str)
+    return StreamingResponse(
+        stream_analysis(url_str, owner, repo_name),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
+ANALYSIS_MAX_AGE = int(os.getenv("ANALYSIS_MAX_AGE", "300"))
+ANALYSIS_STALE_WHILE_REVALIDATE = int(os.getenv("ANALYSIS_STALE_WHILE_REVALIDATE", "86400"))
+
+def analysis_etag(head_sha: str, latest_commit: Optional[str]) -> str:
+    """
+    Strong ETag of the pinned analysis of a commit. Besides the commit and scoring
+    version, only the passage of time changes it: the inactivity flag.
+    """
+    inactive = "-inactive" if ScoringService.is_inactive(latest_commit) else ""
+    return f'"{head_sha}-{SCORING_VERSION}{inactive}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match comparison (weak, as RFC 9110 prescribes for it).
+    """
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+def current_head(owner: str, repo_name: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    SHA and date of the HEAD commit of the default branch: from the cached
+    analysis once a conditional request confirms the branch has not moved, else
+    with one commits request. A cached analysis of an older HEAD is dropped.
+    """
+    cached = analysis_cache.peek(owner, repo_name)
+    activity = cached.get("activity", {}) if cached is not None else {}
+    if activity.get("head_sha") and github_service.head_unchanged(owner, repo_name, activity["head_sha"]):
+        return activity["head_sha"], activity.get("latest_commit")
+    commits = github_service.get_commit_history(owner, repo_name, per_page=1)
+    head_sha = commits[0].get("sha") if commits else None
+    if activity.get("head_sha") and head_sha != activity["head_sha"]:
+        analysis_cache.invalidate(owner, repo_name)
+    return head_sha, scoring_service.analyze_activity(commits).get("latest_commit")
+
+@app.get("/repos/{owner}/{repo_name}/analysis", response_model=AnalyzeResponse)
+def get_analysis(owner: str, repo_name: str, http_request: Request, if_none_match: Optional[str] = Header(None)):
+    """
+    Cacheable variant of /analyze. The ETag names the HEAD commit and scoring
+    version, and the body depends on nothing else, so browsers and edge caches can
+    keep it and revalidate with If-None-Match; an unchanged repository gets a 304.
+    An incomplete analysis (see analysis_complete) is not cached.
+    """
+    admit(http_request)
+    cache_control = f"public, max-age={ANALYSIS_MAX_AGE}, stale-while-revalidate={ANALYSIS_STALE_WHILE_REVALIDATE}"
+    if if_none_match:
+        try:
+            head_sha, latest_commit = current_head(owner, repo_name)
+        except GitHubUnavailableError as e:
+            raise github_unavailable(e)
+        etag = analysis_etag(head_sha, latest_commit) if head_sha else None
+        metrics.record_cache("analysis_etag", etag is not None and etag_matches(if_none_match, etag))
+        if etag is not None and etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+    url_str = f"https://github.com/{owner}/{repo_name}"
+    result = None
+    for event, payload in analysis_events(url_str, owner, repo_name, pinned=True):
+        if event == "result":
+            result = payload
+    repo_stats = result.details["repo_stats"]
+    activity = repo_stats.get("activity", {})
+    if not activity.get("head_sha") or not analysis_complete(repo_stats):
+        return JSONResponse(jsonable_encoder(result), headers={"Cache-Control": "no-cache"})
+    etag = analysis_etag(activity["head_sha"], activity.get("latest_commit"))
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(jsonable_encoder(result), headers=headers)
+
 class CompareRequest(BaseModel):
     repo_url_1: HttpUrl
     repo_url_2: HttpUrl
@@ -153,33 +578,91 @@ class CompareResponse(BaseModel):
     summary: str
     repo_1: Dict[str, Any]
     repo_2: Dict[str, Any]
+    profile: Optional[List[Dict[str, Any]]] = None
+
+@app.post("/prefetch", status_code=202)
+def prefetch_repo(request: AnalyzeRequest, http_request: Request):
+    """
+    Called by the UI as soon as a repository URL is entered: starts fetching what
+    its analysis needs in the background, so that /analyze usually finds it ready.
+    Not charged to the client's analysis rate limit but to a smaller prefetch
+    bucket; skipped when that is empty or while this worker is busy.
+    """
+    owner, repo_name = parse_repo_url_or_400(str(request.repo_url))
+    client = client_id(http_request)
+    if analysis_cache.peek(owner, repo_name) is not None:
+        status = "cached"
+        metrics.prefetches.inc(status)
+    elif load_shedder.in_flight * 2 >= load_shedder.max_in_flight or (
+            prefetch_limiter is not None and not prefetch_limiter.acquire("prefetch:" + client)[0]):
+        status = "skipped"
+        metrics.prefetches.inc(status)
+    else:
+        status = prefetcher.prefetch(client, owner, repo_name)
+    return {"repo": f"{owner}/{repo_name}", "status": status}
+
+@app.delete("/prefetch")
+def cancel_prefetch(repo_url: HttpUrl, http_request: Request):
+    """
+    Cancels the client's prefetch of a repository, e.g. when the URL was edited.
+    """
+    owner, repo_name = parse_repo_url_or_400(str(repo_url))
+    return {"repo": f"{owner}/{repo_name}", "cancelled": prefetcher.cancel(client_id(http_request), owner, repo_name)}
 
 @app.post("/compare", response_model=CompareResponse)
-async def compare_repos(request: CompareRequest):
+def compare_repos(
+    request: CompareRequest,
+    response: Response,
+    http_request: Request,
+    profile: bool = False,
+    x_admin_token: Optional[str] = Header(None)
+):
     """
     Compares two repositories and identifies the stronger one based on engineering standards.
+    Pass ?profile=1 with an X-Admin-Token header to include the hottest functions.
     """
+    admit(http_request, cost=2)
     urls = [str(request.repo_url_1), str(request.repo_url_2)]
+
+    with instrument_request(response, profile, x_admin_token) as hot_functions:
+        result = run_comparison(urls)
+
+    if profile:
+        result.profile = hot_functions
+    return result
+
+def run_comparison(urls: List[str]) -> CompareResponse:
+    """
+    Analyzes and scores both repositories, then summarizes which one is stronger.
+    """
     results = []
 
     for url in urls:
         try:
             owner, repo_name = parse_github_url(url)
-            repo_data = scoring_service.analyze_repository(owner, repo_name)
+            with metrics.time_stage("fetch"):
+                repo_data = get_repo_data(owner, repo_name)
             
             if "error" in repo_data:
                  results.append({"error": repo_data["error"], "name": repo_name, "score": 0})
                  continue
                  
-            score_res = scoring_service.calculate_score(repo_data)
+            with metrics.time_stage("score"):
+                score_res = scoring_service.calculate_score(repo_data)
+            ranking_service.record(owner, repo_name, score_res["total_score"], score_res["level"],
+                                   ranking_service.primary_language(repo_data))
             results.append({
                 "name": repo_name,
                 "owner": owner,
                 "score": score_res["total_score"],
+                "percentile": ranking_service.percentile(score_res["total_score"], exclude=f"{owner}/{repo_name}"),
                 "level": score_res["level"],
                 "flags": score_res.get("flags", {}),
                 "weaknesses": score_res["weaknesses"]
             })
+        except GitHubUnavailableError as e:
+            logger.error(f"GitHub unavailable while comparing {url}: {e}")
+            raise github_unavailable(e)
         except Exception as e:
             logger.error(f"Error comparing {url}: {e}")
             raise HTTPException(status_code=500, detail=f"Failed to analyze {url}")
@@ -233,6 +716,154 @@ async def compare_repos(request: CompareRequest):
         repo_2=r2
     )
 
+class PortfolioRequest(BaseModel):
+    account: str
+    max_repos: int = Field(30, ge=1, le=100)
+    effort_budget: Optional[int] = Field(None, ge=0, le=500)
+
+class PortfolioResponse(BaseModel):
+    account: str
+    weighted_score: float
+    level: str
+    level_distribution: Dict[str, int]
+    recurring_weaknesses: List[Dict[str, Any]]
+    listed_count: int
+    analyzed_count: int
+    skipped: Dict[str, int]
+    repos: List[Dict[str, Any]]
+    improvement_plan: Optional[Dict[str, Any]] = None
+
+@app.post("/portfolio", response_model=PortfolioResponse)
+def analyze_portfolio(request: PortfolioRequest, http_request: Request):
+    """
+    Analyzes all original public repositories of a GitHub user or organization
+    and aggregates them into a candidate-level profile.
+    Accepts a username, an organization name or a https://github.com/<account> URL.
+    """
+    # Priced by size: most portfolio repositories are small or already cached
+    admit(http_request, cost=max(1.0, request.max_repos / 4))
+    account = request.account.strip().rstrip("/")
+    if "/" in account:
+        account = urlparse(account).path.strip("/").split("/")[0]
+    if not account:
+        raise HTTPException(status_code=400, detail="Invalid GitHub account.")
+    logger.info(f"Received portfolio request for: {account}")
+
+    try:
+        profile = portfolio_service.analyze_account(account, max_repos=request.max_repos,
+                                                    effort_budget=request.effort_budget)
+    except GitHubUnavailableError as e:
+        logger.error(f"GitHub unavailable while analyzing portfolio for {account}: {e}")
+        raise github_unavailable(e)
+    except Exception as e:
+        logger.error(f"Error analyzing portfolio for {account}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch account data from GitHub.")
+
+    if profile is None:
+        raise HTTPException(status_code=404, detail="GitHub account not found")
+    return PortfolioResponse(**profile)
+
+class PlanRequest(BaseModel):
+    repo_url: HttpUrl
+    effort_budget: int = Field(ImprovementPlanner.DEFAULT_BUDGET, ge=0, le=100)
+
+@app.post("/plan")
+def plan_improvements(request: PlanRequest, http_request: Request):
+    """
+    Returns the fixes that raise a repository's score the most within an effort
+    budget (estimated hours). Reuses the cached analysis when there is one.
+    """
+    admit(http_request)
+    owner, repo_name = parse_repo_url_or_400(str(request.repo_url))
+    try:
+        repo_data = get_repo_data(owner, repo_name)
+    except GitHubUnavailableError as e:
+        logger.error(f"GitHub unavailable while planning for {owner}/{repo_name}: {e}")
+        raise github_unavailable(e)
+    if "error" in repo_data:
+        raise HTTPException(status_code=404, detail=repo_data["error"])
+
+    score_result = scoring_service.calculate_score(repo_data)
+    mask = encode_weaknesses(score_result["weakness_codes"])
+    return dict(
+        scoring_service.planner.plan(mask, score_result["total_score"], request.effort_budget),
+        current_score=score_result["total_score"],
+        weakness_codes=score_result["weakness_codes"]
+    )
+
+class TimelineRequest(BaseModel):
+    repo_url: HttpUrl
+    points: int = Field(TimelineService.DEFAULT_POINTS, ge=2, le=52)
+    since: Optional[datetime] = None
+
+@app.post("/timeline")
+def score_timeline(request: TimelineRequest, http_request: Request):
+    """
+    Scores commits sampled evenly over the repository's history (optionally only
+    since a date) and reports the score/level series and when weaknesses were resolved.
+    """
+    admit(http_request, cost=1 + request.points / 4)
+    owner, repo_name = parse_repo_url_or_400(str(request.repo_url))
+    since = None
+    if request.since is not None:
+        since_utc = request.since.astimezone(timezone.utc) if request.since.tzinfo else request.since
+        since = since_utc.strftime("%Y-%m-%dT%H:%M:%SZ")
+    logger.info(f"Received timeline request for: {owner}/{repo_name}")
+    try:
+        timeline = timeline_service.build_timeline(owner, repo_name, points=request.points, since=since)
+    except GitHubUnavailableError as e:
+        logger.error(f"GitHub unavailable while building timeline for {owner}/{repo_name}: {e}")
+        raise github_unavailable(e)
+    if "error" in timeline:
+        raise HTTPException(status_code=404, detail=timeline["error"])
+    return timeline
+
+@app.get("/leaderboard")
+def get_leaderboard(k: int = Query(10, ge=1, le=100), language: Optional[str] = None, level: Optional[str] = None):
+    """
+    Returns the top-k analyzed repositories, optionally filtered by primary language and/or level.
+    """
+    return {
+        "total_ranked": len(ranking_service),
+        "entries": ranking_service.leaderboard(k, language=language, level=level)
+    }
+
+@app.post("/webhooks/github")
+async def github_webhook(
+    request: Request,
+    x_github_event: str = Header(...),
+    x_hub_signature_256: Optional[str] = Header(None)
+):
+    """
+    Receives GitHub push and repository webhooks (JSON, signed with GITHUB_WEBHOOK_SECRET)
+    and updates cached analyses in place instead of polling GitHub.
+    """
+    body = await request.body()
+    if not webhook_service.verify_signature(body, x_hub_signature_256):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature.")
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Webhook payload must be JSON.")
+
+    result = await run_in_threadpool(webhook_service.handle, x_github_event, payload)
+    if result["action"] == "updated":
+        score_result = result.pop("score")
+        repo_data = result.pop("repo_data")
+        owner, repo_name = result["repo"].split("/", 1)
+        ranking_service.record(owner, repo_name, score_result["total_score"], score_result["level"],
+                               ranking_service.primary_language(repo_data))
+        result.update(total_score=score_result["total_score"], level=score_result["level"])
+    logger.info(f"Webhook {x_github_event} for {result.get('repo')}: {result['action']}")
+    return result
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """
+    Exposes per-worker metrics in the Prometheus text exposition format.
+    """
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/health")
 def health_check():
     return {"status": "ok", "message": "Repository Mirror API is running"}